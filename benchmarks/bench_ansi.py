@@ -0,0 +1,107 @@
+"""
+benchmarks/bench_ansi.py
+
+compares the old byte-wise color code reading with the chunked AnsiParser
+
+run from the repository root:
+    python -m benchmarks.bench_ansi [log file]
+
+without a log file a colored robot log of ~8 MB is generated
+"""
+from ui._tk_term_colors import AnsiParser, cmd_to_tk
+from ui._reader import StreamDecoder
+import random
+import time
+import sys
+import io
+
+
+CHUNK_SIZE: int = 64 * 1024
+
+
+def generate_log(n_lines: int = 250_000) -> bytes:
+    """
+    a log looking like colored robot output
+    """
+    rnd = random.Random(0)
+    templates = [
+        "motor {0}: pos={1} speed={2}\n",
+        "\x1b[32m[ OK ]\x1b[0m sensor {0} read {1}\n",
+        "\x1b[1;31m[FAIL]\x1b[0m servo {0} stalled at {1}\n",
+        "\x1b[38;5;208mwarn\x1b[39m: battery {2}%\n",
+        "\x1b[2K\r\x1b[38;2;80;160;255mprogress\x1b[0m {1}/{2}\n",
+        "camera: {0} blobs °\n",
+    ]
+    lines = [
+        rnd.choice(templates).format(
+            rnd.randint(0, 3), rnd.randint(0, 4096), rnd.randint(0, 100)
+        ) for _ in range(n_lines)
+    ]
+    return "".join(lines).encode()
+
+
+def old_path(data: bytes) -> int:
+    """
+    the previous approach: per byte reads, color codes read until "m"
+    """
+    stdout = io.BytesIO(data)
+    out = []
+    tag = ""
+    while byte_char := stdout.read(1):
+        if byte_char[0] == 27:
+            curr = b""
+            n_char = stdout.read(1)
+            while n_char[0] != 109:
+                curr += n_char
+                n_char = stdout.read(1)
+                if len(curr) > 10:
+                    break  # the old reader raised here
+
+            code = curr.decode().lstrip("[").split(";")
+            try:
+                tag = cmd_to_tk(int(code[-1]), int(code[0]) if len(code) > 1 else 0)
+
+            except ValueError:
+                tag = ""
+
+            continue
+
+        try:
+            out.append((byte_char.decode(), tag))
+
+        except UnicodeDecodeError:
+            pass
+
+    return len(out)
+
+
+def new_path(data: bytes) -> int:
+    decoder = StreamDecoder()
+    parser = AnsiParser()
+    out = []
+    view = memoryview(data)
+    for i in range(0, len(data), CHUNK_SIZE):
+        out.extend(parser.feed(decoder.decode(view[i:i + CHUNK_SIZE])))
+
+    out.extend(parser.feed(decoder.decode(b"", final=True), final=True))
+    return len(out)
+
+
+def main() -> None:
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as inp:
+            data = inp.read()
+
+    else:
+        data = generate_log()
+
+    print(f"log size: {len(data) / 1e6:.1f} MB")
+    for name, func in (("old (per byte)", old_path), ("new (AnsiParser)", new_path)):
+        start = time.perf_counter()
+        n_spans = func(data)
+        took = time.perf_counter() - start
+        print(f"{name:>17}: {len(data) / took / 1e6:8.2f} MB/s ({n_spans} runs in {took:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
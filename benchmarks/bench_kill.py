@@ -0,0 +1,98 @@
+"""
+benchmarks/bench_kill.py
+
+compares the `ps -ax` based process lookup with the /proc scanner, and
+measures how long stopping a program together with its helpers takes
+
+run from the repository root:
+    python -m benchmarks.bench_kill [iterations]
+"""
+from ui.kill import get_running_pids_ps, SEARCH_FOR
+from ui._process_table import ProcessTable
+from ui._supervisor import Supervisor, alive
+import subprocess
+import time
+import sys
+
+
+# a program starting a helper, both ignoring the given signals
+STOP_PROGRAM: str = (
+    "import signal, subprocess, sys, time\n"
+    "ignore = {ignore!r}\n"
+    "code = 'import signal, time\\n' + ''.join(\n"
+    "    f'signal.signal(signal.{{s}}, signal.SIG_IGN)\\n' for s in ignore\n"
+    ") + 'print(flush=True)\\ntime.sleep(60)'\n"
+    "helper = subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE)\n"
+    "helper.stdout.readline()\n"
+    "exec(code)\n"
+)
+
+
+def timed(name: str, func, iterations: int) -> None:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+
+    took = (time.perf_counter() - start) / iterations
+    print(f"{name:>20}: {took * 1e6:10.1f} us / call")
+
+
+def stop_latency(name: str, ignore: tuple[str, ...]) -> None:
+    """
+    stop a program with a helper, once with only SIGTERM to the program
+    (what the ui did before) and once through the supervisor
+    """
+    supervisor = Supervisor(int_timeout=.2, term_timeout=.2, kill_timeout=1)
+    results = []
+    for old in (True, False):
+        proc = subprocess.Popen(
+            [sys.executable, "-c", STOP_PROGRAM.format(ignore=ignore)],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+        proc.stdout.readline()
+
+        start = time.perf_counter()
+        if old:
+            proc.terminate()
+            try:
+                proc.wait(1)
+
+            except subprocess.TimeoutExpired:
+                pass
+
+            took, sig = time.perf_counter() - start, "SIGTERM"
+
+        else:
+            report = supervisor.stop_group(proc.pid)
+            took, sig = report.latency, report.signal
+
+        left = "still running" if alive(proc.pid) else "all stopped"
+        # clean up after the old way
+        supervisor.stop_group(proc.pid)
+        proc.wait()
+        results.append((took, sig, left))
+
+    (old_took, _, old_left), (took, sig, left) = results
+    print(
+        f"{name:>20}: supervisor {took * 1e3:7.1f} ms ({sig}, {left}), "
+        f"SIGTERM to the program {old_took * 1e3:7.1f} ms ({old_left})"
+    )
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    uncached = ProcessTable(ttl=0)
+    cached = ProcessTable(ttl=1)
+    timed("ps -ax (old)", lambda: get_running_pids_ps(SEARCH_FOR), iterations)
+    timed("/proc scan", lambda: uncached.pids(SEARCH_FOR), iterations)
+    timed("/proc scan (cached)", lambda: cached.pids(SEARCH_FOR), iterations)
+
+    stop_latency("exits on SIGINT", ())
+    stop_latency("ignores SIGINT", ("SIGINT",))
+    stop_latency("ignores INT + TERM", ("SIGINT", "SIGTERM"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+benchmarks/bench_launch.py
+
+time from pressing Start until the program runs, cold vs. prepared
+
+run from the repository root:
+    python -m benchmarks.bench_launch [runs] [--run-mode pty|pipe]
+        [--program /usr/bin/cmake --version]
+
+The program (default: the python interpreter, `-c "print()"`) is copied
+and the copy is evicted from the page cache before every run
+(POSIX_FADV_DONTNEED, works without root for files we can open), to
+simulate a binary last read long ago from the SD card. "prepared" runs
+prepare the launch first and give the kernel `--delay` seconds to read
+the file, like selecting a program some time before pressing Start.
+
+"exec" is when the program was executed (what the ui shows), "output"
+when its first output arrived. Reading the binary from disk mostly
+happens in between, as page faults once it runs.
+"""
+from ui._session import Launcher
+from time import perf_counter, sleep
+import statistics
+import threading
+import argparse
+import tempfile
+import shutil
+import sys
+import os
+
+
+def evict(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fdatasync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+    finally:
+        os.close(fd)
+
+
+def launch_once(
+        launcher: Launcher, command: list[str], prepare: bool, delay: float
+) -> tuple[float, float]:
+    """
+    :return: seconds until exec, until the first output
+    """
+    prepared = None
+    if prepare:
+        prepared = launcher.prepare(command)
+        sleep(delay)
+
+    first_output: list[float] = []
+    output = threading.Event()
+
+    def on_output() -> None:
+        if not first_output:
+            first_output.append(perf_counter())
+            output.set()
+
+    pressed = perf_counter()
+    session = launcher.launch(command, on_output, prepared=prepared, pressed=pressed)
+    output.wait(10)
+    session.proc.wait()
+    while not session.finished:
+        sleep(.001)
+
+    session.stop()
+    return session.press_to_exec, first_output[0] - pressed
+
+
+def _stats(times: list[float]) -> str:
+    times = sorted(times)
+    return f"median {statistics.median(times) * 1e3:7.2f} ms, " \
+        f"p90 {times[int(len(times) * .9)] * 1e3:7.2f} ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("runs", nargs="?", type=int, default=20)
+    parser.add_argument("--run-mode", choices=("pty", "pipe"), default="pty")
+    parser.add_argument("--delay", type=float, default=.2)
+    parser.add_argument("--program", nargs=argparse.REMAINDER,
+                        default=[sys.executable, "-c", "print()"])
+    args = parser.parse_args()
+
+    launcher = Launcher(run_mode=args.run_mode)
+    with tempfile.TemporaryDirectory() as directory:
+        program = os.path.join(directory, "main")
+        shutil.copy(os.path.realpath(args.program[0]), program)
+        command = [program, *args.program[1:]]
+
+        for name, prepare in (("cold", False), ("prepared", True)):
+            to_exec, to_output = [], []
+            for _ in range(args.runs):
+                evict(program)
+                took_exec, took_output = launch_once(launcher, command, prepare, args.delay)
+                to_exec.append(took_exec)
+                to_output.append(took_output)
+
+            print(f"{name:>9}: exec {_stats(to_exec)}, output {_stats(to_output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""
+benchmarks/bench_pipeline.py
+
+end to end benchmark of the capture and render pipeline: synthetic
+programs are run in a TermBox, from the child's write to the insert into
+the text widget
+
+run from the repository root:
+    python -m benchmarks.bench_pipeline [--out results.json] [--tk]
+        [--no-throttle] [--run-mode pty|pipe] [scenario ...]
+
+without --tk (or without a display) the tk text widget is replaced by a
+stub that only counts lines, with --tk a real window is used (start it
+under Xvfb on machines without a display, `--tk` does that itself if Xvfb
+is installed).
+
+Every scenario runs in a fresh process so peak memory and cpu time are its
+own. The results are printed as json, compare two commits with e.g.
+    python -m benchmarks.bench_pipeline --out before.json
+"""
+from unittest import mock
+import typing as tp
+import subprocess
+import threading
+import resource
+import argparse
+import platform
+import shutil
+import time
+import json
+import sys
+import os
+import re
+
+
+# every scenario writes "@<monotonic time>|" markers, latency is measured
+# from the marker's time to when the text holding it is inserted
+CHILD_HEADER = (
+    "import sys, time\n"
+    "out, err = sys.stdout.buffer, sys.stderr.buffer\n"
+    "def mark():\n"
+    "    return b'@%.6f|' % time.monotonic()\n"
+)
+
+SCENARIOS: dict[str, str] = {
+    # 20 MB of plain lines as fast as possible
+    "flood": CHILD_HEADER + (
+        "line = b' sensor 1: 1234 motor 2: -100 state: driving\\n'\n"
+        "block = line * 100\n"
+        "for _ in range(20 * 1024 * 1024 // len(block)):\n"
+        "    out.write(mark() + block)\n"
+        "out.flush()\n"
+    ),
+    # 10 MB of lines with several color changes each
+    "ansi": CHILD_HEADER + (
+        "line = (b'\\x1b[1;32mOK\\x1b[0m sensor \\x1b[33m1234\\x1b[0m '\n"
+        "        b'\\x1b[38;5;208mmotor\\x1b[0m \\x1b[41;37m-100\\x1b[0m\\n')\n"
+        "block = line * 100\n"
+        "for _ in range(10 * 1024 * 1024 // len(block)):\n"
+        "    out.write(mark() + block)\n"
+        "out.flush()\n"
+    ),
+    # bursts of 2000 stderr lines between normal output
+    "stderr": CHILD_HEADER + (
+        "for i in range(50):\n"
+        "    out.write(mark() + b'working %d\\n' % i * 50)\n"
+        "    out.flush()\n"
+        "    err.write(mark() + b'Traceback: something failed\\n' * 2000)\n"
+        "    err.flush()\n"
+        "    time.sleep(.02)\n"
+    ),
+    # one line every 10 ms, only latency matters
+    "trickle": CHILD_HEADER + (
+        "for i in range(300):\n"
+        "    out.write(mark() + b'tick %d\\n' % i)\n"
+        "    out.flush()\n"
+        "    time.sleep(.01)\n"
+    ),
+    # 8 MB without a single newline (progress output, binary junk)
+    "longline": CHILD_HEADER + (
+        "chunk = b'#' * 4000\n"
+        "for _ in range(2000):\n"
+        "    out.write(mark() + chunk)\n"
+        "out.flush()\n"
+    ),
+}
+
+_MARK_RE = re.compile(r"@(\d+\.\d+)\|")
+
+
+class StubText:
+    """
+    stands in for the tk text widget, only keeps track of the line count
+    """
+    def __init__(self) -> None:
+        self.n_lines = 1
+        self.n_inserts = 0
+
+    def insert(self, _index, *args) -> None:
+        self.n_inserts += 1
+        self.n_lines += sum([text.count("\n") for text in args[::2]])
+
+    def delete(self, first, last=None) -> None:
+        if first in ("1.0", 0.0) and last not in (None, "end"):
+            self.n_lines -= int(str(last).split(".")[0]) - 1
+
+        else:
+            self.n_lines = 1
+
+    def index(self, _index) -> str:
+        return "1.0"
+
+    def yview(self, *_trash) -> tuple[float, float]:
+        return 0., 1.
+
+    def __getattr__(self, _name):
+        # see, bind, tag_* ...
+        return lambda *_args, **_kwargs: None
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.
+
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+def run_scenario(name: str, use_tk: bool, throttle: bool, run_mode: str) -> dict:
+    """
+    run one scenario in this process
+    """
+    import customtkinter as ctk
+    from ui._term_box import TermBox
+    from ui._profiler import PROFILER
+
+    wake = threading.Event()
+    options = dict(
+        on_output=wake.set,
+        run_mode=run_mode,
+        log_directory="",
+        max_display_rate=2000 if throttle else 0,
+        throttle_lines=1000 if throttle else 0,
+    )
+
+    root = None
+    if use_tk:
+        root = ctk.CTk()
+        box = TermBox(root, **options)
+        box.pack(fill="both", expand=True)
+        root.update()
+
+    else:
+        def stub_init(self, *_args, **_kwargs) -> None:
+            self._textbox = StubText()
+
+        with mock.patch.object(ctk.CTkTextbox, "__init__", stub_init):
+            box = TermBox(**options)
+
+    latencies: list[float] = []
+    insert = box._insert_grouped
+
+    def timed_insert(spans) -> None:
+        insert(spans)
+        now = time.monotonic()
+        for text, _ in spans:
+            if "@" in text:
+                latencies.extend([now - float(t) for t in _MARK_RE.findall(text)])
+
+    box._insert_grouped = timed_insert
+
+    PROFILER.reset()
+    child_script = SCENARIOS[name]
+    start = time.monotonic()
+    cpu_start = resource.getrusage(resource.RUSAGE_SELF)
+    box.run_program([sys.executable, "-c", child_script])
+
+    # the scheduler's job: a frame on output, at most 30 per second
+    frame_interval = 1 / 30
+    n_frames = 0
+    last_frame = 0.
+    more = False
+    while True:
+        if not more:
+            # idle until there is output
+            wake.wait(frame_interval)
+
+        delay = last_frame + frame_interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+        wake.clear()
+        last_frame = time.monotonic()
+        more = box.update()
+        n_frames += 1
+        if root is not None:
+            root.update()
+
+        if box.session.finished and not more and not box.session.capture.queued:
+            break
+
+    took = time.monotonic() - start
+    cpu_end = resource.getrusage(resource.RUSAGE_SELF)
+    child = resource.getrusage(resource.RUSAGE_CHILDREN)
+    stats = PROFILER.snapshot()
+    box.end()
+    if root is not None:
+        root.destroy()
+
+    n_bytes = sum([value for key, value in stats["counters"].items()
+                   if key.endswith(".bytes")])
+    insert_stats = stats["stages"].get("term.insert", {"count": 0, "total": 0, "max": 0})
+    return {
+        "scenario": name,
+        "widget": "tk" if use_tk else "stub",
+        "throttle": throttle,
+        "run_mode": run_mode,
+        "seconds": took,
+        "bytes": n_bytes,
+        "mb_per_s": n_bytes / took / 1e6,
+        "frames": n_frames,
+        "inserts": insert_stats["count"],
+        "insert_ms_total": insert_stats["total"] * 1000,
+        "insert_ms_max": insert_stats["max"] * 1000,
+        "skipped_lines": stats["counters"].get("throttle.skipped_lines", 0),
+        "queue_high_water": stats["gauges"].get("capture.high_water", {}).get("max", 0),
+        "latency_ms": {
+            "n": len(latencies),
+            "p50": _percentile(latencies, .5) * 1000,
+            "p95": _percentile(latencies, .95) * 1000,
+            "max": max(latencies, default=0) * 1000,
+        },
+        "cpu_s": {
+            "ui": (cpu_end.ru_utime - cpu_start.ru_utime)
+            + (cpu_end.ru_stime - cpu_start.ru_stime),
+            "child": child.ru_utime + child.ru_stime,
+        },
+        # ru_maxrss is in KB on linux
+        "peak_rss_mb": cpu_end.ru_maxrss / 1024,
+    }
+
+
+def _start_xvfb() -> tp.Union[subprocess.Popen, None]:
+    """
+    start a virtual display if there is none
+    """
+    if os.environ.get("DISPLAY") or shutil.which("Xvfb") is None:
+        return None
+
+    display = ":99"
+    xvfb = subprocess.Popen(
+        ["Xvfb", display, "-screen", "0", "1280x800x24"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    time.sleep(.5)
+    os.environ["DISPLAY"] = display
+    return xvfb
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("scenarios", nargs="*", default=list(SCENARIOS))
+    parser.add_argument("--out", help="also write the results to this file")
+    parser.add_argument("--tk", action="store_true", help="use a real tk widget")
+    parser.add_argument("--no-throttle", action="store_true")
+    parser.add_argument("--run-mode", choices=("pty", "pipe"), default="pty")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # one scenario, in its own process
+        print(json.dumps(run_scenario(
+            args.scenarios[0], args.tk, not args.no_throttle, args.run_mode
+        )))
+        return
+
+    xvfb = _start_xvfb() if args.tk else None
+    results = []
+    try:
+        for name in args.scenarios:
+            if name not in SCENARIOS:
+                parser.error(f"unknown scenario \"{name}\", available: {', '.join(SCENARIOS)}")
+
+            cmd = [sys.executable, "-m", "benchmarks.bench_pipeline", "--child",
+                   "--run-mode", args.run_mode, name]
+            cmd += ["--tk"] if args.tk else []
+            cmd += ["--no-throttle"] if args.no_throttle else []
+            done = subprocess.run(cmd, capture_output=True, text=True)
+            if done.returncode:
+                print(f"{name} failed:\n{done.stderr}", file=sys.stderr)
+                continue
+
+            result = json.loads(done.stdout.strip().splitlines()[-1])
+            results.append(result)
+            print(
+                f"{name:>9}: {result['mb_per_s']:7.2f} MB/s, "
+                f"latency p50 {result['latency_ms']['p50']:7.1f} ms "
+                f"p95 {result['latency_ms']['p95']:7.1f} ms, "
+                f"rss {result['peak_rss_mb']:6.1f} MB, "
+                f"cpu {result['cpu_s']['ui']:5.2f} s",
+                file=sys.stderr
+            )
+
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+
+    report = {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    print(json.dumps(report, indent=4))
+    if args.out:
+        with open(args.out, "w") as out:
+            json.dump(report, out, indent=4)
+
+
+if __name__ == "__main__":
+    main()
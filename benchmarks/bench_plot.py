@@ -0,0 +1,65 @@
+"""
+benchmarks/bench_plot.py
+
+cost of one plot redraw the longer a program prints numbers
+
+run from the repository root:
+    python -m benchmarks.bench_plot [width]
+
+Compares the plot frame's path (ring buffer, min/max decimation to the
+canvas width) with plotting every sample printed so far. Measures
+computing the canvas coordinates, tk itself costs roughly in proportion
+to their number.
+"""
+from ui._numbers import NumberParser
+from ui._plot_frame import window, line_points
+from ui._series import min_max
+from time import perf_counter
+import sys
+
+
+def naive_points(values: list[float], width: int, height: int) -> list[float]:
+    low, high = min(values), max(values)
+    scale = height / ((high - low) or 1.)
+    step = width / max(len(values) - 1, 1)
+    points: list[float] = []
+    for i, value in enumerate(values):
+        points += (i * step, height - (value - low) * scale)
+
+    return points
+
+
+def main() -> None:
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 800
+    parser = NumberParser(capacity=20_000)
+    printed: list[float] = []
+    line = 0
+    print(f"{'samples':>9}  {'decimated':>14}  {'every sample':>16}")
+    for samples in (1_000, 10_000, 100_000, 1_000_000):
+        # the program keeps printing "error=<value>" lines
+        block = []
+        while line < samples:
+            value = (line % 200) - 100
+            block.append(f"error={value}\n")
+            printed.append(float(value))
+            line += 1
+
+        parser.write("stdout", "".join(block).encode())
+
+        start = perf_counter()
+        ring = parser.series["error"]
+        points = line_points(min_max(window(ring, None), width), -100, 100, width, 400)
+        decimated = perf_counter() - start
+
+        start = perf_counter()
+        naive = naive_points(printed, width, 400)
+        every = perf_counter() - start
+
+        print(
+            f"{samples:>9}  {decimated * 1e3:7.2f} ms {len(points) // 2:>5}p"
+            f"  {every * 1e3:8.2f} ms {len(naive) // 2:>7}p"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+benchmarks/bench_reader.py
+
+compares the old byte-by-byte output reading with the chunked reader
+
+run from the repository root:
+    python -m benchmarks.bench_reader [megabytes]
+"""
+from ui._tk_term_colors import AnsiParser
+from ui._reader import ChunkReader, StreamDecoder
+import subprocess
+import time
+import sys
+
+
+CHILD = (
+    "import sys\n"
+    "line = ('sensor 1: 1234 \\u00b0 \\x1b[31mred\\x1b[0m ' * 4 + '\\n').encode()\n"
+    "n = int(sys.argv[1]) * 1024 * 1024 // len(line)\n"
+    "for _ in range(n):\n"
+    "    sys.stdout.buffer.write(line)\n"
+)
+
+
+def spawn(megabytes: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-c", CHILD, str(megabytes)],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+
+
+def old_path(megabytes: int) -> int:
+    """
+    the previous reader: one read(1) and decode per byte
+    """
+    proc = spawn(megabytes)
+    total = 0
+    out = []
+    while byte_char := proc.stdout.read(1):
+        total += 1
+        if byte_char[0] == 27:
+            while proc.stdout.read(1)[0] != 109:
+                total += 1
+            continue
+
+        try:
+            out.append((byte_char.decode("utf-8"), ""))
+
+        except UnicodeDecodeError:
+            pass  # the old reader crashed on multi-byte characters
+
+    proc.wait()
+    return total
+
+
+def new_path(megabytes: int) -> int:
+    proc = spawn(megabytes)
+    reader = ChunkReader()
+    reader.register(proc.stdout, "stdout")
+    decoder = StreamDecoder()
+    parser = AnsiParser()
+    total = 0
+    out = []
+    while reader.active:
+        for _, chunk in reader.read(timeout=.05):
+            total += len(chunk)
+            out.extend(parser.feed(
+                decoder.decode(chunk, final=not chunk), final=not chunk
+            ))
+
+    reader.close()
+    proc.wait()
+    return total
+
+
+def main() -> None:
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    for name, func in (("old (read(1))", old_path), ("new (chunked)", new_path)):
+        start = time.perf_counter()
+        n_bytes = func(megabytes)
+        took = time.perf_counter() - start
+        print(f"{name:>16}: {n_bytes / took / 1e6:8.2f} MB/s ({n_bytes} bytes in {took:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
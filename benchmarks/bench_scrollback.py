@@ -0,0 +1,84 @@
+"""
+benchmarks/bench_scrollback.py
+
+memory and latency of 1M output lines with and without a scrollback limit
+
+run from the repository root:
+    python -m benchmarks.bench_scrollback [lines]
+
+if a display is available the lines are also inserted into a tk Text
+widget, trimmed the same way TermBox does it
+"""
+from ui._scrollback import Scrollback
+import tracemalloc
+import tkinter
+import time
+import sys
+
+
+BATCH: int = 1000
+
+
+def run(n_lines: int, max_lines: int, text: tkinter.Text = None) -> None:
+    scrollback = Scrollback(max_lines=max_lines)
+    batch = [(f"line {i} motor=123 sensor=456\n", ()) for i in range(BATCH)]
+    latencies: list[float] = []
+
+    # memory and timing are measured in separate passes,
+    # tracemalloc slows down every allocation
+    tracemalloc.start()
+    for _ in range(n_lines // BATCH):
+        scrollback.append(batch)
+
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    scrollback.clear()
+
+    start = time.perf_counter()
+    for _ in range(n_lines // BATCH):
+        t0 = time.perf_counter()
+        scrollback.append(batch)
+        if text is not None:
+            text.insert("end", "".join(s[0] for s in batch))
+            trimmed = scrollback.take_trimmed()
+            if trimmed:
+                text.delete("1.0", f"{trimmed + 1}.0")
+
+            text.update_idletasks()
+
+        latencies.append(time.perf_counter() - t0)
+
+    took = time.perf_counter() - start
+
+    name = f"limit {max_lines}" if max_lines else "unlimited"
+    if text is not None:
+        name += " + tk"
+        text.delete("1.0", "end")
+
+    first = sum(latencies[:10]) / 10 * 1e3
+    last = sum(latencies[-10:]) / 10 * 1e3
+    print(
+        f"{name:>18}: {took:6.2f}s total, peak {peak / 1e6:8.1f} MB, "
+        f"batch latency {first:6.2f} ms (start) -> {last:6.2f} ms (end)"
+    )
+
+
+def main() -> None:
+    n_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    text = None
+    try:
+        root = tkinter.Tk()
+        text = tkinter.Text(root)
+
+    except tkinter.TclError:
+        print("no display, skipping the tk widget")
+
+    for max_lines in (0, 10_000):
+        run(n_lines, max_lines)
+        if text is not None:
+            run(n_lines, max_lines, text)
+
+
+if __name__ == "__main__":
+    main()
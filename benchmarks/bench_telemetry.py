@@ -0,0 +1,90 @@
+"""
+benchmarks/bench_telemetry.py
+
+sensor samples printed as text vs. sent over the telemetry pipe
+
+run from the repository root:
+    python -m benchmarks.bench_telemetry [samples]
+
+The program sends the same samples (3 channels) both ways. "ui thread" is
+the time the ui spends on them: for text draining the capture into the
+scrollback (without tk, the real TermBox costs more), for telemetry
+reducing every channel to 800 pixel columns once.
+"""
+from ui._session import Launcher
+from ui._series import min_max
+from time import perf_counter, sleep
+import sys
+
+
+TEXT_CHILD = (
+    "import sys\n"
+    "out = sys.stdout\n"
+    "for i in range(int(sys.argv[1])):\n"
+    "    out.write(f'{i % 3}={i * .5}\\n')\n"
+)
+
+TELEMETRY_CHILD = (
+    "import sys\n"
+    "from ui._telemetry import TelemetryWriter\n"
+    "writer = TelemetryWriter()\n"
+    "for i in range(int(sys.argv[1])):\n"
+    "    writer.send(i % 3, i * .5)\n"
+    "writer.close()\n"
+)
+
+
+def text_path(launcher: Launcher, samples: int) -> tuple[float, float, int]:
+    """
+    :return: seconds until everything arrived, seconds in the ui thread,
+        samples received
+    """
+    start = perf_counter()
+    session = launcher.launch([sys.executable, "-c", TEXT_CHILD, str(samples)])
+    ui = 0.
+    while True:
+        finished = session.finished
+        took = perf_counter()
+        session.pump()
+        ui += perf_counter() - took
+        if finished:
+            break
+
+        sleep(1 / 30)
+
+    total = perf_counter() - start
+    received = len(session.scrollback)
+    session.stop()
+    return total, ui, received
+
+
+def telemetry_path(launcher: Launcher, samples: int) -> tuple[float, float, int]:
+    start = perf_counter()
+    session = launcher.launch([sys.executable, "-c", TELEMETRY_CHILD, str(samples)])
+    while not session.telemetry.finished:
+        sleep(1 / 30)
+
+    total = perf_counter() - start
+    took = perf_counter()
+    for ring in session.telemetry.channels.values():
+        min_max(ring.latest()[1], 800)
+
+    ui = perf_counter() - took
+    received = session.telemetry.n_received
+    session.stop()
+    return total, ui, received
+
+
+def main() -> None:
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    launcher = Launcher(run_mode="pipe", scrollback_lines=0, telemetry_samples=samples)
+    for name, path in (("text", text_path), ("telemetry", telemetry_path)):
+        total, ui, received = path(launcher, samples)
+        print(
+            f"{name:>9}: {received} samples in {total:5.2f} s "
+            f"({received / total / 1000:6.1f} k/s), ui thread {ui * 1e3:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
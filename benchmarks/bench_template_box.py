@@ -0,0 +1,195 @@
+"""
+benchmarks/bench_template_box.py
+
+cost of updating the TemplateBox buttons with 50 buttons, compared to
+destroying and recreating all of them (what it did before)
+
+run from the repository root:
+    python -m benchmarks.bench_template_box [buttons] [repeats]
+
+with a display real buttons are created and the time per update is
+printed, without one the buttons are replaced by stubs and only the widget
+operations (create, configure, grid, destroy) are counted
+"""
+from unittest import mock
+import typing as tp
+import tkinter
+import time
+import sys
+
+
+Keyboard = list[tuple[str, str]]
+
+
+class StubVar:
+    """
+    stands in for the tk Variable the buttons are read from
+    """
+    def __init__(self) -> None:
+        self._value: Keyboard = []
+        self._callbacks: list[tp.Callable] = []
+
+    def get(self) -> Keyboard:
+        return self._value
+
+    def set(self, value: Keyboard) -> None:
+        self._value = value
+        for callback in self._callbacks:
+            callback()
+
+    def trace_add(self, _mode, callback) -> None:
+        self._callbacks.append(callback)
+
+
+class StubButton:
+    """
+    stands in for CTkButton, counts what is done to it
+    """
+    ops: dict[str, int] = {}
+
+    def __init__(self, *_args, **_kwargs) -> None:
+        self._count("create")
+
+    @classmethod
+    def _count(cls, op: str) -> None:
+        cls.ops[op] = cls.ops.get(op, 0) + 1
+
+    def configure(self, **_kwargs) -> None:
+        self._count("configure")
+
+    def grid(self, **_kwargs) -> None:
+        self._count("grid")
+
+    def grid_forget(self) -> None:
+        self._count("grid_forget")
+
+    def destroy(self) -> None:
+        self._count("destroy")
+
+
+def scenarios(n: int) -> list[tuple[str, Keyboard, Keyboard]]:
+    """
+    (name, keyboard before, keyboard after)
+    """
+    base = [(f"button {i}", chr(ord("a") + i % 26)) for i in range(n)]
+    edited = list(base)
+    edited[n // 2] = (edited[n // 2][0] + "x", edited[n // 2][1])
+    return [
+        ("unchanged", base, list(base)),
+        ("edit one label", base, edited),
+        ("append one", base, base + [("new", "n")]),
+        ("remove first", base, base[1:]),
+        ("move last to top", base, base[-1:] + base[:-1]),
+        ("replace all", base, [(f"other {i}", "x") for i in range(n)]),
+    ]
+
+
+def full_rebuild(box, old: list, buttons: Keyboard, button_cls) -> list:
+    """
+    the old `_update_buttons`: destroy everything, create everything
+    """
+    for button in old:
+        button.grid_forget()
+        button.destroy()
+
+    new = []
+    for i, (label, key) in enumerate(buttons):
+        new.append(button_cls(box, text=label, corner_radius=15,
+                              command=lambda k=key: box.press(k), fg_color="#3a7ebf"))
+        new[-1].grid(row=i, column=0, sticky="NSEW", pady=5, columnspan=2)
+
+    return new
+
+
+def run_tk(n: int, repeats: int) -> None:
+    import customtkinter as ctk
+    from ui._template_box import TemplateBox
+
+    root = ctk.CTk()
+    var = ctk.Variable()
+    box = TemplateBox(root, var, lambda *_args: None)
+    box.pack(fill="both", expand=True)
+    rebuild_box = TemplateBox(root, ctk.Variable(), lambda *_args: None)
+
+    for name, before, after in scenarios(n):
+        took = 0.
+        took_rebuild = 0.
+        for _ in range(repeats):
+            var.set(before)
+            root.update()
+            start = time.perf_counter()
+            var.set(after)
+            root.update()
+            took += time.perf_counter() - start
+
+            old = full_rebuild(rebuild_box, [], before, ctk.CTkButton)
+            root.update()
+            start = time.perf_counter()
+            new = full_rebuild(rebuild_box, old, after, ctk.CTkButton)
+            root.update()
+            took_rebuild += time.perf_counter() - start
+            full_rebuild(rebuild_box, new, [], ctk.CTkButton)
+
+        print(
+            f"{name:>18}: {took / repeats * 1e3:7.2f} ms "
+            f"(full rebuild {took_rebuild / repeats * 1e3:7.2f} ms)"
+        )
+
+    root.destroy()
+
+
+def run_stub(n: int) -> None:
+    import customtkinter as ctk
+    from ui import _template_box
+
+    frame_patches = [
+        mock.patch.object(ctk.CTkFrame, "__init__", lambda *_args, **_kwargs: None),
+        mock.patch.object(ctk.CTkFrame, "configure", lambda *_args, **_kwargs: None),
+        mock.patch.object(ctk.CTkFrame, "grid_columnconfigure", lambda *_args, **_kwargs: None),
+        mock.patch.object(ctk.CTkFrame, "grid_rowconfigure", lambda *_args, **_kwargs: None),
+        mock.patch.object(_template_box, "CTkButton", StubButton),
+    ]
+    for patch in frame_patches:
+        patch.start()
+
+    try:
+        for name, before, after in scenarios(n):
+            var = StubVar()
+            box = _template_box.TemplateBox(None, var, lambda *_args: None)
+            var.set(before)
+            StubButton.ops = {}
+            var.set(after)
+            ops = dict(StubButton.ops)
+
+            old = full_rebuild(box, [], before, StubButton)
+            StubButton.ops = {}
+            full_rebuild(box, old, after, StubButton)
+            rebuild = sum(StubButton.ops.values())
+
+            print(
+                f"{name:>18}: {sum(ops.values()):4d} widget operations "
+                f"(full rebuild {rebuild:4d})  {ops}"
+            )
+
+    finally:
+        for patch in frame_patches:
+            patch.stop()
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    try:
+        tkinter.Tk().destroy()
+
+    except tkinter.TclError:
+        print("no display, counting widget operations with stub buttons")
+        run_stub(n)
+        return
+
+    run_tk(n, repeats)
+
+
+if __name__ == "__main__":
+    main()
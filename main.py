@@ -7,52 +7,45 @@ main.py
 Author:
 Nilusink
 """
-from ui import RunFrame, SettingsFrame, KeyboardFrame, ControlFrame
-import customtkinter as ctk
-import typing as tp
-import json
+from time import perf_counter
+import sys
 import os
 
+# sys and os are loaded by the interpreter itself, importing them first costs
+# nothing measurable
+_START: float = perf_counter()
 
-# types
-class WindowConfig(tp.TypedDict):
-    appearance_mode: tp.Literal["dark", "light"]
-    program_directories: list[str]
-    program_ignores: list[str]
-    keyboard: list[tuple[str, str]]
-    fullscreen: bool
-    theme: str
+# customtkinter imports distutils, with setuptools installed that loads all
+# of setuptools, which takes longer than the rest of the ui together.
+# python < 3.12 still has the lightweight original.
+_SET_DISTUTILS: bool = sys.version_info < (3, 12) \
+    and "SETUPTOOLS_USE_DISTUTILS" not in os.environ
+if _SET_DISTUTILS:
+    os.environ["SETUPTOOLS_USE_DISTUTILS"] = "stdlib"
 
+# imported after the environment is set (see above)
+from ui import RunFrame, Scheduler, PROFILER, StartupTimer, ConfigStore, WindowConfig, SUPERVISOR  # noqa: E402
+import customtkinter as ctk  # noqa: E402
+import typing as tp  # noqa: E402
+import ui  # noqa: E402
 
-CONFIG_PAH: str = "./config.json"
-WINDOW_CONFIG: WindowConfig = {
-    "appearance_mode": "dark",
-    "program_directories": [
-        "/home/access/projects/"
-    ],
-    "program_ignores": [],
-    "theme": "dark-blue",
-    "fullscreen": True,
-    "keyboard": [
-        ("s", "s"),
-        ("a", "a"),
-        ("Return", "\n")
-    ]
-}
-
+if _SET_DISTUTILS:
+    # don't pass it on to the programs that are run
+    del os.environ["SETUPTOOLS_USE_DISTUTILS"]
 
-# try to load config
-if os.path.exists(CONFIG_PAH):
-    with open(CONFIG_PAH, "r") as inp:
-        config: WindowConfig = json.load(inp)
+STARTUP = StartupTimer(_START)
+STARTUP.mark("imports")
 
-    for key, value in config.items():
-        WINDOW_CONFIG[key] = value
 
+CONFIG_PAH: str = "./config.json"
+CONFIG = ConfigStore(CONFIG_PAH)
+WINDOW_CONFIG: WindowConfig = CONFIG.config
 
-# write adjusted config to make sure every key is present
-with open(CONFIG_PAH, "w") as out:
-    json.dump(WINDOW_CONFIG, out, indent=4)
+# how long a program gets to exit after SIGINT / SIGTERM
+SUPERVISOR.configure(
+    int_timeout=WINDOW_CONFIG["stop_int_timeout"],
+    term_timeout=WINDOW_CONFIG["stop_term_timeout"]
+)
 
 
 # display configuration
@@ -66,22 +59,25 @@ if os.environ.get('DISPLAY', '') == '':
 # theme
 ctk.set_appearance_mode(WINDOW_CONFIG["appearance_mode"])
 ctk.set_default_color_theme(WINDOW_CONFIG["theme"])
+STARTUP.mark("config")
 
 
 class Window(ctk.CTk):
     """
     main program window
     """
-    __running: bool = True
-
-    __frames: dict[str, tp.Union[RunFrame, SettingsFrame, KeyboardFrame, ControlFrame, ctk.CTkFrame]]
-    _FRAME_SEQUENCE: list[str] = ["Run", "Settings", "Keyboard", "Control"]
+    __frames: dict[str, ctk.CTkFrame]
+    __frame_factories: dict[str, tp.Callable[[], ctk.CTkFrame]]
+    _FRAME_SEQUENCE: list[str] = ["Run", "Plot", "Logs", "Settings", "Keyboard", "Control"]
     _keyboard_var: ctk.Variable
+    _scheduler: Scheduler
 
     def __init__(self) -> None:
         # init parent class
         super().__init__()
 
+        self._scheduler = Scheduler(self, WINDOW_CONFIG["max_fps"])
+
         self._keyboard_var = ctk.Variable()
         self._keyboard_var.set(WINDOW_CONFIG["keyboard"])
 
@@ -96,6 +92,10 @@ class Window(ctk.CTk):
 
         # events
         self.protocol("WM_DELETE_WINDOW", self.end)
+        CONFIG.subscribe(
+            lambda _key, value: self.attributes("-fullscreen", value),
+            "fullscreen"
+        )
         # ui layout
         self.grid_columnconfigure((0, 1), weight=1)
         self.grid_rowconfigure(0, weight=0)
@@ -119,24 +119,42 @@ class Window(ctk.CTk):
             font=("Sans-Serif", 40)
         ).grid(row=0, column=1)
 
+        # only the run frame is needed right away, the others are built
+        # when they are first selected
         self.__frames = {
-            "Run": RunFrame(WINDOW_CONFIG, self._keyboard_var, self, corner_radius=30),
-            "Settings": SettingsFrame(WINDOW_CONFIG, CONFIG_PAH, self, corner_radius=30),
-            "Keyboard": KeyboardFrame(self, WINDOW_CONFIG, CONFIG_PAH, self._keyboard_var, font=("Sans-Serif", 30), corner_radius=30),
-            "Control": ControlFrame(self, font=("Sans-Serif", 30), corner_radius=30)
+            "Run": RunFrame(WINDOW_CONFIG, self._keyboard_var, self._scheduler, self, corner_radius=30),
+        }
+        self.__frame_factories = {
+            "Plot": lambda: ui.PlotFrame(self.__frames["Run"].manager, self._scheduler, self, corner_radius=30),
+            "Logs": lambda: ui.LogFrame(WINDOW_CONFIG, self, corner_radius=30),
+            "Settings": lambda: ui.SettingsFrame(CONFIG, self, corner_radius=30),
+            "Keyboard": lambda: ui.KeyboardFrame(self, CONFIG, self._keyboard_var, font=("Sans-Serif", 30), corner_radius=30),
+            "Control": lambda: ui.ControlFrame(self, font=("Sans-Serif", 30), corner_radius=30)
         }
 
         self._change_frame("Run")
+        STARTUP.mark("window")
+
+    def _get_frame(self, name: str) -> ctk.CTkFrame:
+        """
+        get a frame, build it if it's the first time
+        """
+        if name not in self.__frames:
+            with PROFILER.stage(f"window.build.{name}"):
+                self.__frames[name] = self.__frame_factories[name]()
+
+        return self.__frames[name]
 
     def _change_frame(self, value: tp.Literal["Run", "Settings"]) -> None:
         """
         change the currently displayed frame
         """
-        for frame in self.__frames:
-            if self.__frames[frame] != self.__frames[value]:
-                self.__frames[frame].grid_forget()
+        selected = self._get_frame(value)
+        for frame in self.__frames.values():
+            if frame != selected:
+                frame.grid_forget()
 
-        self.__frames[value].grid(
+        selected.grid(
                 row=1,
                 column=0,
                 padx=30,
@@ -144,26 +162,46 @@ class Window(ctk.CTk):
                 sticky="nsew",
                 columnspan=2
             )
-        self.__frames[value].focus_force()
+        selected.focus_force()
 
     def mainloop(self) -> None:
         """
         run the program
         """
-        while self.__running:
-            self.__frames["Run"].update()
-            super().update_idletasks()
-            super().update()
+        self._scheduler.request_frame()
+        # once tk handled everything queued at startup, the window is usable
+        self.after(0, lambda: self.after_idle(self._started))
+        super().mainloop()
+
+    def _started(self) -> None:
+        STARTUP.mark("interactive")
+        for name, took in STARTUP.as_dict().items():
+            PROFILER.gauge(f"startup.{name}", took)
+
+        print(STARTUP.report(WINDOW_CONFIG["startup_target"]))
 
     def end(self, *_trash) -> None:
         """
         close the program
         """
-        with open(CONFIG_PAH, "w") as out:
-            json.dump(WINDOW_CONFIG, out, indent=4)
+        # write pending config changes now
+        CONFIG.close()
 
-        self.__running = False
         self.__frames["Run"].end()
+        for name in ("Plot", "Logs"):
+            if name in self.__frames:
+                self.__frames[name].end()
+
+        self._scheduler.close()
+
+        # timings for offline comparison
+        if WINDOW_CONFIG["profile_path"]:
+            try:
+                PROFILER.dump(WINDOW_CONFIG["profile_path"])
+
+            except OSError as e:
+                print(f"can't write profile: {e}")
+
         self.destroy()
         exit(0)
 
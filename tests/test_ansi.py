@@ -0,0 +1,52 @@
+from ui._tk_term_colors import AnsiParser, PALETTE_256, SIMPLE_COLORS
+
+
+RED = SIMPLE_COLORS["red"][0]
+
+
+def test_plain_text():
+    assert AnsiParser().feed("hello\n") == [("hello\n", ())]
+
+
+def test_colors_and_reset():
+    parser = AnsiParser()
+    assert parser.feed("a\x1b[31mb\x1b[0mc") == [("a", ()), ("b", (RED,)), ("c", ())]
+
+
+def test_other_sequences_are_dropped():
+    parser = AnsiParser()
+    assert parser.feed("\x1b[2J\x1b[Ha\x1b]0;title\x07b") == [("ab", ())]
+
+
+def test_split_escape_sequence():
+    parser = AnsiParser()
+    assert parser.feed("a\x1b[3") == [("a", ())]
+    assert parser.feed("1mb") == [("b", (RED,))]
+    assert parser.style == (RED,)
+
+
+def test_split_sequence_is_flushed_when_final():
+    parser = AnsiParser()
+    assert parser.feed("a\x1b[3", final=True) == [("a\x1b[3", ())]
+
+
+def test_256_colors():
+    parser = AnsiParser()
+    assert parser.feed("\x1b[38;5;196mx") == [("x", (PALETTE_256[196],))]
+    assert parser.feed("\x1b[48;5;21my") == [
+        ("y", (PALETTE_256[196], "bg:" + PALETTE_256[21]))
+    ]
+    assert parser.feed("\x1b[39;49mz") == [("z", ())]
+
+
+def test_truecolor_is_rounded_to_the_palette():
+    parser = AnsiParser()
+    assert parser.feed("\x1b[38;2;255;0;0mx") == [("x", (PALETTE_256[196],))]
+    # colon separated form
+    assert parser.feed("\x1b[38:2:0:0:255my") == [("y", (PALETTE_256[21],))]
+    assert parser.feed("\x1b[38;2;128;128;128mz") == [("z", (PALETTE_256[244],))]
+
+
+def test_bold_standard_colors_are_bright():
+    parser = AnsiParser()
+    assert parser.feed("\x1b[1;31mx") == [("x", (PALETTE_256[9],))]
@@ -0,0 +1,68 @@
+from ui._config import ConfigStore, validate, CONFIG_VERSION, DEFAULT_CONFIG
+import json
+import os
+
+
+def test_migrate_unversioned_config():
+    config, problems = validate({"max_fps": 60, "run_mode": "pipe"})
+    assert problems == []
+    assert config["max_fps"] == 60
+    assert config["run_mode"] == "pipe"
+    assert config["scrollback_lines"] == DEFAULT_CONFIG["scrollback_lines"]
+
+
+def test_invalid_values_fall_back():
+    config, problems = validate(
+        {"version": CONFIG_VERSION, "max_fps": -1, "what": 1}
+    )
+    assert config["max_fps"] == DEFAULT_CONFIG["max_fps"]
+    assert len(problems) == 2
+
+
+def test_keyboard_tuples():
+    config, _ = validate({"keyboard": [["a", "b"]]})
+    assert config["keyboard"] == [("a", "b")]
+
+
+def test_old_file_is_rewritten(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"max_fps": 60}))
+
+    store = ConfigStore(str(path), debounce=60)
+    store.close()
+
+    data = json.loads(path.read_text())
+    assert data["version"] == CONFIG_VERSION
+    assert data["max_fps"] == 60
+    assert set(data) == {"version", *DEFAULT_CONFIG}
+
+
+def test_set_writes_atomically(tmp_path):
+    path = tmp_path / "config.json"
+    store = ConfigStore(str(path), debounce=60)
+    changes = []
+    store.subscribe(lambda key, value: changes.append((key, value)), "max_fps")
+
+    assert store.set("max_fps", 10)
+    assert not store.set("max_fps", 10)
+    assert changes == [("max_fps", 10)]
+
+    store.flush()
+    assert json.loads(path.read_text())["max_fps"] == 10
+    # the temporary file was renamed over the config
+    assert os.listdir(tmp_path) == ["config.json"]
+    store.close()
+
+
+def test_set_rejects_invalid(tmp_path):
+    store = ConfigStore(str(tmp_path / "config.json"), debounce=60)
+    try:
+        store.set("max_fps", "fast")
+
+    except ValueError:
+        pass
+
+    else:
+        raise AssertionError("invalid value accepted")
+
+    store.close()
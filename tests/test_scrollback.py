@@ -0,0 +1,63 @@
+from ui._scrollback import Scrollback
+
+
+def text_of(scrollback: Scrollback) -> str:
+    return "".join([text for text, _ in scrollback.iter_spans()])
+
+
+def test_lines_and_partial():
+    scrollback = Scrollback(0)
+    assert scrollback.append([("a\nb", ("x",)), ("c\nd", ())]) == 2
+    assert [text for text, _ in scrollback.lines] == ["a", "bc"]
+    assert scrollback.lines[1][1] == ((1, ("x",)), (1, ()))
+    assert scrollback.partial == [("d", ())]
+    assert text_of(scrollback) == "a\nbc\nd"
+
+
+def test_trim_in_batches():
+    scrollback = Scrollback(max_lines=10, trim_batch=5)
+    scrollback.append([("x\n" * 15, ())])
+    assert len(scrollback) == 15
+    assert scrollback.take_trimmed() == 0
+
+    scrollback.append([("y\n", ())])
+    assert len(scrollback) == 10
+    assert scrollback.take_trimmed() == 6
+    assert scrollback.take_trimmed() == 0
+    assert scrollback.first_line == 6
+
+
+def test_trim_by_bytes():
+    scrollback = Scrollback(max_lines=0, max_bytes=100)
+    scrollback.append([("123456789\n" * 20, ())])
+    assert scrollback.n_bytes <= 100
+    assert scrollback.take_trimmed() == 20 - len(scrollback)
+
+
+def test_partial_line_cap():
+    scrollback = Scrollback(0, max_partial=100)
+    scrollback.append([("start\n", ())])
+    scrollback.append([("a" * 60, ())])
+    assert scrollback.take_partial_trimmed() == 0
+
+    scrollback.append([("b" * 60, ())])
+    cut = scrollback.take_partial_trimmed()
+    assert cut > 0
+    assert scrollback.n_bytes == len("start\n") + 120 - cut
+    assert text_of(scrollback) == "start\n" + ("a" * 60 + "b" * 60)[cut:]
+
+    # the cut line completes normally, later lines aren't affected
+    scrollback.append([("\nnext\n", ())])
+    assert scrollback.take_partial_trimmed() == 0
+    assert [text for text, _ in scrollback.lines][-1] == "next"
+    assert len(scrollback) == 3
+
+
+def test_clear():
+    scrollback = Scrollback(max_lines=1, trim_batch=0)
+    scrollback.append([("a\nb\nc", ())])
+    scrollback.clear()
+    assert len(scrollback) == 0
+    assert scrollback.n_bytes == 0
+    assert scrollback.take_trimmed() == 0
+    assert scrollback.first_line == 0
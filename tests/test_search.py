@@ -0,0 +1,73 @@
+from ui._scrollback import Scrollback
+from ui._search import ScrollbackSearch
+
+
+class FakeText:
+    """
+    what TermBox does to its texbox, as plain lines
+    """
+    def __init__(self, scrollback: Scrollback) -> None:
+        self.scrollback = scrollback
+        self.lines = [""]
+
+    def write(self, text: str) -> None:
+        first, *rest = text.split("\n")
+        self.lines[-1] += first
+        self.lines += rest
+
+        self.scrollback.append([(text, ())])
+        cut = self.scrollback.take_partial_trimmed()
+        self.lines[-1] = self.lines[-1][cut:]
+        del self.lines[:self.scrollback.take_trimmed()]
+
+    def at(self, match) -> str:
+        line = self.lines[match.line - self.scrollback.first_line]
+        return line[match.start:match.end]
+
+
+def test_matches_across_batches():
+    scrollback = Scrollback(0)
+    search = ScrollbackSearch(scrollback, batch=3)
+    search.set_query("needle")
+
+    scrollback.append([("".join(f"{i} needle\n" for i in range(10)), ())])
+    found = []
+    while search.pending:
+        found += search.scan()
+
+    assert [m.line for m in found] == list(range(10))
+    assert all(m.start == len(str(m.line)) + 1 for m in found)
+
+
+def test_match_on_capped_line():
+    scrollback = Scrollback(0, max_partial=100)
+    text = FakeText(scrollback)
+    search = ScrollbackSearch(scrollback)
+    search.set_query("needle")
+
+    text.write("start\n")
+    # a progress bar without newlines, its start is cut twice
+    for i in range(30):
+        text.write(f"[{i:02}]...")
+
+    text.write("needle\n")
+
+    found = search.scan()
+    assert len(found) == 1
+    assert text.at(found[0]) == "needle"
+    assert text.lines[1] == scrollback.lines[1][0]
+
+
+def test_trimmed_matches_are_forgotten():
+    scrollback = Scrollback(max_lines=5, trim_batch=0)
+    text = FakeText(scrollback)
+    search = ScrollbackSearch(scrollback)
+    search.set_query("x")
+
+    text.write("x\n" * 4)
+    assert len(search.scan()) == 4
+
+    text.write("x\n" * 4)
+    search.scan()
+    assert [m.line for m in search.matches] == [3, 4, 5, 6, 7]
+    assert all(text.at(m) == "x" for m in search.matches)
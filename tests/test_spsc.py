@@ -0,0 +1,40 @@
+from ui._spsc import SpscQueue
+import threading
+
+
+def test_sizes_and_high_water():
+    queue = SpscQueue()
+    queue.put("ab", 2)
+    queue.put("cde", 3)
+    assert len(queue) == 2
+    assert queue.size == 5
+
+    assert queue.drain() == ["ab", "cde"]
+    assert len(queue) == 0
+    assert queue.size == 0
+    assert queue.high_water == 2
+    assert queue.high_water_size == 5
+
+    queue.reset_high_water()
+    assert queue.high_water == 0
+
+
+def test_order_across_threads():
+    queue = SpscQueue()
+    n = 100_000
+
+    def produce() -> None:
+        for i in range(n):
+            queue.put(i)
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+
+    received: list[int] = []
+    while producer.is_alive() or len(queue):
+        received += queue.drain()
+
+    producer.join()
+    received += queue.drain()
+    assert received == list(range(n))
+    assert queue.n_put == n
@@ -0,0 +1,51 @@
+from ui._throttle import OutputThrottle, SKIPPED_STYLE
+
+
+def lines(spans) -> int:
+    return sum([text.count("\n") for text, _ in spans])
+
+
+def test_rate_limit_tokens():
+    throttle = OutputThrottle(max_rate=100, max_lines=0)
+    throttle.push([("x\n" * 500, ())])
+
+    # the first take may catch up on `burst` seconds
+    assert lines(throttle.take(now=0.)) == 50
+    assert lines(throttle.take(now=.1)) == 10
+    # nothing elapsed, nothing to show
+    assert throttle.take(now=.1) == []
+    # unused rate is only saved up to `burst` seconds
+    assert lines(throttle.take(now=10.)) == 50
+    assert throttle.pending
+
+
+def test_partial_lines_pass_without_tokens():
+    throttle = OutputThrottle(max_rate=10, max_lines=0)
+    throttle.push([("a\n" * 5 + "b", ())])
+    assert throttle.take(now=0.) == [("a\n" * 5 + "b", ())]
+    assert not throttle.pending
+
+
+def test_unlimited_rate():
+    throttle = OutputThrottle(max_rate=0)
+    throttle.push([("x\n" * 10, ()), ("y", ())])
+    assert throttle.take(now=0.) == [("x\n" * 10, ()), ("y", ())]
+
+
+def test_backlog_is_skipped():
+    throttle = OutputThrottle(max_rate=100, max_lines=20)
+    throttle.push([("".join(f"{i}\n" for i in range(100)), ())])
+    assert throttle.skipped_lines == 80
+
+    out = throttle.take(now=0.)
+    assert out[0] == ("… 80 lines skipped\n", SKIPPED_STYLE)
+    # the newest lines are kept
+    assert out[1][0].startswith("80\n")
+
+
+def test_take_all():
+    throttle = OutputThrottle(max_rate=2, max_lines=0)
+    throttle.push([("x\n" * 10, ())])
+    assert lines(throttle.take(now=0.)) == 1
+    assert lines(throttle.take_all()) == 9
+    assert not throttle.pending
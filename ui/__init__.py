@@ -1,4 +1,42 @@
-from ._settings_frame import SettingsFrame
-from ._keyboard_frame import KeyboardFrame
-from ._control_frame import ControlFrame
 from ._run_frame import RunFrame
+from ._scheduler import Scheduler
+from ._profiler import PROFILER
+from ._startup import StartupTimer
+from ._supervisor import SUPERVISOR
+from ._config import ConfigStore, WindowConfig
+import importlib
+
+
+__all__ = [
+    "RunFrame",
+    "Scheduler",
+    "PROFILER",
+    "StartupTimer",
+    "SUPERVISOR",
+    "ConfigStore",
+    "WindowConfig",
+    "SettingsFrame",
+    "KeyboardFrame",
+    "ControlFrame",
+    "LogFrame",
+    "PlotFrame",
+]
+
+
+# frames not needed for running programs are imported on first use
+_LAZY: dict[str, str] = {
+    "SettingsFrame": "._settings_frame",
+    "KeyboardFrame": "._keyboard_frame",
+    "ControlFrame": "._control_frame",
+    "LogFrame": "._log_frame",
+    "PlotFrame": "._plot_frame",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY:
+        value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+        globals()[name] = value
+        return value
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,288 @@
+"""
+_capture.py
+
+captures stdout and stderr of a running program
+"""
+from ._tk_term_colors import SIMPLE_COLORS, AnsiParser, Style
+from ._reader import ChunkReader, StreamDecoder
+from ._pty import close_fd, set_winsize
+from ._spsc import SpscQueue
+from ._profiler import PROFILER
+from traceback import format_exc
+from time import monotonic
+import typing as tp
+import subprocess
+import threading
+import signal
+import heapq
+import os
+
+
+ERROR_STYLE: Style = (SIMPLE_COLORS["red"][0],)
+
+
+class CaptureSink(tp.Protocol):
+    """
+    receives the raw output of a run (e.g. a RunLog)
+    """
+    def write(self, stream: str, data: bytes) -> None: ...
+
+    def close(self, exit_code: tp.Union[int, None] = None) -> None: ...
+
+
+class Chunk(tp.NamedTuple):
+    timestamp: float
+    stream: str
+    spans: list[tuple[str, Style]]
+
+
+class Capture:
+    """
+    drains stdout and stderr of a program concurrently, each on its own
+    thread, so neither pipe can fill up and block the program
+
+    Chunks are stamped with a monotonic timestamp when read and merged back
+    into one ordered stream by `drain`. stderr is shown in red.
+    """
+    proc: subprocess.Popen = ...
+    running: bool = True
+    exit_time: tp.Union[float, None] = None
+
+    _queues: dict[str, SpscQueue[Chunk]] = ...
+    _on_output: tp.Callable[[], None] = ...
+    _active: bool = True
+    _threads: list[threading.Thread] = ...
+    _pty_fd: tp.Union[int, None] = None
+    _stdin_fd: tp.Union[int, None] = None
+    _fd_lock: threading.Lock = ...
+    _sinks: tp.Sequence[CaptureSink] = ...
+    _n_unfinished: int = 3  # both readers and the exit waiter
+
+    def __init__(
+            self,
+            proc: subprocess.Popen,
+            on_output: tp.Union[tp.Callable[[], None], None] = None,
+            pty_fd: tp.Union[int, None] = None,
+            sinks: tp.Sequence[CaptureSink] = (),
+            stdout_fd: tp.Union[int, None] = None,
+            stderr_fd: tp.Union[int, None] = None,
+            stdin_fd: tp.Union[int, None] = None
+    ) -> None:
+        """
+        :param proc: program with piped stdout and stderr
+        :param on_output: called from the capture threads on new output
+            and when the program exits
+        :param pty_fd: master of the pseudo terminal the program's stdin and
+            stdout are attached to, closed once the program is done
+        :param sinks: get every chunk of raw output, closed with the exit
+            code once the program exited and both streams are read
+        :param stdout_fd: read end of the program's stdout, if it wasn't
+            piped by Popen (closed once read)
+        :param stderr_fd: read end of the program's stderr, if it wasn't
+            piped by Popen (closed once read)
+        :param stdin_fd: write end of the program's stdin, if it wasn't
+            piped by Popen (closed once the program is done)
+        """
+        self._sinks = sinks
+        self.proc = proc
+        self._pty_fd = pty_fd
+        self._stdin_fd = stdin_fd
+        if pty_fd is not None:
+            stdout_fd = pty_fd
+        self._fd_lock = threading.Lock()
+        self._on_output = on_output if on_output is not None else lambda: None
+        self._queues = {"stdout": SpscQueue(), "stderr": SpscQueue()}
+
+        # daemon threads, waiting for a stuck program mustn't block exiting
+        self._threads = [
+            threading.Thread(
+                target=self._read_stream,
+                args=("stdout", proc.stdout if stdout_fd is None else stdout_fd),
+                daemon=True
+            ),
+            threading.Thread(
+                target=self._read_stream,
+                args=("stderr", proc.stderr if stderr_fd is None else stderr_fd),
+                daemon=True
+            ),
+            threading.Thread(target=self._wait_exit, daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _read_stream(self, stream: str, pipe: tp.Union[tp.IO, int]) -> None:
+        """
+        thread. reads one pipe until EOF
+        """
+        reader = ChunkReader()
+        reader.register(pipe, stream)
+        decoder = StreamDecoder()
+        parser = AnsiParser()
+        queue = self._queues[stream]
+        # only this thread writes these counters
+        bytes_counter = f"capture.{stream}.bytes"
+        reads_counter = f"capture.{stream}.reads"
+        try:
+            while self._active and reader.active:
+                chunks = reader.read(timeout=.1)
+                for _, data in chunks:
+                    timestamp = monotonic()
+                    PROFILER.count(bytes_counter, len(data))
+                    PROFILER.count(reads_counter)
+                    for sink in self._sinks:
+                        sink.write(stream, data)
+
+                    spans = parser.feed(
+                        decoder.decode(data, final=not data), final=not data
+                    )
+                    if stream == "stderr":
+                        spans = [(text, ERROR_STYLE) for text, _ in spans]
+
+                    if spans:
+                        queue.put(
+                            Chunk(timestamp, stream, spans),
+                            sum([len(text) for text, _ in spans])
+                        )
+
+                if chunks:
+                    self._on_output()
+
+        except Exception:
+            print(f"{stream} reader exited: ", format_exc())
+            raise
+
+        finally:
+            reader.close()
+            if isinstance(pipe, int):
+                with self._fd_lock:
+                    close_fd(pipe)
+                    if pipe == self._pty_fd:
+                        self._pty_fd = None
+
+            self._finish()
+
+    def _wait_exit(self) -> None:
+        """
+        thread. waits for the program to exit
+        """
+        self.proc.wait()
+        self.exit_time = monotonic()
+        self.running = False
+        self._on_output()
+        self._finish()
+
+    def _finish(self) -> None:
+        """
+        called by every thread when done, the last one closes the sinks
+        """
+        with self._fd_lock:
+            self._n_unfinished -= 1
+            if self._n_unfinished:
+                return
+
+            close_fd(self._stdin_fd)
+            self._stdin_fd = None
+
+        for sink in self._sinks:
+            sink.close(self.proc.returncode)
+
+    def write(self, data: bytes) -> None:
+        """
+        send input to the program
+        """
+        try:
+            if self.proc.stdin is not None:
+                self.proc.stdin.write(data)
+                self.proc.stdin.flush()
+                return
+
+            with self._fd_lock:
+                fd = self._stdin_fd if self._stdin_fd is not None else self._pty_fd
+                if fd is not None:
+                    os.write(fd, data)
+
+        except OSError:
+            # the program closed its input
+            pass
+
+    def resize(self, cols: int, rows: int) -> None:
+        """
+        change the terminal size (pty only)
+        """
+        with self._fd_lock:
+            if self._pty_fd is None:
+                return
+
+            set_winsize(self._pty_fd, cols, rows)
+
+        if not self.running:
+            return
+
+        try:
+            pgid = os.getpgid(self.proc.pid)
+            if pgid != os.getpgrp():
+                # its own group, children of a wrapper or shell redraw too
+                os.killpg(pgid, signal.SIGWINCH)
+
+            else:
+                self.proc.send_signal(signal.SIGWINCH)
+
+        except (ProcessLookupError, PermissionError):
+            # exited meanwhile
+            pass
+
+    def join(self, timeout: float) -> bool:
+        """
+        wait until the program exited and all its output was read (and the
+        sinks are closed)
+
+        :return: False if that didn't happen within `timeout` seconds
+        """
+        deadline = monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(deadline - monotonic(), 0))
+
+        return self.finished
+
+    @property
+    def finished(self) -> bool:
+        """
+        True once the program exited and all its output was read
+        """
+        return self._n_unfinished == 0
+
+    @property
+    def returncode(self) -> tp.Union[int, None]:
+        return self.proc.returncode
+
+    def drain(self) -> list[tuple[str, Style]]:
+        """
+        take all captured output, stdout and stderr merged by time
+        """
+        streams = [queue.drain() for queue in self._queues.values()]
+
+        spans: list[tuple[str, Style]] = []
+        for chunk in heapq.merge(*streams, key=lambda c: c.timestamp):
+            spans.extend(chunk.spans)
+
+        return spans
+
+    @property
+    def queued(self) -> int:
+        """
+        characters read but not drained yet
+        """
+        return sum([queue.size for queue in self._queues.values()])
+
+    @property
+    def high_water(self) -> int:
+        """
+        most characters that were waiting in one stream's queue at once
+        """
+        return max([queue.high_water_size for queue in self._queues.values()])
+
+    def stop(self) -> None:
+        """
+        stop capturing (doesn't kill the program)
+        """
+        self._active = False
@@ -0,0 +1,406 @@
+"""
+_config.py
+
+the window config, validated, and saved without wearing out the SD card
+"""
+from traceback import format_exc
+import typing as tp
+import threading
+import atexit
+import time
+import json
+import copy
+import os
+
+
+class WindowConfig(tp.TypedDict):
+    appearance_mode: tp.Literal["dark", "light"]
+    program_directories: list[str]
+    program_ignores: list[str]
+    keyboard: list[tuple[str, str]]
+    fullscreen: bool
+    theme: str
+    max_fps: float
+    scrollback_lines: int
+    scrollback_bytes: int
+    run_mode: tp.Literal["pty", "pipe"]
+    log_directory: str
+    log_max_bytes: int
+    log_max_files: int
+    max_display_rate: float
+    throttle_lines: int
+    profile_path: str
+    startup_target: float
+    stop_int_timeout: float
+    stop_term_timeout: float
+    prewarm: bool
+    telemetry_samples: int
+    plot_samples: int
+
+
+CONFIG_VERSION: int = 2
+
+DEFAULT_CONFIG: WindowConfig = {
+    "appearance_mode": "dark",
+    "program_directories": [
+        "/home/access/projects/"
+    ],
+    "program_ignores": [],
+    "theme": "dark-blue",
+    "fullscreen": True,
+    "max_fps": 30,
+    "scrollback_lines": 10000,
+    "scrollback_bytes": 0,
+    "run_mode": "pty",
+    "log_directory": "",
+    "log_max_bytes": 64 * 1024 * 1024,
+    "log_max_files": 20,
+    "max_display_rate": 2000,
+    "throttle_lines": 1000,
+    "profile_path": "",
+    "startup_target": 1.0,
+    "stop_int_timeout": 1.0,
+    "stop_term_timeout": 2.0,
+    "prewarm": True,
+    "telemetry_samples": 100_000,
+    "plot_samples": 20_000,
+    "keyboard": [
+        ("s", "s"),
+        ("a", "a"),
+        ("Return", "\n")
+    ]
+}
+
+
+def _is_str_list(value: tp.Any) -> bool:
+    return isinstance(value, list) and all(isinstance(v, str) for v in value)
+
+
+def _is_keyboard(value: tp.Any) -> bool:
+    return isinstance(value, list) and all(
+        isinstance(v, (list, tuple)) and len(v) == 2
+        and all(isinstance(s, str) for s in v)
+        for v in value
+    )
+
+
+def _is_number(value: tp.Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_int(value: tp.Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+# checks for every key, a value failing its check is replaced by the default
+SCHEMA: dict[str, tp.Callable[[tp.Any], bool]] = {
+    "appearance_mode": lambda v: v in ("dark", "light"),
+    "program_directories": _is_str_list,
+    "program_ignores": _is_str_list,
+    "keyboard": _is_keyboard,
+    "fullscreen": lambda v: isinstance(v, bool),
+    "theme": lambda v: isinstance(v, str),
+    "max_fps": lambda v: _is_number(v) and v > 0,
+    "scrollback_lines": lambda v: _is_int(v) and v >= 0,
+    "scrollback_bytes": lambda v: _is_int(v) and v >= 0,
+    "run_mode": lambda v: v in ("pty", "pipe"),
+    "log_directory": lambda v: isinstance(v, str),
+    "log_max_bytes": lambda v: _is_int(v) and v >= 0,
+    "log_max_files": lambda v: _is_int(v) and v >= 0,
+    "max_display_rate": lambda v: _is_number(v) and v >= 0,
+    "throttle_lines": lambda v: _is_int(v) and v >= 0,
+    "profile_path": lambda v: isinstance(v, str),
+    "startup_target": lambda v: _is_number(v) and v >= 0,
+    "stop_int_timeout": lambda v: _is_number(v) and v >= 0,
+    "stop_term_timeout": lambda v: _is_number(v) and v >= 0,
+    "prewarm": lambda v: isinstance(v, bool),
+    "telemetry_samples": lambda v: _is_int(v) and v >= 0,
+    "plot_samples": lambda v: _is_int(v) and v >= 0,
+}
+
+
+def _migrate_1(config: dict) -> dict:
+    """
+    version 1: every config written before there was a version key, all
+    its keys are still valid (missing ones are filled in by `validate`)
+    """
+    return config
+
+
+# MIGRATIONS[n] turns a version n config into version n + 1
+MIGRATIONS: dict[int, tp.Callable[[dict], dict]] = {
+    1: _migrate_1,
+}
+
+
+def validate(data: tp.Any) -> tuple[WindowConfig, list[str]]:
+    """
+    migrate a loaded config to the current version and check every value
+
+    :return: the complete config, problems found
+    """
+    problems: list[str] = []
+    if not isinstance(data, dict):
+        return copy.deepcopy(DEFAULT_CONFIG), ["config is not an object"]
+
+    data = dict(data)
+    version = data.pop("version", 1)
+    if not _is_int(version) or version > CONFIG_VERSION:
+        problems.append(f"unknown config version {version!r}")
+        version = CONFIG_VERSION
+
+    while version < CONFIG_VERSION:
+        data = MIGRATIONS[version](data)
+        version += 1
+
+    config: dict[str, tp.Any] = {}
+    for key, default in DEFAULT_CONFIG.items():
+        if key not in data:
+            config[key] = copy.deepcopy(default)
+
+        elif not SCHEMA[key](data[key]):
+            problems.append(f"invalid value for \"{key}\": {data[key]!r}")
+            config[key] = copy.deepcopy(default)
+
+        else:
+            config[key] = data[key]
+
+    for key in data:
+        if key not in DEFAULT_CONFIG:
+            problems.append(f"unknown key \"{key}\"")
+
+    # json has no tuples
+    config["keyboard"] = [tuple(k) for k in config["keyboard"]]
+    return tp.cast(WindowConfig, config), problems
+
+
+def write_atomic(path: str, text: str) -> None:
+    """
+    replace a file so it is either completely old or completely new,
+    even if the power is cut
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as out:
+        out.write(text)
+        out.flush()
+        os.fsync(out.fileno())
+
+    os.replace(tmp_path, path)
+
+    # make the rename itself durable
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+
+    except OSError:
+        return
+
+    try:
+        os.fsync(fd)
+
+    except OSError:
+        pass
+
+    finally:
+        os.close(fd)
+
+
+class ConfigStore:
+    """
+    the config in memory, written to disk in the background
+
+    Changes go through `set`, which notifies subscribers and schedules a
+    write. Writes happen `debounce` seconds after the last change, so a
+    burst of changes (e.g. typing) results in one write.
+    """
+    path: str = ...
+    config: WindowConfig = ...
+    debounce: float = ...
+
+    _subscribers: list[tuple[tp.Union[str, None], tp.Callable[[str, tp.Any], None]]] = ...
+    _lock: threading.Lock = ...
+    _write_lock: threading.Lock = ...
+    _changed: threading.Condition = ...
+    _dirty_since: tp.Union[float, None] = None
+    _closed: bool = False
+    _thread: tp.Union[threading.Thread, None] = None
+
+    def __init__(self, path: str, debounce: float = 1.) -> None:
+        self.path = path
+        self.debounce = debounce
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self.config = copy.deepcopy(DEFAULT_CONFIG)
+        self.load()
+
+        # pending changes mustn't get lost if the program exits otherwise
+        atexit.register(self.close)
+
+    def load(self) -> None:
+        """
+        (re)load the config file, missing or invalid values are replaced by
+        the defaults and the file is fixed
+        """
+        try:
+            with open(self.path, "r") as inp:
+                data = json.load(inp)
+
+        except FileNotFoundError:
+            data = {"version": CONFIG_VERSION}
+
+        except (OSError, ValueError) as e:
+            print(f"can't read config \"{self.path}\", using defaults: {e}")
+            data = {"version": CONFIG_VERSION}
+
+        config, problems = validate(data)
+        for problem in problems:
+            print(f"config: {problem}")
+
+        with self._lock:
+            self.config.clear()
+            self.config.update(config)
+
+        # fix the file if it isn't exactly what would be written
+        if data != json.loads(json.dumps(self._serializable())):
+            self._schedule()
+
+    def __getitem__(self, key: str) -> tp.Any:
+        return self.config[key]
+
+    def set(self, key: str, value: tp.Any) -> bool:
+        """
+        change a value
+
+        :raises KeyError: unknown key
+        :raises ValueError: invalid value
+        :return: True if the value changed
+        """
+        if key not in SCHEMA:
+            raise KeyError(key)
+
+        if not SCHEMA[key](value):
+            raise ValueError(f"invalid value for \"{key}\": {value!r}")
+
+        if self.config[key] == value:
+            return False
+
+        with self._lock:
+            self.config[key] = value
+
+        for subscribed, callback in list(self._subscribers):
+            if subscribed is None or subscribed == key:
+                callback(key, value)
+
+        self._schedule()
+        return True
+
+    def subscribe(
+            self,
+            callback: tp.Callable[[str, tp.Any], None],
+            key: tp.Union[str, None] = None
+    ) -> tp.Callable[[], None]:
+        """
+        get notified about changes
+
+        :param callback: called with (key, new value), on the thread
+            calling `set`
+        :param key: only changes of this key, None for all
+        :return: function cancelling the subscription
+        """
+        entry = (key, callback)
+        self._subscribers.append(entry)
+
+        def cancel() -> None:
+            if entry in self._subscribers:
+                self._subscribers.remove(entry)
+
+        return cancel
+
+    def _serializable(self) -> dict:
+        return {"version": CONFIG_VERSION, **self.config}
+
+    def _schedule(self) -> None:
+        """
+        write the config once there were no changes for `debounce` seconds
+        """
+        with self._changed:
+            if self._closed:
+                return
+
+            self._dirty_since = time.monotonic()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._writer, daemon=True)
+                self._thread.start()
+
+            self._changed.notify()
+
+    def _writer(self) -> None:
+        """
+        thread. writes the config after changes
+        """
+        while True:
+            with self._changed:
+                while self._dirty_since is None and not self._closed:
+                    self._changed.wait()
+
+                if self._dirty_since is None:
+                    # closed, nothing left to write
+                    return
+
+                wait = self._dirty_since + self.debounce - time.monotonic()
+                if wait > 0 and not self._closed:
+                    self._changed.wait(wait)
+                    continue
+
+                self._dirty_since = None
+
+            try:
+                self._save()
+
+            except Exception:
+                print("can't save config: ", format_exc())
+
+    def flush(self) -> None:
+        """
+        write pending changes now and wait for it
+        """
+        with self._changed:
+            pending = self._dirty_since is not None
+            self._dirty_since = None
+
+        if pending:
+            self._save()
+
+    def _save(self) -> None:
+        """
+        write the current config
+        """
+        # flush may run while the writer thread is writing, the snapshot is
+        # taken under the same lock so an older one can't be written last
+        with self._write_lock:
+            with self._lock:
+                text = json.dumps(self._serializable(), indent=4)
+
+            write_atomic(self.path, text)
+
+    def close(self) -> None:
+        """
+        write pending changes and stop the writer
+        """
+        if self._closed:
+            return
+
+        try:
+            self.flush()
+
+        except OSError:
+            print("can't save config: ", format_exc())
+
+        with self._changed:
+            self._closed = True
+            self._changed.notify()
+
+        if self._thread is not None:
+            self._thread.join(timeout=5)
@@ -10,8 +10,9 @@ Author: Lukas Krahbichler
 #                    Imports                     #
 ##################################################
 
-from customtkinter import CTkFrame, CTkButton, CTkFont
+from customtkinter import CTkFrame, CTkButton, CTkFont, CTkTextbox
 from typing import Optional, Union, Callable, Any
+from ._profiler import PROFILER
 from .kill import kill_running
 from tkinter import Misc
 from os import system
@@ -28,6 +29,8 @@ class ControlFrame(CTkFrame):
 
     __reboot_button: CTkButton
     __restart_ui_button: CTkButton
+    __profiler_box: CTkTextbox
+    __profiler_job: Optional[str] = None
 
     # Shutdown, Reboot, Controler reset, restart_ui, kill all run/main
 
@@ -67,6 +70,10 @@ class ControlFrame(CTkFrame):
                 (
                     "Kill Running",
                     lambda: kill_running()
+                ),
+                (
+                    "Profiler",
+                    lambda: self.__toggle_profiler()
                 )
             ]
         ]
@@ -80,5 +87,34 @@ class ControlFrame(CTkFrame):
         self.grid_columnconfigure("all", weight=1)
         self.grid_rowconfigure("all", weight=1)
 
+        # hidden until "Profiler" is pressed
+        self.__profiler_box = CTkTextbox(self, font=("Monospace", 14), wrap="none")
+
     def __run(self, cmd: str) -> None:  # noqa
         system(cmd)
+
+    def __toggle_profiler(self) -> None:
+        """
+        show / hide the profiler overlay
+        """
+        if self.__profiler_job is not None:
+            self.after_cancel(self.__profiler_job)
+            self.__profiler_job = None
+            self.__profiler_box.grid_forget()
+            return
+
+        self.grid_columnconfigure(len(self.__BUTTONS), weight=2)
+        self.__profiler_box.grid(
+            column=len(self.__BUTTONS), row=0, rowspan=3, sticky="NSEW", padx=10, pady=10
+        )
+        self.__update_profiler()
+
+    def __update_profiler(self) -> None:
+        """
+        refresh the overlay every second while it is shown
+        """
+        self.__profiler_box.configure(state="normal")
+        self.__profiler_box.delete("1.0", "end")
+        self.__profiler_box.insert("1.0", PROFILER.report())
+        self.__profiler_box.configure(state="disabled")
+        self.__profiler_job = self.after(1000, self.__update_profiler)
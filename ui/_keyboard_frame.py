@@ -11,24 +11,15 @@ Author: Lukas Krahbichler
 ##################################################
 
 from customtkinter import CTkFrame, Variable, CTkEntry, CTkFont, CTkLabel
-from typing import Any, TypedDict, Literal, Optional, Union
+from typing import Any, Optional, Union
+from ._config import ConfigStore, WindowConfig
 from tkinter import Misc, Entry
-from json import dump
 
 
 ##################################################
 #                     Code                       #
 ##################################################
 
-class WindowConfig(TypedDict):
-    appearance_mode: Literal["dark", "light"]
-    program_directories: list[str]
-    program_ignores: list[str]
-    keyboard: list[tuple[str, str]]
-    fullscreen: bool
-    theme: str
-
-
 class KEntry(CTkEntry):
     def get_entry(self) -> Entry:
         return self._entry
@@ -41,7 +32,7 @@ class KeyboardFrame(CTkFrame):
     __entries: list[tuple[KEntry, KEntry]]
 
     __window_config: WindowConfig
-    __config_path: str
+    __config_store: ConfigStore
     __keyboard: Variable
     __font: Optional[Union[tuple, CTkFont]]
 
@@ -51,16 +42,15 @@ class KeyboardFrame(CTkFrame):
     def __init__(
             self,
             master: Misc,
-            window_config: WindowConfig,
-            config_path: str,
+            config_store: ConfigStore,
             keyboard: Variable,
             font: Optional[Union[tuple, CTkFont]] = None,
             *args: Any,
             **kwargs: Any) -> None:
         super().__init__(master, *args, **kwargs)
 
-        self.__window_config = window_config
-        self.__config_path = config_path
+        self.__config_store = config_store
+        self.__window_config = config_store.config
         self.__keyboard = keyboard
         self.__font = font
 
@@ -102,9 +92,8 @@ class KeyboardFrame(CTkFrame):
 
         new_kb = new_kb[:-1] + [("Return", "\n")]
 
-        self.__window_config["keyboard"] = new_kb
-
-        self.config_save()
+        # saved in the background, once typing stopped
+        self.__config_store.set("keyboard", new_kb)
         self.__grid_widgets()
 
     def _add_entry(self, text1: str = "", text2: str = "") -> None:
@@ -151,8 +140,3 @@ class KeyboardFrame(CTkFrame):
 
         self._update()
         self.__keyboard.set(self.__window_config["keyboard"])
-
-    def config_save(self) -> None:
-        with open(self.__config_path, "w") as out:
-            dump(self.__window_config, out, indent=4)
-
@@ -0,0 +1,258 @@
+"""
+_log_frame.py
+
+Frame shown when "logs" is selected, browses the logs of past runs
+"""
+from ._tk_term_colors import AnsiParser, Style, tag_options
+from ._mapped_log import MappedLog
+from ._run_log import list_logs
+from ._render import coalesce
+from ._config import WindowConfig
+from tkinter.font import Font
+import customtkinter as ctk
+import typing as tp
+import os
+
+
+class LogFrame(ctk.CTkFrame):
+    """
+    shows a log file without loading it
+
+    The file is memory mapped, only the lines that fit into the textbox are
+    read, parsed for colors and inserted. Scrolling replaces them.
+    """
+    window_config: WindowConfig = ...
+    logs: dict[str, str] = ...
+    log: tp.Union[MappedLog, None] = None
+    top_line: int = 0
+
+    _n_lines: int = 0
+    _n_visible: int = 1
+    _configured_tags: set[str] = ...
+    _render_pending: bool = False
+    _to_end: bool = False  # End was pressed before all lines were counted
+
+    def __init__(
+            self,
+            window_config: WindowConfig,
+            *args,
+            **kwargs
+    ) -> None:
+        self.window_config = window_config
+        self.logs = {}
+        self._configured_tags = set()
+
+        super().__init__(*args, **kwargs)
+
+        self.grid_rowconfigure(0, weight=0)
+        self.grid_rowconfigure(1, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_columnconfigure((1, 2), weight=0)
+
+        self.logs_combo = ctk.CTkComboBox(
+            self,
+            values=[],
+            font=("Sans-Serif", 30),
+            command=self._select_log,
+            dropdown_font=("Sans-Serif", 30),
+            height=50
+        )
+        self.logs_combo.grid(
+            row=0, column=0, columnspan=2, sticky="nsew", padx=30, pady=(10, 0)
+        )
+
+        ctk.CTkButton(
+            self,
+            text="Refresh",
+            font=("Sans-Serif", 30),
+            corner_radius=15,
+            command=self.update_log_list,
+            height=50
+        ).grid(row=0, column=2, sticky="nsew", padx=30, pady=(10, 0))
+
+        self.text = ctk.CTkTextbox(
+            self,
+            font=("Sans-Serif", 20),
+            wrap="none",
+            activate_scrollbars=False
+        )
+        self.text.grid(row=1, column=0, columnspan=2, sticky="nsew", padx=(20, 0), pady=20)
+
+        # a textbox scrollbar would only know the visible lines
+        self.slider = ctk.CTkSlider(
+            self,
+            orientation="vertical",
+            from_=1,
+            to=0,
+            command=self._on_slider
+        )
+        self.slider.grid(row=1, column=2, sticky="ns", padx=20, pady=20)
+
+        # events
+        self.text.bind("<Configure>", self._on_resize, add="+")
+        self.text.bind("<MouseWheel>", self._on_wheel)
+        self.text.bind("<Button-4>", lambda _e: self.scroll(-3))
+        self.text.bind("<Button-5>", lambda _e: self.scroll(3))
+        self.text.bind("<Up>", lambda _e: self.scroll(-1))
+        self.text.bind("<Down>", lambda _e: self.scroll(1))
+        self.text.bind("<Prior>", lambda _e: self.scroll(-self._n_visible))
+        self.text.bind("<Next>", lambda _e: self.scroll(self._n_visible))
+        self.text.bind("<Home>", lambda _e: self.scroll_to(0))
+        self.text.bind("<End>", self.scroll_to_end)
+
+        self.update_log_list()
+
+    def update_log_list(self, *_trash) -> None:
+        """
+        look for new log files
+        """
+        self.logs = {
+            os.path.basename(path): path
+            for path in list_logs(self.window_config["log_directory"])
+        }
+        self.logs_combo.configure(values=list(self.logs))
+
+        current = self.log.path if self.log is not None else None
+        if current is not None and current in self.logs.values():
+            # a running program may have written more
+            self.open(current, keep_position=True)
+
+        else:
+            first = next(iter(self.logs), "")
+            self.logs_combo.set(first)
+            if first:
+                self.open(self.logs[first])
+
+    def _select_log(self, value: str) -> None:
+        if value in self.logs:
+            self.open(self.logs[value])
+
+    def open(self, path: str, keep_position: bool = False) -> None:
+        """
+        show a log file
+
+        :param path: log file
+        :param keep_position: stay at the current line instead of the start
+        """
+        previous, self.log = self.log, None
+        try:
+            self.log = MappedLog(path, previous if keep_position else None)
+
+        except (OSError, ValueError) as e:
+            # pruned meanwhile
+            print(f"can't open log: {e}")
+            self._n_lines = 0
+            self.scroll_to(0)
+            return
+
+        finally:
+            if previous is not None:
+                previous.close()
+
+        # show the first page right away, count the lines while idle
+        self._to_end = False
+        self._n_lines = self.log.estimated_lines
+        self.scroll_to(self.top_line if keep_position else 0)
+        self.after_idle(self._index_step, self.log)
+
+    def _index_step(self, log: MappedLog) -> None:
+        """
+        count a few more lines of the log, then let tk handle events
+        """
+        if log is not self.log:
+            # another one was opened meanwhile
+            return
+
+        if not log.index_step():
+            self.after_idle(self._index_step, log)
+            return
+
+        self._n_lines = log.n_lines
+        self.scroll_to(self._n_lines if self._to_end else self.top_line)
+        self._to_end = False
+
+    def scroll_to_end(self, *_trash) -> str:
+        self._to_end = self.log is not None and not self.log.indexed
+        self.scroll_to(self._n_lines)
+        return "break"
+
+    @property
+    def max_top_line(self) -> int:
+        return max(self._n_lines - self._n_visible, 0)
+
+    def scroll(self, n_lines: int) -> str:
+        self.scroll_to(self.top_line + n_lines)
+        return "break"
+
+    def scroll_to(self, line: int) -> None:
+        """
+        make `line` the first visible line
+        """
+        self.top_line = min(max(line, 0), self.max_top_line)
+        if self.max_top_line:
+            self.slider.set(self.top_line / self.max_top_line)
+
+        else:
+            self.slider.set(0)
+
+        self._request_render()
+
+    def _on_slider(self, value: float) -> None:
+        self.top_line = round(value * self.max_top_line)
+        self._request_render()
+
+    def _on_wheel(self, event) -> str:
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def _on_resize(self, *_trash) -> None:
+        line_height = Font(font=self.text._textbox.cget("font")).metrics("linespace")
+        n_visible = max(self.text._textbox.winfo_height() // max(line_height, 1), 1)
+        if n_visible != self._n_visible:
+            self._n_visible = n_visible
+            self.scroll_to(self.top_line)
+
+    def _request_render(self) -> None:
+        """
+        render once tk is idle, fast scrolling renders only the last position
+        """
+        if not self._render_pending:
+            self._render_pending = True
+            self.after_idle(self._render)
+
+    def _configure_tags(self, style: Style) -> None:
+        for tag in style:
+            if tag not in self._configured_tags:
+                self.text._textbox.tag_configure(tag, **tag_options(tag))
+                self._configured_tags.add(tag)
+
+    def _render(self) -> None:
+        """
+        replace the textbox content with the visible lines
+        """
+        self._render_pending = False
+        lines = self.log.lines(self.top_line, self._n_visible) \
+            if self.log is not None else []
+
+        # the color state at the first line is unknown, programs usually
+        # reset it at the end of a line anyway
+        parser = AnsiParser()
+        spans = coalesce(parser.feed("\n".join(lines), final=True))
+
+        args: list[tp.Union[str, Style]] = []
+        for text, style in spans:
+            self._configure_tags(style)
+            args.append(text)
+            args.append(style)
+
+        textbox = self.text._textbox
+        textbox.configure(state="normal")
+        textbox.delete("1.0", ctk.END)
+        if args:
+            textbox.insert(ctk.END, *args)
+
+        textbox.configure(state="disabled")
+
+    def end(self) -> None:
+        if self.log is not None:
+            self.log.close()
+            self.log = None
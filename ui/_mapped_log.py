@@ -0,0 +1,180 @@
+"""
+_mapped_log.py
+
+random access to the lines of big log files without reading them
+"""
+from bisect import bisect_right
+from array import array
+import typing as tp
+import mmap
+import os
+
+
+BLOCK_SIZE: int = 64 * 1024
+
+
+class MappedLog:
+    """
+    memory maps a log file and indexes its lines lazily
+
+    The index stores how many lines start before every 64 KB block (counted
+    with `bytes.count` in C). Finding a line means looking up its block and
+    scanning at most one block, so opening even huge files is instant and
+    only the parts that are looked at are ever read from disk. Counting
+    all lines is done in steps (`index_step`), `estimated_lines` guesses
+    until then.
+    """
+    path: str = ...
+    size: int = 0
+    inode: int = 0
+
+    _mm: tp.Union[mmap.mmap, None] = None
+    _block_lines: array = ...
+    _last: tuple[int, int] = (0, 0)
+
+    def __init__(self, path: str, previous: tp.Union["MappedLog", None] = None) -> None:
+        """
+        :param path: log file
+        :param previous: the same file opened before it grew, its index of
+            the blocks that were complete then is reused
+        """
+        self.path = path
+        with open(path, "rb") as inp:
+            stat = os.fstat(inp.fileno())
+            self.size = stat.st_size
+            self.inode = stat.st_ino
+            if self.size:
+                self._mm = mmap.mmap(inp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # _block_lines[i]: number of newlines before block i
+        self._block_lines = array("Q", [0])
+        if previous is not None and previous.path == path \
+                and previous.inode == self.inode and previous.size <= self.size:
+            # logs are only appended to
+            self._block_lines = previous._block_lines[:previous.size // BLOCK_SIZE + 1]
+
+    def _index_blocks(self, n_blocks: int) -> None:
+        """
+        make sure the first `n_blocks` blocks are indexed
+        """
+        while len(self._block_lines) <= min(n_blocks, self._n_blocks):
+            block = len(self._block_lines) - 1
+            start = block * BLOCK_SIZE
+            self._block_lines.append(
+                self._block_lines[-1]
+                + self._mm[start:start + BLOCK_SIZE].count(b"\n")
+            )
+
+    @property
+    def _n_blocks(self) -> int:
+        return -(-self.size // BLOCK_SIZE)
+
+    @property
+    def indexed(self) -> bool:
+        """
+        True once every block was counted
+        """
+        return len(self._block_lines) > self._n_blocks
+
+    def index_step(self, n_blocks: int = 16) -> bool:
+        """
+        count the lines of a few more blocks (16 blocks take about a
+        millisecond)
+
+        :return: True once the whole file is indexed
+        """
+        if self._mm is not None:
+            self._index_blocks(len(self._block_lines) - 1 + n_blocks)
+
+        return self.indexed
+
+    @property
+    def estimated_lines(self) -> int:
+        """
+        number of lines, extrapolated from the indexed part until
+        `indexed`
+        """
+        if self._mm is None:
+            return 0
+
+        if self.indexed:
+            return self.n_lines
+
+        self._index_blocks(1)
+        n_indexed = len(self._block_lines) - 1
+        return self._block_lines[-1] * self.size // (n_indexed * BLOCK_SIZE)
+
+    @property
+    def n_lines(self) -> int:
+        """
+        number of lines (indexes the whole file)
+        """
+        if self._mm is None:
+            return 0
+
+        self._index_blocks(self._n_blocks)
+        n = self._block_lines[-1]
+        # last line without trailing newline
+        return n + (self._mm[self.size - 1:self.size] != b"\n")
+
+    def line_offset(self, line: int) -> int:
+        """
+        byte offset of the start of a line
+        """
+        if self._mm is None or line <= 0:
+            return 0
+
+        # continue from the last lookup when scrolling forward
+        last_line, last_offset = self._last
+        if last_line <= line and line - last_line < 1024:
+            pos, to_skip = last_offset, line - last_line
+
+        else:
+            # index until the block containing the line is known
+            while self._block_lines[-1] < line \
+                    and (len(self._block_lines) - 1) * BLOCK_SIZE < self.size:
+                self._index_blocks(len(self._block_lines))
+
+            block = bisect_right(self._block_lines, line - 1) - 1
+            pos, to_skip = block * BLOCK_SIZE, line - self._block_lines[block]
+
+        find = self._mm.find
+        for _ in range(to_skip):
+            found = find(b"\n", pos)
+            if found == -1:
+                return self.size
+
+            pos = found + 1
+
+        self._last = (line, pos)
+        return pos
+
+    def lines(self, start: int, count: int) -> list[str]:
+        """
+        read lines
+
+        :param start: first line
+        :param count: max number of lines
+        """
+        if self._mm is None or count <= 0:
+            return []
+
+        begin = self.line_offset(start)
+        end = begin
+        find = self._mm.find
+        for _ in range(count):
+            found = find(b"\n", end)
+            if found == -1:
+                end = self.size
+                break
+
+            end = found + 1
+
+        text = self._mm[begin:end].decode("utf-8", errors="replace")
+        # not splitlines, "\r" (progress bars) doesn't end a line in the log
+        return text.removesuffix("\n").split("\n") if text else []
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
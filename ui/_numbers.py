@@ -0,0 +1,128 @@
+"""
+_numbers.py
+
+picks numeric values out of a program's output for plotting
+"""
+from ._series import Ring
+from time import monotonic
+from array import array
+import typing as tp
+import threading
+import re
+
+
+MAX_SERIES: int = 32
+MAX_LINE: int = 4096  # longer lines are skipped
+
+_NUMBER: bytes = rb"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+
+# "error=0.5", "speed: 12", "kp = 1e-3"
+KEY_VALUE: re.Pattern = re.compile(
+    rb"([A-Za-z_][\w.]{0,31})\s*[=:]\s*(" + _NUMBER + rb")(?![\w.])"
+)
+# "0.5, 12, 3" / "0.5;12" / "0.5 12" on a line of their own, one series
+# per column
+CSV_LINE: re.Pattern = re.compile(
+    rb"^[ \t]*(" + _NUMBER + rb"(?:[ \t]*[,; \t][ \t]*" + _NUMBER + rb")*)[ \t\r]*$",
+    re.MULTILINE
+)
+CSV_SEPARATOR: re.Pattern = re.compile(rb"[ \t]*[,; \t][ \t]*")
+# colors would otherwise stick to keys ("\x1b[31mspeed" -> "mspeed")
+ESCAPE: re.Pattern = re.compile(rb"\x1b\[[0-9;?]*[A-Za-z]")
+
+
+class NumberParser:
+    """
+    a CaptureSink, collects `key=value` and CSV-like lines into one ring
+    buffer per series
+
+    It runs on the capture threads on the raw chunks: every chunk's
+    complete lines are searched with two precompiled patterns, both loop
+    in C over the whole chunk, python only touches the matches.
+    Samples are stamped with the time their chunk was read, the time axis
+    has the resolution of the reads (a program printing faster than the
+    ui reads gets several samples with the same time, in order). stdout
+    and stderr both feed it, storing is locked so each ring has one writer
+    at a time.
+    """
+    capacity: int = ...
+    series: dict[str, Ring] = ...
+    n_dropped: int = 0  # samples of series beyond MAX_SERIES
+
+    _partial: dict[str, bytes] = ...
+    _skipping: set[str] = ...  # streams in the middle of a too long line
+    _lock: threading.Lock = ...
+
+    def __init__(self, capacity: int = 20_000) -> None:
+        """
+        :param capacity: samples to keep per series
+        """
+        self.capacity = capacity
+        self.series = {}
+        self._partial = {}
+        self._skipping = set()
+        self._lock = threading.Lock()
+
+    def write(self, stream: str, data: bytes) -> None:
+        """
+        parse a chunk of raw output
+        """
+        if stream in self._skipping:
+            # the rest of a too long line, parsing its middle would make up
+            # keys and values
+            newline = data.find(b"\n")
+            if newline == -1:
+                return
+
+            self._skipping.discard(stream)
+            data = data[newline + 1:]
+
+        data = self._partial.pop(stream, b"") + data
+        end = data.rfind(b"\n") + 1
+        if len(data) - end > MAX_LINE:
+            self._skipping.add(stream)
+
+        elif end < len(data):
+            # finished with the next chunk
+            self._partial[stream] = data[end:]
+
+        if end:
+            self.feed(data[:end])
+
+    def feed(self, block: bytes, timestamp: tp.Union[float, None] = None) -> None:
+        """
+        parse complete lines
+
+        :param timestamp: of all samples in the block, defaults to now
+        """
+        timestamp = monotonic() if timestamp is None else timestamp
+        if b"\x1b" in block:
+            block = ESCAPE.sub(b"", block)
+
+        found: dict[str, list[float]] = {}
+        for key, value in KEY_VALUE.findall(block):
+            found.setdefault(key.decode(), []).append(float(value))
+
+        for line in CSV_LINE.findall(block):
+            for column, value in enumerate(CSV_SEPARATOR.split(line)):
+                found.setdefault(str(column), []).append(float(value))
+
+        with self._lock:
+            for name, values in found.items():
+                ring = self.series.get(name)
+                if ring is None:
+                    if len(self.series) >= MAX_SERIES:
+                        self.n_dropped += len(values)
+                        continue
+
+                    ring = self.series[name] = Ring(self.capacity)
+
+                ring.extend(array("d", [timestamp]) * len(values), array("d", values))
+
+    def close(self, exit_code: tp.Union[int, None] = None) -> None:
+        for stream, rest in list(self._partial.items()):
+            # the last line may lack its newline
+            self.feed(rest)
+
+        self._partial.clear()
+        self._skipping.clear()
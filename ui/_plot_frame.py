@@ -0,0 +1,249 @@
+"""
+_plot_frame.py
+
+Frame shown when "plot" is selected, plots the numbers the focused
+program prints (and sends over its telemetry pipe)
+"""
+from ._series import Ring, min_max
+from ._scheduler import Scheduler
+from ._run_manager import RunManager
+from ._session import Session
+from bisect import bisect_left
+import customtkinter as ctk
+import typing as tp
+
+
+COLORS: tuple[str, ...] = (
+    "#3a7ebf", "#fc0307", "#2fa84f", "#ff9900", "#b04fcf", "#00b3b3", "#e0e000"
+)
+SPANS: dict[str, tp.Union[float, None]] = {"10 s": 10., "60 s": 60., "all": None}
+ALL: str = "all"
+MARGIN: int = 10
+
+
+def series_of(session: tp.Union[Session, None]) -> dict[str, Ring]:
+    """
+    every series of a session: numbers from its output by name, telemetry
+    channels as "#<channel>"
+    """
+    if session is None:
+        return {}
+
+    series: dict[str, Ring] = {}
+    if session.numbers is not None:
+        series.update(session.numbers.series)
+
+    if session.telemetry is not None:
+        for channel, ring in sorted(session.telemetry.channels.items()):
+            series[f"#{channel}"] = ring
+
+    return series
+
+
+def window(ring: Ring, span: tp.Union[float, None]) -> tp.Sequence[float]:
+    """
+    the values of the last `span` seconds (all kept ones if None)
+    """
+    timestamps, values = ring.latest()
+    if span is None or not timestamps:
+        return values
+
+    return values[bisect_left(timestamps, timestamps[-1] - span):]
+
+
+def line_points(
+        pairs: list[tuple[float, float]],
+        low: float,
+        high: float,
+        width: int,
+        height: int
+) -> list[float]:
+    """
+    canvas coordinates of a decimated series, each column's min and max
+    are joined by a vertical stroke
+    """
+    scale = (height - 2 * MARGIN) / ((high - low) or 1.)
+    step = (width - 2 * MARGIN) / max(len(pairs) - 1, 1)
+    bottom = height - MARGIN
+
+    points: list[float] = []
+    for i, (lo, hi) in enumerate(pairs):
+        x = MARGIN + i * step
+        points += (x, bottom - (lo - low) * scale, x, bottom - (hi - low) * scale)
+
+    if len(points) < 8:
+        # a line needs two points
+        points += [points[0] + step, points[1], points[0] + step, points[3]] \
+            if points else [0., 0., 0., 0.]
+
+    return points
+
+
+class PlotFrame(ctk.CTkFrame):
+    """
+    live line plot of the focused program's numbers
+
+    Every redraw decimates each series to one (min, max) pair per pixel
+    column and moves the existing canvas lines, so drawing costs the same
+    whether the program ran for a second or an hour. It only redraws while
+    visible and something changed.
+    """
+    manager: RunManager = ...
+    selected: str = ALL
+    span: tp.Union[float, None] = 10.
+
+    _lines: dict[str, tuple[int, int]] = ...  # line and legend items
+    _names: tuple[str, ...] = ()
+    _drawn: tuple = ()
+    _cancel_timer: tp.Callable[[], None] = ...
+
+    def __init__(
+            self,
+            manager: RunManager,
+            scheduler: Scheduler,
+            *args,
+            interval_ms: int = 100,
+            **kwargs
+    ) -> None:
+        """
+        :param manager: the run frame's programs, the focused one is plotted
+        :param interval_ms: redraw interval
+        """
+        self.manager = manager
+        self._lines = {}
+
+        super().__init__(*args, **kwargs)
+
+        self.grid_rowconfigure(0, weight=0)
+        self.grid_rowconfigure(1, weight=1)
+        self.grid_rowconfigure(2, weight=0)
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_columnconfigure(1, weight=0)
+
+        self.series_combo = ctk.CTkComboBox(
+            self,
+            values=[ALL],
+            font=("Sans-Serif", 30),
+            command=self._select_series,
+            dropdown_font=("Sans-Serif", 30),
+            height=50
+        )
+        self.series_combo.set(ALL)
+        self.series_combo.grid(row=0, column=0, sticky="nsew", padx=30, pady=(10, 0))
+
+        span = ctk.CTkSegmentedButton(
+            self,
+            values=list(SPANS),
+            font=("Sans-Serif", 30),
+            command=self._select_span
+        )
+        span.set("10 s")
+        span.grid(row=0, column=1, sticky="nsew", padx=30, pady=(10, 0))
+
+        self.canvas = ctk.CTkCanvas(
+            self,
+            background="#1d1e1e",
+            highlightthickness=0
+        )
+        self.canvas.grid(row=1, column=0, columnspan=2, sticky="nsew", padx=20, pady=20)
+        self._high_text = self.canvas.create_text(
+            MARGIN, MARGIN, anchor="nw", fill="#aaaaaa", font=("Sans-Serif", 14)
+        )
+        self._low_text = self.canvas.create_text(
+            MARGIN, 0, anchor="sw", fill="#aaaaaa", font=("Sans-Serif", 14)
+        )
+
+        self.info_l = ctk.CTkLabel(self, font=("Sans-Serif", 20), text="")
+        self.info_l.grid(row=2, column=0, columnspan=2, sticky="w", padx=30, pady=(0, 10))
+
+        self._cancel_timer = scheduler.every(interval_ms, self.redraw)
+
+    def _select_series(self, value: str) -> None:
+        self.selected = value
+        self.redraw()
+
+    def _select_span(self, value: str) -> None:
+        self.span = SPANS[value]
+        self.redraw()
+
+    def redraw(self) -> None:
+        """
+        plot the focused program's series, called periodically
+        """
+        if not self.winfo_ismapped():
+            return
+
+        session = self.manager.current
+        series = series_of(session)
+
+        names = tuple(series)
+        if names != self._names:
+            self._names = names
+            self.series_combo.configure(values=[ALL, *names])
+
+        shown = {
+            name: ring for name, ring in series.items()
+            if self.selected in (ALL, name)
+        }
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        state = (
+            id(session), self.span, width, height,
+            tuple([(name, ring.n_written) for name, ring in shown.items()])
+        )
+        if state == self._drawn:
+            return
+
+        self._drawn = state
+        self._draw(shown, width, height)
+
+    def _draw(self, shown: dict[str, Ring], width: int, height: int) -> None:
+        columns = max(width - 2 * MARGIN, 1)
+        decimated = {
+            name: min_max(window(ring, self.span), columns)
+            for name, ring in shown.items()
+        }
+        decimated = {name: pairs for name, pairs in decimated.items() if pairs}
+
+        for name in set(self._lines) - set(decimated):
+            for item in self._lines.pop(name):
+                self.canvas.delete(item)
+
+        if not decimated:
+            self.canvas.itemconfigure(self._high_text, text="")
+            self.canvas.itemconfigure(self._low_text, text="")
+            self.info_l.configure(
+                text="no numbers yet, print e.g. \"error=0.5\" or \"0.5, 12\""
+            )
+            return
+
+        low = min([min([lo for lo, _ in pairs]) for pairs in decimated.values()])
+        high = max([max([hi for _, hi in pairs]) for pairs in decimated.values()])
+
+        info: list[str] = []
+        for i, (name, pairs) in enumerate(decimated.items()):
+            color = COLORS[self._names.index(name) % len(COLORS)]
+            if name not in self._lines:
+                self._lines[name] = (
+                    self.canvas.create_line(0, 0, 0, 0, fill=color, width=2),
+                    self.canvas.create_text(
+                        0, 0, anchor="ne", fill=color, text=name,
+                        font=("Sans-Serif", 14)
+                    )
+                )
+
+            line, legend = self._lines[name]
+            self.canvas.coords(line, *line_points(pairs, low, high, width, height))
+            self.canvas.coords(legend, width - MARGIN, MARGIN + 20 * i)
+
+            last = shown[name].last
+            if last is not None:
+                info.append(f"{name} {last[1]:.4g}")
+
+        self.canvas.itemconfigure(self._high_text, text=f"{high:.4g}")
+        self.canvas.itemconfigure(self._low_text, text=f"{low:.4g}")
+        self.canvas.coords(self._low_text, MARGIN, height - MARGIN)
+        self.info_l.configure(text="  ·  ".join(info))
+
+    def end(self) -> None:
+        self._cancel_timer()
@@ -0,0 +1,144 @@
+"""
+_prewarm.py
+
+gets a program ready to start, so pressing Start only has to execute it
+"""
+from ._pty import open_pty, close_fd
+from time import perf_counter
+import typing as tp
+import os
+
+
+def warm_file(path: str) -> None:
+    """
+    ask the kernel to read a file into the page cache, returns right away
+    (the reading happens in the background)
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+
+    finally:
+        os.close(fd)
+
+
+def interpreter(path: str) -> tp.Union[str, None]:
+    """
+    the interpreter of a script ("#!/bin/bash" -> "/bin/bash"), None for
+    binaries
+    """
+    with open(path, "rb") as inp:
+        head = inp.read(256)
+
+    if not head.startswith(b"#!"):
+        return None
+
+    parts = head[2:].split(b"\n", 1)[0].split()
+    return os.fsdecode(parts[0]) if parts else None
+
+
+class Prepared:
+    """
+    a resolved program and the pipes (or pseudo terminal) for its next run
+
+    The file descriptors are used by one launch only (`take`), unused ones
+    have to be closed with `close`.
+    """
+    command: tuple[str, ...] = ...   # as given
+    argv: list[str] = ...            # with the resolved executable
+    pty: bool = ...
+    stat: os.stat_result = ...
+    prepared_at: float = ...
+
+    child_fds: tuple[int, int, int] = ...  # stdin, stdout, stderr
+    parent_fds: dict[str, int] = ...       # Capture's pty_fd / stdout_fd / ...
+    _taken: bool = False
+
+    def __init__(self, command: tp.Sequence[str], pty: bool, term_size: tuple[int, int]) -> None:
+        """
+        :param command: program and arguments
+        :param pty: attach the program to a pseudo terminal instead of pipes
+        :param term_size: (columns, rows) of the pseudo terminal
+
+        :raises OSError: the program doesn't exist or isn't executable
+        """
+        self.command = tuple(command)
+        self.pty = pty
+        path = os.path.realpath(command[0])
+        self.stat = os.stat(path)
+        if not os.access(path, os.X_OK):
+            raise PermissionError(f"\"{path}\" isn't executable")
+
+        self.argv = [path, *command[1:]]
+        self._open(term_size)
+        self.prepared_at = perf_counter()
+
+    def _open(self, term_size: tuple[int, int]) -> None:
+        err_read, err_write = os.pipe()
+        if self.pty:
+            master, slave = open_pty(*term_size)
+            self.child_fds = (slave, slave, err_write)
+            self.parent_fds = {"pty_fd": master, "stderr_fd": err_read}
+            return
+
+        in_read, in_write = os.pipe()
+        out_read, out_write = os.pipe()
+        self.child_fds = (in_read, out_write, err_write)
+        self.parent_fds = {
+            "stdin_fd": in_write, "stdout_fd": out_read, "stderr_fd": err_read
+        }
+
+    def warm(self) -> None:
+        """
+        start reading the program (and its interpreter) from disk
+        """
+        warm_file(self.argv[0])
+        try:
+            script_interpreter = interpreter(self.argv[0])
+            if script_interpreter is not None:
+                warm_file(script_interpreter)
+
+        except OSError:
+            pass
+
+    def matches(self, command: tp.Sequence[str], pty: bool) -> bool:
+        """
+        True if the launch is for this command and the program wasn't
+        rebuilt (or its link changed) since it was prepared
+        """
+        if self._taken or tuple(command) != self.command or pty != self.pty:
+            return False
+
+        try:
+            path = os.path.realpath(command[0])
+            stat = os.stat(path)
+
+        except OSError:
+            return False
+
+        return path == self.argv[0] and (
+            stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns
+        ) == (
+            self.stat.st_dev, self.stat.st_ino, self.stat.st_size, self.stat.st_mtime_ns
+        )
+
+    def take(self) -> tuple[tuple[int, int, int], dict[str, int]]:
+        """
+        the file descriptors for the launch, (child's, parent's)
+        """
+        self._taken = True
+        return self.child_fds, self.parent_fds
+
+    def close(self) -> None:
+        """
+        close the file descriptors if they weren't taken
+        """
+        if self._taken:
+            return
+
+        self._taken = True
+        for fd in set(self.child_fds) | set(self.parent_fds.values()):
+            close_fd(fd)
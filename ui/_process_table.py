@@ -0,0 +1,150 @@
+"""
+_process_table.py
+
+finds running programs by reading /proc directly
+"""
+import typing as tp
+import time
+import os
+
+
+PROC_ROOT: str = "/proc"
+
+
+class ProcessTable:
+    """
+    scans /proc for programs whose executable ends with an identifier
+
+    Results are cached for `ttl` seconds so frequent callers (like the
+    "currently running" label) don't rescan the process table every time.
+    """
+    ttl: float = ...
+    proc_root: str = ...
+    _cache: dict[str, tuple[float, list[tuple[int, int, int]]]] = ...
+
+    def __init__(self, ttl: float = 1, proc_root: str = PROC_ROOT) -> None:
+        self.ttl = ttl
+        self.proc_root = proc_root
+        self._cache = {}
+
+    @property
+    def available(self) -> bool:
+        """
+        True if the system has a /proc filesystem
+        """
+        return os.path.isdir(self.proc_root)
+
+    def _read(self, pid: str, name: str) -> bytes:
+        with open(f"{self.proc_root}/{pid}/{name}", "rb") as inp:
+            return inp.read()
+
+    def _stat(self, pid: str) -> tuple[int, int]:
+        """
+        (parent pid, process group id) from /proc/<pid>/stat
+        """
+        stat = self._read(pid, "stat")
+        # the command name may contain spaces and parentheses,
+        # the fields after the last ")" are well-defined
+        fields = stat[stat.rindex(b")") + 2:].split(b" ", 3)
+        return int(fields[1]), int(fields[2])
+
+    def _runs_script(self, pid: str, argv: list[bytes], needle: bytes) -> bool:
+        """
+        True if the process is the interpreter of a script ending with
+        `needle`: the kernel runs "#!/bin/sh -e" scripts as
+        [interpreter, (option,) script, ...]
+        """
+        for arg in argv[1:3]:
+            if not arg.endswith(needle):
+                continue
+
+            if not arg.startswith(b"/"):
+                arg = os.path.join(os.readlink(f"{self.proc_root}/{pid}/cwd").encode(), arg)
+
+            with open(arg, "rb") as inp:
+                shebang = inp.readline(256)
+
+            if not shebang.startswith(b"#!"):
+                continue
+
+            # "#!/usr/bin/env python3" runs as "python3 run/main", an
+            # editor or shell with the script as argument isn't it
+            interpreters = [os.path.basename(word) for word in shebang[2:].split()]
+            if os.path.basename(argv[0]) in interpreters:
+                return True
+
+        return False
+
+    def scan(self, identifier: str) -> list[tuple[int, int, int]]:
+        """
+        read the process table, ignoring the cache
+
+        :param identifier: end of the executable's path to look for, e.g.
+            "run/main", also matches the interpreter of a script with that
+            path (a shell or editor with it as argument doesn't match)
+        :return: (pid, parent pid, process group id) of every matching process
+        """
+        needle = identifier.encode()
+        own_pid = os.getpid()
+        found: list[tuple[int, int, int]] = []
+        for entry in os.listdir(self.proc_root):
+            if not entry.isdigit():
+                continue
+
+            try:
+                cmdline = self._read(entry, "cmdline")
+                if not cmdline.split(b"\0", 1)[0].endswith(needle) and not (
+                        needle in cmdline
+                        and self._runs_script(entry, cmdline.split(b"\0"), needle)
+                ):
+                    continue
+
+                pid = int(entry)
+                if pid != own_pid:
+                    found.append((pid, *self._stat(entry)))
+
+            except (OSError, ValueError):
+                # process exited while scanning
+                continue
+
+        return found
+
+    def _lookup(self, identifier: str) -> list[tuple[int, int, int]]:
+        now = time.monotonic()
+        cached = self._cache.get(identifier)
+        if cached is None or now - cached[0] > self.ttl:
+            cached = (now, self.scan(identifier))
+            self._cache[identifier] = cached
+
+        return cached[1]
+
+    def pids(
+            self, identifier: str, parent: tp.Union[int, None] = None
+    ) -> list[int]:
+        """
+        get the pids of all matching processes
+
+        :param identifier: end of the executable's path to look for
+        :param parent: only return direct children of this pid
+        """
+        return [
+            pid for pid, ppid, _ in self._lookup(identifier)
+            if parent is None or ppid == parent
+        ]
+
+    def groups(
+            self, identifier: str, parent: tp.Union[int, None] = None
+    ) -> list[tuple[int, int]]:
+        """
+        like `pids`, but (pid, process group id) of every matching process
+        """
+        return [
+            (pid, pgid) for pid, ppid, pgid in self._lookup(identifier)
+            if parent is None or ppid == parent
+        ]
+
+    def invalidate(self) -> None:
+        """
+        drop cached results, the next lookup rescans
+        """
+        self._cache.clear()
@@ -0,0 +1,170 @@
+"""
+_profiler.py
+
+timers and counters for the hot paths of the ui
+"""
+from time import perf_counter, time
+import typing as tp
+import json
+
+
+class StageStats(tp.TypedDict):
+    count: int
+    total: float  # seconds
+    max: float
+    last: float
+
+
+class GaugeStats(tp.TypedDict):
+    value: float
+    max: float
+
+
+class _Stage:
+    """
+    times one stage, reused for every run of it
+    """
+    __slots__ = ("stats", "_start")
+
+    def __init__(self) -> None:
+        self.stats: StageStats = {"count": 0, "total": 0., "max": 0., "last": 0.}
+        self._start = 0.
+
+    def __enter__(self) -> None:
+        self._start = perf_counter()
+
+    def __exit__(self, *_trash) -> None:
+        took = perf_counter() - self._start
+        stats = self.stats
+        stats["count"] += 1
+        stats["total"] += took
+        stats["last"] = took
+        if took > stats["max"]:
+            stats["max"] = took
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *_trash) -> None:
+        pass
+
+
+_NO_STAGE = _NoStage()
+
+
+class Profiler:
+    """
+    collects stage timings, counters and gauges
+
+    `stage` is meant for the tk thread (a stage must not be nested in
+    itself), `count` and `gauge` may be used from other threads as long as
+    every name is only written by one thread.
+    """
+    enabled: bool = True
+    started: float = ...
+
+    _stages: dict[str, _Stage] = ...
+    _counters: dict[str, int] = ...
+    _gauges: dict[str, GaugeStats] = ...
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.reset()
+
+    def stage(self, name: str) -> tp.ContextManager[None]:
+        """
+        time a block of code
+
+        >>> with PROFILER.stage("term.insert"):
+        ...     insert()
+        """
+        if not self.enabled:
+            return _NO_STAGE
+
+        try:
+            return self._stages[name]
+
+        except KeyError:
+            stage = self._stages[name] = _Stage()
+            return stage
+
+    def count(self, name: str, n: int = 1) -> None:
+        if self.enabled:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def gauge(self, name: str, value: float) -> None:
+        """
+        record the current value of something (e.g. a queue depth)
+        """
+        if not self.enabled:
+            return
+
+        stats = self._gauges.get(name)
+        if stats is None:
+            self._gauges[name] = {"value": value, "max": value}
+
+        else:
+            stats["value"] = value
+            if value > stats["max"]:
+                stats["max"] = value
+
+    def snapshot(self) -> dict[str, tp.Any]:
+        """
+        copy of everything collected so far
+        """
+        return {
+            "started": self.started,
+            "time": time(),
+            # list() copies in one go, other threads may add names
+            "stages": {name: dict(stage.stats)
+                       for name, stage in list(self._stages.items())},
+            "counters": dict(list(self._counters.items())),
+            "gauges": {name: dict(stats)
+                       for name, stats in list(self._gauges.items())},
+        }
+
+    def report(self) -> str:
+        """
+        human readable table of the current values
+        """
+        snapshot = self.snapshot()
+        lines = [f"{'stage':<28}{'n':>8}{'avg ms':>9}{'max ms':>9}{'last ms':>9}"]
+        for name, stats in sorted(snapshot["stages"].items()):
+            avg = stats["total"] / stats["count"] if stats["count"] else 0
+            lines.append(
+                f"{name:<28}{stats['count']:>8}{avg * 1000:>9.2f}"
+                f"{stats['max'] * 1000:>9.2f}{stats['last'] * 1000:>9.2f}"
+            )
+
+        elapsed = max(snapshot["time"] - self.started, 1e-9)
+        lines.append("")
+        lines.append(f"{'counter':<28}{'total':>14}{'per s':>12}")
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"{name:<28}{value:>14}{value / elapsed:>12.0f}")
+
+        lines.append("")
+        lines.append(f"{'gauge':<28}{'value':>14}{'max':>12}")
+        for name, stats in sorted(snapshot["gauges"].items()):
+            lines.append(f"{name:<28}{stats['value']:>14g}{stats['max']:>12g}")
+
+        return "\n".join(lines)
+
+    def dump(self, path: str) -> None:
+        """
+        write everything collected to a json file
+        """
+        with open(path, "w") as out:
+            json.dump(self.snapshot(), out, indent=4)
+
+    def reset(self) -> None:
+        self.started = time()
+        self._stages = {}
+        self._counters = {}
+        self._gauges = {}
+
+
+PROFILER = Profiler()
@@ -0,0 +1,310 @@
+"""
+_program_catalog.py
+
+keeps track of the runnable projects in the program directories
+"""
+from fnmatch import fnmatch
+import ctypes.util
+import typing as tp
+import ctypes
+import struct
+import os
+
+
+RUN_FILE: str = "run/main"
+
+# inotify constants (see inotify(7))
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO \
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+_EVENT = struct.Struct("iIII")
+
+
+class Inotify:
+    """
+    minimal inotify binding using ctypes
+    """
+    _fd: int = ...
+
+    def __init__(self) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def add_watch(self, path: str, mask: int = WATCH_MASK) -> int:
+        """
+        :return: watch descriptor
+        """
+        wd = self._add_watch(self._fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"can't watch \"{path}\"")
+
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        # fails if the kernel already removed the watch, that's fine
+        self._rm_watch(self._fd, wd)
+
+    def read(self) -> list[tuple[int, int, str]]:
+        """
+        read all pending events
+        :return: (watch descriptor, mask, name) for every event
+        """
+        events: list[tuple[int, int, str]] = []
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+
+            except BlockingIOError:
+                break
+
+            pos = 0
+            while pos < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, pos)
+                pos += _EVENT.size
+                name = data[pos:pos + length].rstrip(b"\0")
+                pos += length
+                events.append((wd, mask, os.fsdecode(name)))
+
+        return events
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class ProgramCatalog:
+    """
+    index of all runnable projects (directories containing an executable
+    `run/main`) in the program directories
+
+    Uses inotify to only rescan a directory when something in it changed,
+    falls back to comparing modification times where inotify isn't
+    available.
+    """
+    directories: list[str] = ...
+    ignores: list[str] = ...
+    programs: dict[str, str] = ...
+
+    _inotify: tp.Union[Inotify, None] = None
+    _found: dict[str, dict[str, str]] = ...
+    _projects: dict[str, list[str]] = ...
+    _watches: dict[str, int] = ...
+    _watch_dirs: dict[int, str] = ...
+    _dirty: set[str] = ...
+    _signatures: dict[str, tuple] = ...
+
+    def __init__(
+            self, directories: list[str], ignores: list[str],
+            use_inotify: bool = True
+    ) -> None:
+        self.directories = list(directories)
+        self.ignores = list(ignores)
+        self.programs = {}
+        self._found = {}
+        self._projects = {}
+        self._watches = {}
+        self._watch_dirs = {}
+        self._signatures = {}
+        self._dirty = set(self.directories)
+
+        if use_inotify:
+            try:
+                self._inotify = Inotify()
+
+            except (OSError, AttributeError, TypeError):
+                # no inotify on this system
+                self._inotify = None
+
+        self.refresh()
+
+    def fileno(self) -> tp.Union[int, None]:
+        """
+        file descriptor that becomes readable on changes,
+        None if polling is used
+        """
+        return self._inotify.fileno() if self._inotify is not None else None
+
+    def is_ignored(self, name: str, path: str) -> bool:
+        return any(
+            fnmatch(name, pattern) or fnmatch(path, pattern)
+            for pattern in self.ignores
+        )
+
+    @staticmethod
+    def is_runnable(path: str) -> bool:
+        """
+        True if the project contains an executable run file
+        """
+        run_file = os.path.join(path, RUN_FILE)
+        return os.path.isfile(run_file) and os.access(run_file, os.X_OK)
+
+    def _scan(self, directory: str) -> tuple[dict[str, str], list[str]]:
+        """
+        :return: runnable projects (name -> path) and all
+            project directories (to watch)
+        """
+        found: dict[str, str] = {}
+        projects: list[str] = []
+        try:
+            entries = sorted(os.listdir(directory))
+
+        except OSError:
+            return found, projects
+
+        for name in entries:
+            path = os.path.join(directory, name)
+            if not os.path.isdir(path) or self.is_ignored(name, path):
+                continue
+
+            projects.append(path)
+            if self.is_runnable(path):
+                found[name] = path
+
+        return found, projects
+
+    def _signature(self, directory: str) -> tuple:
+        """
+        modification times of everything a rescan depends on
+        """
+        paths = [directory]
+        for path in self._projects.get(directory, []):
+            paths += [path, os.path.join(path, "run"), os.path.join(path, RUN_FILE)]
+
+        signature = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_mode))
+
+            except OSError:
+                signature.append(None)
+
+        return tuple(signature)
+
+    def _update_watches(self, directory: str, projects: list[str]) -> None:
+        """
+        watch the directory, its projects and their run directories
+        """
+        wanted = {directory} if os.path.isdir(directory) else set()
+        for path in projects:
+            wanted.add(path)
+            run_dir = os.path.join(path, "run")
+            if os.path.isdir(run_dir):
+                wanted.add(run_dir)
+
+        for path in [p for p, wd in self._watches.items()
+                     if self._watch_dirs.get(wd) == directory and p not in wanted]:
+            wd = self._watches.pop(path)
+            self._watch_dirs.pop(wd, None)
+            self._inotify.rm_watch(wd)
+
+        for path in wanted - set(self._watches):
+            try:
+                wd = self._inotify.add_watch(path)
+
+            except OSError:
+                continue
+
+            self._watches[path] = wd
+            self._watch_dirs[wd] = directory
+
+    def _process_events(self) -> None:
+        for wd, mask, _ in self._inotify.read():
+            if mask & IN_Q_OVERFLOW:
+                self._dirty.update(self.directories)
+                continue
+
+            directory = self._watch_dirs.get(wd)
+            if directory is not None:
+                self._dirty.add(directory)
+
+            if mask & IN_IGNORED:
+                # watched directory is gone
+                for path, w in list(self._watches.items()):
+                    if w == wd:
+                        del self._watches[path]
+
+                self._watch_dirs.pop(wd, None)
+
+        # directories that don't exist (yet) can't be watched
+        for directory in self.directories:
+            if directory not in self._watches:
+                if os.path.isdir(directory) or self._found.get(directory):
+                    self._dirty.add(directory)
+
+    def _check_signatures(self) -> None:
+        """
+        mark directories whose modification times changed (no inotify)
+        """
+        for directory in self.directories:
+            signature = self._signature(directory)
+            if signature != self._signatures.get(directory):
+                self._signatures[directory] = signature
+                self._dirty.add(directory)
+
+    def _rescan(self, directory: str) -> None:
+        self._found[directory], self._projects[directory] = \
+            self._scan(directory)
+        if self._inotify is not None:
+            self._update_watches(directory, self._projects[directory])
+
+        else:
+            self._signatures[directory] = self._signature(directory)
+
+    def refresh(self) -> bool:
+        """
+        update the catalog
+        :return: True if programs were added, removed or renamed
+        """
+        if self._inotify is not None:
+            self._process_events()
+
+        else:
+            self._check_signatures()
+
+        if not self._dirty:
+            return False
+
+        for directory in self._dirty:
+            self._rescan(directory)
+
+        self._dirty.clear()
+
+        programs: dict[str, str] = {}
+        for directory in self.directories:
+            for name, path in self._found.get(directory, {}).items():
+                if name not in programs:
+                    programs[name] = path
+
+        if programs == self.programs:
+            return False
+
+        self.programs = programs
+        return True
+
+    def close(self) -> None:
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
@@ -0,0 +1,56 @@
+"""
+_pty.py
+
+pseudo terminal helpers, programs attached to a tty line-buffer their
+output instead of sending it in 4 KB blocks
+"""
+import typing as tp
+import struct
+import os
+
+try:
+    import termios
+    import fcntl
+    import tty
+
+    PTY_SUPPORTED: bool = hasattr(os, "openpty")
+
+except ImportError:
+    PTY_SUPPORTED: bool = False
+
+
+def set_winsize(fd: int, cols: int, rows: int) -> None:
+    """
+    set the window size of a pseudo terminal
+    """
+    fcntl.ioctl(
+        fd, termios.TIOCSWINSZ,
+        struct.pack("HHHH", max(rows, 1), max(cols, 1), 0, 0)
+    )
+
+
+def open_pty(cols: int = 80, rows: int = 24) -> tuple[int, int]:
+    """
+    open a pseudo terminal in raw mode
+
+    Raw mode passes keystrokes through unchanged (no echo, no line editing,
+    no signal keys) and doesn't turn "\\n" into "\\r\\n", so the program
+    sees the same bytes it would with pipes.
+
+    :return: (master, slave) file descriptors
+    """
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    set_winsize(master, cols, rows)
+    return master, slave
+
+
+def close_fd(fd: tp.Union[int, None]) -> None:
+    if fd is None:
+        return
+
+    try:
+        os.close(fd)
+
+    except OSError:
+        pass
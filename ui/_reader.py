@@ -0,0 +1,109 @@
+"""
+_reader.py
+
+chunked, non-blocking reading of a programs output pipes
+"""
+import selectors
+import codecs
+import typing as tp
+import os
+
+
+CHUNK_SIZE: int = 64 * 1024
+
+
+class StreamDecoder:
+    """
+    incremental utf-8 decoder, keeps incomplete multi-byte
+    sequences until the next chunk arrives
+    """
+    def __init__(self, encoding: str = "utf-8") -> None:
+        self._decoder = codecs.getincrementaldecoder(encoding)(
+            errors="replace"
+        )
+
+    def decode(self, data: bytes, final: bool = False) -> str:
+        """
+        decode a chunk
+        :param data: raw bytes
+        :param final: True if no more data will follow
+        """
+        return self._decoder.decode(data, final)
+
+    def reset(self) -> None:
+        self._decoder.reset()
+
+
+class ChunkReader:
+    """
+    reads registered pipes in large chunks as soon as they are readable
+    """
+    _selector: selectors.BaseSelector = ...
+    chunk_size: int = CHUNK_SIZE
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE) -> None:
+        self._selector = selectors.DefaultSelector()
+        self.chunk_size = chunk_size
+
+    def register(self, pipe: tp.Union[tp.IO, int], key: tp.Hashable) -> None:
+        """
+        register a pipe
+        :param pipe: file object or file descriptor
+        :param key: returned alongside each chunk read from this pipe
+        """
+        fd = pipe if isinstance(pipe, int) else pipe.fileno()
+        os.set_blocking(fd, False)
+        self._selector.register(fd, selectors.EVENT_READ, key)
+
+    def unregister_all(self) -> None:
+        """
+        forget all registered pipes (doesn't close them)
+        """
+        for key in list(self._selector.get_map().values()):
+            self._selector.unregister(key.fd)
+
+    @property
+    def active(self) -> bool:
+        """
+        True if any pipe is still open
+        """
+        return bool(self._selector.get_map())
+
+    def read(
+            self, timeout: tp.Union[float, None] = None
+    ) -> list[tuple[tp.Hashable, bytes]]:
+        """
+        wait for data and drain every readable pipe
+
+        :param timeout: max time to wait in seconds
+        :return: (key, chunk) pairs, an empty chunk means EOF
+        """
+        if not self.active:
+            return []
+
+        out: list[tuple[tp.Hashable, bytes]] = []
+        for key, _ in self._selector.select(timeout):
+            while True:
+                try:
+                    chunk = os.read(key.fd, self.chunk_size)
+
+                except BlockingIOError:
+                    break
+
+                except OSError:
+                    chunk = b""
+
+                out.append((key.data, chunk))
+                if not chunk:
+                    # EOF, pipe is done
+                    self._selector.unregister(key.fd)
+                    break
+
+                if len(chunk) < self.chunk_size:
+                    break
+
+        return out
+
+    def close(self) -> None:
+        self.unregister_all()
+        self._selector.close()
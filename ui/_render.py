@@ -0,0 +1,113 @@
+"""
+_render.py
+
+collects output between frames and hands it out in frame sized batches
+"""
+from ._tk_term_colors import Style
+from collections import deque
+import typing as tp
+
+
+def coalesce(spans: tp.Iterable[tuple[str, Style]]) -> list[tuple[str, Style]]:
+    """
+    merge neighbouring runs with the same style
+    """
+    out: list[tuple[str, Style]] = []
+    texts: list[str] = []
+    curr_style: tp.Union[Style, None] = None
+    for text, style in spans:
+        if style != curr_style:
+            if texts:
+                out.append(("".join(texts), curr_style))
+
+            texts = []
+            curr_style = style
+
+        texts.append(text)
+
+    if texts:
+        out.append(("".join(texts), curr_style))
+
+    return out
+
+
+class FrameRenderer:
+    """
+    queue of pending output, handed out in batches that can be inserted
+    within the per frame time budget
+
+    The batch size adapts to how long the last insert took, so a flood of
+    output can't block the tk thread (and with it input handling).
+    """
+    budget: float = ...
+    chars_per_frame: int = ...
+    min_chars: int = 1024
+    max_chars: int = 1024 * 1024
+
+    _queue: tp.Deque[tuple[str, Style]] = ...
+    _n_chars: int = 0
+
+    def __init__(self, budget: float = .008, chars_per_frame: int = 32 * 1024) -> None:
+        """
+        :param budget: seconds one frame may spend inserting
+        :param chars_per_frame: initial batch size
+        """
+        self.budget = budget
+        self.chars_per_frame = chars_per_frame
+        self._queue = deque()
+
+    @property
+    def pending(self) -> int:
+        """
+        number of characters waiting to be rendered
+        """
+        return self._n_chars
+
+    def push(self, spans: tp.Iterable[tuple[str, Style]]) -> None:
+        for span in spans:
+            self._queue.append(span)
+            self._n_chars += len(span[0])
+
+    def take(self) -> list[tuple[str, Style]]:
+        """
+        get the next batch, merged into as few runs as possible
+        """
+        batch: list[tuple[str, Style]] = []
+        n_chars = 0
+        while self._queue and n_chars < self.chars_per_frame:
+            text, style = self._queue.popleft()
+            left = self.chars_per_frame - n_chars
+            if len(text) > left:
+                # split, the rest is rendered next frame
+                self._queue.appendleft((text[left:], style))
+                text = text[:left]
+
+            batch.append((text, style))
+            n_chars += len(text)
+
+        self._n_chars -= n_chars
+        return coalesce(batch)
+
+    def take_all(self) -> list[tuple[str, Style]]:
+        """
+        everything that is waiting, regardless of the frame budget
+        """
+        batch = coalesce(self._queue)
+        self.clear()
+        return batch
+
+    def report(self, took: float) -> None:
+        """
+        adapt the batch size to how long rendering the last one took
+
+        :param took: seconds spent rendering the last batch
+        """
+        if took > self.budget:
+            self.chars_per_frame = max(self.chars_per_frame // 2, self.min_chars)
+
+        elif took < self.budget / 2:
+            self.chars_per_frame = min(self.chars_per_frame * 2, self.max_chars)
+
+    def clear(self) -> None:
+        self._queue.clear()
+        self._n_chars = 0
@@ -7,22 +7,20 @@ Frame shown when "run" is selected
 Author:
 Nilusink
 """
-from concurrent.futures import ThreadPoolExecutor
 from ._term_box import TermBox
 from ._template_box import TemplateBox
+from ._scheduler import Scheduler
+from ._program_catalog import ProgramCatalog
+from ._profiler import PROFILER
+from ._view_state import ViewState
+from ._run_manager import RunManager
+from ._session import Session
+from ._config import WindowConfig
 from .kill import get_n_running
+from time import perf_counter
 import customtkinter as ctk
 import typing as tp
-import os
-
-
-class WindowConfig(tp.TypedDict):
-    appearance_mode: tp.Literal["dark", "light"]
-    program_directories: list[str]
-    program_ignores: list[str]
-    keyboard: list[tuple[str, str]]
-    fullscreen: bool
-    theme: str
+import re
 
 
 class RunFrame(ctk.CTkFrame):
@@ -31,18 +29,37 @@ class RunFrame(ctk.CTkFrame):
     """
     running: bool = True
     programs: dict[str, str] = ...
-    _pool: ThreadPoolExecutor = ...
+    catalog: ProgramCatalog = ...
     _selected_program: tp.Union[str, None] = None
     window_config: WindowConfig = ...
+    scheduler: Scheduler = ...
+    view: ViewState = ...
+    manager: RunManager = ...
+    _session_labels: dict[str, str] = ...
+    _ready_for: tp.Union[str, None] = None  # command last prepared
+    _cancel_timers: list[tp.Callable[[], None]] = ...
+    _search_valid: bool = True
+    _search_query: tuple[str, bool] = ("", False)
 
     std_out_templates: TemplateBox
 
-    def __init__(self, window_config: WindowConfig, keyboard: ctk.Variable, *args, **kwargs) -> None:
+    def __init__(
+            self,
+            window_config: WindowConfig,
+            keyboard: ctk.Variable,
+            scheduler: Scheduler,
+            *args,
+            **kwargs
+    ) -> None:
         # mutable defaults
         self.window_config = window_config
-        self._err_to_insert = []
-        self._to_insert = []
+        self.scheduler = scheduler
         self.programs = {}
+        self._session_labels = {}
+        self.catalog = ProgramCatalog(
+            window_config["program_directories"],
+            window_config["program_ignores"]
+        )
 
         # init parent class
         super().__init__(*args, **kwargs)
@@ -50,7 +67,9 @@ class RunFrame(ctk.CTkFrame):
         # ui layout
         self.grid_rowconfigure(0, weight=0)
         self.grid_rowconfigure(1, weight=0)
-        self.grid_rowconfigure(2, weight=1)
+        self.grid_rowconfigure(2, weight=0)
+        self.grid_rowconfigure(3, weight=1)
+        self.grid_rowconfigure(4, weight=0)
         self.grid_columnconfigure(0, weight=3)
         self.grid_columnconfigure(1, weight=1)
 
@@ -81,7 +100,81 @@ class RunFrame(ctk.CTkFrame):
             text="currently running: 0"
         )
 
-        self.std_out = TermBox(self, font=("Sans-Serif", 20))
+        self.std_out = TermBox(
+            self,
+            font=("Sans-Serif", 20),
+            on_output=scheduler.wake,
+            scrollback_lines=window_config["scrollback_lines"],
+            scrollback_bytes=window_config["scrollback_bytes"],
+            run_mode=window_config["run_mode"],
+            log_directory=window_config["log_directory"],
+            log_max_bytes=window_config["log_max_bytes"],
+            log_max_files=window_config["log_max_files"],
+            max_display_rate=window_config["max_display_rate"],
+            throttle_lines=window_config["throttle_lines"],
+            telemetry_samples=window_config["telemetry_samples"],
+            plot_samples=window_config["plot_samples"]
+        )
+        self.manager = RunManager(self.std_out.launcher, on_output=scheduler.wake)
+
+        # one tab per started program, above the output
+        self.session_bar = ctk.CTkFrame(self, fg_color="transparent")
+        self.session_bar.grid_columnconfigure(0, weight=1)
+        self.session_tabs = ctk.CTkSegmentedButton(
+            self.session_bar,
+            values=[],
+            font=("Sans-Serif", 20),
+            height=40,
+            command=self._focus_session
+        )
+        self.session_tabs.grid(row=0, column=0, sticky="w")
+        ctk.CTkButton(
+            self.session_bar,
+            text="✕",
+            font=("Sans-Serif", 20),
+            width=40,
+            height=40,
+            command=self._close_session
+        ).grid(row=0, column=1, padx=(10, 0))
+
+        # search bar below the output
+        self.search_bar = ctk.CTkFrame(self, fg_color="transparent")
+        self.search_bar.grid_columnconfigure(0, weight=1)
+        self.search_entry = ctk.CTkEntry(
+            self.search_bar,
+            font=("Sans-Serif", 20),
+            placeholder_text="Search",
+            height=50
+        )
+        self.search_entry.bind("<KeyRelease>", self._search)
+        self.search_regex = ctk.CTkCheckBox(
+            self.search_bar,
+            text="Regex",
+            font=("Sans-Serif", 20),
+            command=self._search
+        )
+        self.search_results_l = ctk.CTkLabel(
+            self.search_bar,
+            font=("Sans-Serif", 20),
+            text="",
+            width=120
+        )
+        ctk.CTkButton(
+            self.search_bar,
+            text="▲",
+            font=("Sans-Serif", 20),
+            width=60,
+            height=50,
+            command=lambda: self._search_step(-1)
+        ).grid(row=0, column=3, padx=(10, 0))
+        ctk.CTkButton(
+            self.search_bar,
+            text="▼",
+            font=("Sans-Serif", 20),
+            width=60,
+            height=50,
+            command=lambda: self._search_step(1)
+        ).grid(row=0, column=4, padx=(10, 0))
 
         self.std_out_templates = TemplateBox(
             self,
@@ -93,16 +186,56 @@ class RunFrame(ctk.CTkFrame):
 
         self.__grid_widgets()
 
+        # only changed values are pushed to the widgets
+        self.view = ViewState()
+        self.view.bind(("running",), self._render_button)
+        self.view.bind(("n_running", "run_info"), self._render_n_running)
+        self.view.bind(("programs",), self._render_programs)
+        self.view.bind(("selected",), self._render_selected)
+        self.view.bind(("search_results",), self._render_search_results)
+        self.view.bind(("sessions", "focused"), self._render_sessions)
+        self.view.set(
+            running=False,
+            n_running=0,
+            sessions=(),
+            focused=None,
+            run_info="",
+            programs=tuple(self.programs),
+            selected=self._selected_name()
+        )
+        self.view.flush()
+
+        # events
+        scheduler.on_frame(self.update)
+        catalog_fd = self.catalog.fileno()
+        if catalog_fd is not None:
+            scheduler.watch_fd(catalog_fd, self.update_program_list)
+
+        self._cancel_timers = [
+            scheduler.every(1000, self.update_running),
+            # with inotify only needed for directories that don't exist yet
+            scheduler.every(
+                2000 if catalog_fd is None else 10_000,
+                self.update_program_list
+            ),
+        ]
+        self._prepare_selected(running=False)
+
     def __grid_widgets(self) -> None:
         # Column 0
         self.programs_combo.grid(row=0, column=0, sticky="nsew", padx=30, pady=(10, 0))
+        self.session_bar.grid(row=2, column=0, sticky="nsew", padx=20, pady=(10, 0))
         self.std_out.grid(
-            row=2,
+            row=3,
             column=0,
             sticky="nsew",
             padx=20,
-            pady=20
+            pady=(10, 0)
         )
+        self.search_bar.grid(row=4, column=0, sticky="nsew", padx=20, pady=(10, 20))
+        self.search_entry.grid(row=0, column=0, sticky="ew")
+        self.search_regex.grid(row=0, column=1, padx=(10, 0))
+        self.search_results_l.grid(row=0, column=2, padx=(10, 0))
 
         self.curr_running_l.grid(
             row=1,
@@ -120,7 +253,7 @@ class RunFrame(ctk.CTkFrame):
             pady=(10, 0)
         )
         self.std_out_templates.grid(
-            row=2, column=1,
+            row=2, column=1, rowspan=3,
             sticky="NSEW",
             padx=20,
             pady=20
@@ -129,29 +262,17 @@ class RunFrame(ctk.CTkFrame):
     def update_programs(self) -> bool:
         """
         update shown programs
-        :return: True if new programs
+        :return: True if programs were added or removed
         """
-        changed = False
-        for program_dir in self.window_config["program_directories"]:
-            if os.path.exists(program_dir):
-                for directory in [d for d in os.listdir(program_dir) if
-                                  os.path.isdir(program_dir + "/" + d)]:
+        self.catalog.refresh()
+        if self.catalog.programs == self.programs:
+            return False
 
-                    program_name = directory.split("/")[-1]
-                    program_path = program_dir + "/" + directory
+        self.programs = dict(self.catalog.programs)
+        if self._selected_program not in self.programs.values():
+            self._selected_program = next(iter(self.programs.values()), None)
 
-                    if program_name not in self.programs:
-                        changed = True
-                        self.programs[program_name] = program_path
-
-                        if self._selected_program is None:
-                            self._selected_program = program_path
-
-            else:
-                ...
-                #print(f"directory doesnt' exist: \"{program_dir}\"")
-
-        return changed
+        return True
 
     def _select_program(self, value: str) -> None:
         """
@@ -160,47 +281,269 @@ class RunFrame(ctk.CTkFrame):
         """
         if value in self.programs:
             self._selected_program = self.programs[value]
+            # the combo shows it already
+            self.view.set(selected=value)
+            if value in self.manager.sessions:
+                self._show_session(value)
+
+            self.update()
 
     def _run_program(self, *_trash) -> None:
         """
         run a program
         """
-        if self._selected_program is not None:
-            self._running_program = self.std_out.run_program(
-                self._selected_program + "/run/main"
-            )
+        pressed = perf_counter()
+        name = self._selected_name()
+        if self._selected_program is None or self.manager.is_running(name):
+            return
+
+        # start first, updating the ui can wait
+        session = self.manager.start(
+            name, self._selected_program + "/run/main", self.std_out.term_size,
+            pressed=pressed
+        )
+        self._ready_for = None
+        self.std_out.attach(session)
+
+        self.scheduler.request_frame()
+
+    def _prepare_selected(self, running: bool) -> None:
+        """
+        get the selected program ready, so pressing Start only has to
+        execute it
+        """
+        if not self.window_config["prewarm"] or running \
+                or self._selected_program is None:
+            return
+
+        command = self._selected_program + "/run/main"
+        if command != self._ready_for:
+            self._ready_for = command
+            self.manager.prepare(command, self.std_out.term_size)
+
+    def _focus_session(self, label: str) -> None:
+        """
+        show another program's output, called by the tabs
+        """
+        name = self._session_labels.get(label)
+        if name is None:
+            return
+
+        self._show_session(name)
+        if name in self.programs:
+            self._selected_program = self.programs[name]
+            self.view.set(selected=name)
+
+        self.update()
+
+    def _show_session(self, name: tp.Union[str, None]) -> None:
+        self.std_out.attach(self.manager.focus(name))
+        self.scheduler.request_frame()
+
+    def _close_session(self) -> None:
+        """
+        close the shown tab, kills its program if it still runs
+        """
+        if self.manager.focused is None:
+            return
+
+        self.manager.remove(self.manager.focused)
+        self._show_session(self.manager.focused)
+        self.update()
+
+    def _search(self, *_trash) -> None:
+        """
+        search the output for the entered text
+        """
+        query = (self.search_entry.get(), bool(self.search_regex.get()))
+        if query == self._search_query:
+            # e.g. cursor keys
+            return
+
+        self._search_query = query
+        try:
+            self.std_out.search(*query)
+
+        except re.error:
+            # incomplete while typing
+            self._search_valid = False
+            self._update_search_results()
+            return
+
+        self._search_valid = True
+        self._update_search_results()
+        self.scheduler.request_frame()
+
+    def _search_step(self, direction: int) -> None:
+        self.std_out.search_step(direction)
+        self._update_search_results()
+
+    def _update_search_results(self) -> None:
+        current, total = self.std_out.search_results
+        if not self._search_valid:
+            text = "invalid"
+
+        else:
+            text = f"{current}/{total}" if self.search_entry.get() else ""
+
+        self.view.set(search_results=text)
+        self.view.flush()
 
     def _kill_program(self, *_trash) -> None:
         """
-        kill the currently running program
+        kill the selected program
+        """
+        session = self.manager.sessions.get(self._selected_name())
+        if session is not None:
+            session.kill()
+
+    def update_running(self) -> None:
+        """
+        update the currently running label
         """
-        self.std_out.kill_program()
+        with PROFILER.stage("run.get_n_running"):
+            self.view.set(n_running=get_n_running())
 
-    def update(self) -> None:
-        # update currently running
-        self.curr_running_l.configure(text=f"currently running: {get_n_running()}")
+        # telemetry doesn't wake the ui, its rate is updated here
+        self.view.set(run_info=self._run_info(
+            self.manager.sessions.get(self._selected_name())
+        ))
+        self.view.flush()
 
-        if self.update_programs():
+    def update_program_list(self) -> None:
+        """
+        update the program selection if programs were added or removed
+        """
+        with PROFILER.stage("run.update_programs"):
+            changed = self.update_programs()
+
+        if changed:
             print("updating: ", list(self.programs.keys()))
-            self.programs_combo.configure(values=list(self.programs.keys()))
+            # e.g. the selected program was missing before
+            self._ready_for = None
+            self.view.set(
+                programs=tuple(self.programs), selected=self._selected_name()
+            )
+            self.view.flush()
 
-        self.std_out.update()
-        self.program_button.configure(
-            text="Kill" if self.std_out.program_running else "Start"
-        )
-        self.program_button.configure(
-            fg_color="#aa3333" if self.std_out.program_running else "#3a7ebf"
-        )
+    def _selected_name(self) -> str:
+        selected = [name for name, path in self.programs.items()
+                    if path == self._selected_program]
+        return selected[0] if selected else ""
+
+    def update(self) -> bool:
+        """
+        redraw, called by the scheduler when something changed
+
+        :return: True if there is more to draw
+        """
+        # programs in background tabs only buffer
+        self.manager.pump()
+
+        with PROFILER.stage("run.term"):
+            more = self.std_out.update()
+
+        with PROFILER.stage("run.search_results"):
+            self._update_search_results()
+
+        with PROFILER.stage("run.button"):
+            session = self.manager.sessions.get(self._selected_name())
+            running = session is not None and session.running
+            self._prepare_selected(running)
+            self.view.set(
+                running=running,
+                run_info=self._run_info(session),
+                sessions=tuple([
+                    (name, other.running)
+                    for name, other in self.manager.sessions.items()
+                ]),
+                focused=self.manager.focused
+            )
+            self.view.flush()
+
+        return more
+
+    @staticmethod
+    def _run_info(session: tp.Union[Session, None]) -> str:
+        """
+        how fast the program started and stopped
+        """
+        if session is None:
+            return ""
+
+        info: list[str] = []
+        if session.press_to_exec is not None:
+            info.append(
+                f"started in {session.press_to_exec * 1000:.1f} ms"
+                + ("" if session.ready else " (cold)")
+            )
+
+        if session.telemetry is not None and session.telemetry.channels:
+            info.append(
+                f"telemetry: {len(session.telemetry.channels)} ch, "
+                f"{session.telemetry.rate / 1000:.1f} k/s"
+            )
+
+        if session.stop_report is not None:
+            info.append(str(session.stop_report))
+
+        return "  ·  ".join(info)
+
+    # rendering, called by the view state on changes only
+    def _render_button(self, view: ViewState) -> None:
+        running = view["running"]
         self.program_button.configure(
-            command=self._kill_program if self.std_out.program_running
-            else self._run_program
+            text="Kill" if running else "Start",
+            fg_color="#aa3333" if running else "#3a7ebf",
+            command=self._kill_program if running else self._run_program
         )
 
+    def _render_n_running(self, view: ViewState) -> None:
+        text = f"currently running: {view['n_running']}"
+        if view["run_info"]:
+            text += f"  ·  {view['run_info']}"
+
+        self.curr_running_l.configure(text=text)
+
+    def _render_programs(self, view: ViewState) -> None:
+        self.programs_combo.configure(values=list(view["programs"]))
+
+    def _render_selected(self, view: ViewState) -> None:
+        self.programs_combo.set(view["selected"])
+
+    def _render_search_results(self, view: ViewState) -> None:
+        self.search_results_l.configure(text=view["search_results"])
+
+    def _render_sessions(self, view: ViewState) -> None:
+        # running programs are marked, the label maps back to the program
+        self._session_labels = {
+            (f"● {name}" if running else name): name
+            for name, running in view["sessions"]
+        }
+        if not self._session_labels:
+            self.session_bar.grid_remove()
+            return
+
+        focused = [label for label, name in self._session_labels.items()
+                   if name == view["focused"]]
+        self.session_tabs.configure(values=list(self._session_labels))
+        self.session_tabs.set(focused[0] if focused else "")
+        self.session_bar.grid()
+
     def end(self) -> None:
         """
         close the program
         """
         self.running = False
+        for cancel in self._cancel_timers:
+            cancel()
+
+        if self.catalog.fileno() is not None:
+            self.scheduler.unwatch_fd(self.catalog.fileno())
+
+        self.catalog.close()
+
+        self.manager.end()
         self.std_out.end()
 
     def destroy(self):
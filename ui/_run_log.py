@@ -0,0 +1,235 @@
+"""
+_run_log.py
+
+persistent per-run logs of everything a program printed
+"""
+from traceback import format_exc
+import typing as tp
+import threading
+import queue
+import json
+import time
+import re
+import os
+
+
+LOG_SUFFIX: str = ".log"
+INDEX_SUFFIX: str = ".json"
+WRITE_BUFFER: int = 1024 * 1024
+MAX_STDERR_RANGES: int = 10_000
+
+
+class RunIndex(tp.TypedDict):
+    command: str
+    start: float
+    end: tp.Union[float, None]
+    exit_code: tp.Union[int, None]
+    size: int
+    parts: list[tuple[str, int]]   # (file name, offset of its first byte)
+    stderr: list[tuple[int, int]]  # (offset, length) of the stderr output
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", name).strip("_") or "run"
+
+
+class RunLog:
+    """
+    writes the raw stdout / stderr bytes of one run to disk
+
+    `write` only queues the bytes object (no decoding or copying), a
+    background thread does the actual buffered writes. A run bigger than
+    `max_bytes` is continued in a new part file, only the newest
+    `max_files` log files in the directory are kept.
+
+    Next to the log a small json index is written, containing start / end
+    time, exit code and the byte ranges written to stderr. Back to back
+    stderr chunks share one range, after `MAX_STDERR_RANGES` ranges the
+    last one grows over the rest of the stderr output (including the
+    stdout in between).
+    """
+    directory: str = ...
+    stem: str = ...
+    max_bytes: int = ...
+    max_files: int = ...
+    index: RunIndex = ...
+
+    _queue: "queue.SimpleQueue[tp.Union[tuple[str, bytes], None]]" = ...
+    _file: tp.Union[tp.BinaryIO, None] = None
+    _thread: threading.Thread = ...
+    _part_size: int = 0
+
+    def __init__(
+            self,
+            directory: str,
+            command: str,
+            name: str = "run",
+            max_bytes: int = 64 * 1024 * 1024,
+            max_files: int = 20
+    ) -> None:
+        """
+        :param directory: where to put the logs
+        :param command: command of the run (for the index)
+        :param name: part of the file name, usually the project name
+        :param max_bytes: max size of one log file, 0 for unlimited
+        :param max_files: max number of log files to keep, 0 for unlimited
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        now = time.time()
+        self.stem = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) \
+            + f"{int(now * 1000) % 1000:03d}-{_safe_name(name)}"
+        self.index = {
+            "command": command,
+            "start": now,
+            "end": None,
+            "exit_code": None,
+            "size": 0,
+            "parts": [],
+            "stderr": [],
+        }
+
+        os.makedirs(directory, exist_ok=True)
+        self._open_part()
+        self._write_index()
+        self._prune()
+
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    @property
+    def path(self) -> str:
+        """
+        path of the first log file
+        """
+        return os.path.join(self.directory, self.stem + LOG_SUFFIX)
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.directory, self.stem + INDEX_SUFFIX)
+
+    def write(self, stream: str, data: bytes) -> None:
+        """
+        queue output for writing (called from the capture threads)
+        """
+        if data:
+            self._queue.put((stream, data))
+
+    def close(self, exit_code: tp.Union[int, None] = None, timeout: float = 2.) -> None:
+        """
+        finish the run and wait (at most `timeout` seconds) until the writer
+        thread flushed everything queued before and wrote the final index,
+        it is a daemon and would be cut off if the ui exits right after
+        """
+        self.index["exit_code"] = exit_code
+        self._queue.put(None)
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
+
+    def _open_part(self) -> None:
+        n_part = len(self.index["parts"])
+        name = self.stem + (f".{n_part}" if n_part else "") + LOG_SUFFIX
+        self._file = open(
+            os.path.join(self.directory, name), "wb", buffering=WRITE_BUFFER
+        )
+        self._part_size = 0
+        self.index["parts"].append((name, self.index["size"]))
+
+    def _writer(self) -> None:
+        """
+        thread. writes queued output
+        """
+        try:
+            while (item := self._queue.get()) is not None:
+                stream, data = item
+                if self.max_bytes and self._part_size \
+                        and self._part_size + len(data) > self.max_bytes:
+                    self._file.close()
+                    self._open_part()
+                    self._prune()
+
+                if stream == "stderr":
+                    self._add_stderr(len(data))
+
+                self._file.write(data)
+                self._part_size += len(data)
+                self.index["size"] += len(data)
+
+        except Exception:
+            print("run log writer exited: ", format_exc())
+
+        finally:
+            self._file.close()
+            self.index["end"] = time.time()
+            self._write_index()
+
+    def _add_stderr(self, length: int) -> None:
+        ranges = self.index["stderr"]
+        offset = self.index["size"]
+        if ranges and (
+                len(ranges) >= MAX_STDERR_RANGES
+                or sum(ranges[-1]) == offset
+        ):
+            start = ranges[-1][0]
+            ranges[-1] = (start, offset + length - start)
+
+        else:
+            ranges.append((offset, length))
+
+    def _write_index(self) -> None:
+        with open(self.index_path, "w") as out:
+            json.dump(self.index, out, indent=4)
+
+    def _prune(self) -> None:
+        """
+        delete the oldest logs if there are too many
+        """
+        if not self.max_files:
+            return
+
+        logs = _by_age(self.directory)
+        for name in logs[:-self.max_files]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+                stem = name[:-len(LOG_SUFFIX)].split(".")[0]
+                if not any(f.startswith(stem) and f.endswith(LOG_SUFFIX)
+                           for f in os.listdir(self.directory)):
+                    os.remove(os.path.join(self.directory, stem + INDEX_SUFFIX))
+
+            except OSError:
+                pass
+
+
+def _by_age(directory: str) -> list[str]:
+    """
+    names of the log files in a directory, oldest first (by modification
+    time, names sort part files before their first part)
+    """
+    logs: list[tuple[float, str]] = []
+    for name in os.listdir(directory):
+        if name.endswith(LOG_SUFFIX):
+            try:
+                logs.append(
+                    (os.stat(os.path.join(directory, name)).st_mtime, name)
+                )
+
+            except OSError:
+                # deleted in between
+                pass
+
+    return [name for _, name in sorted(logs)]
+
+
+def list_logs(directory: str) -> list[str]:
+    """
+    all log files in a directory, newest first
+    """
+    try:
+        names = _by_age(directory)
+
+    except OSError:
+        return []
+
+    return [os.path.join(directory, name) for name in reversed(names)]
@@ -0,0 +1,178 @@
+"""
+_run_manager.py
+
+keeps track of every program started from the ui, several can run at once
+"""
+from ._session import Session, Launcher, Command, command_argv
+from ._prewarm import Prepared
+from ._profiler import PROFILER
+from time import monotonic
+import typing as tp
+
+
+class RunManager:
+    """
+    the sessions of all started programs, at most one per program
+
+    One session is focused (shown in the TermBox), the others only buffer
+    their output: `pump` moves it into their bounded scrollbacks, without
+    touching tk, so a chatty helper in the background costs next to nothing.
+    """
+    launcher: Launcher = ...
+    sessions: dict[str, Session] = ...
+    focused: tp.Union[str, None] = None
+    _on_output: tp.Callable[[], None] = ...
+    _prepared: tp.Union[Prepared, None] = None
+
+    def __init__(
+            self,
+            launcher: Launcher,
+            on_output: tp.Union[tp.Callable[[], None], None] = None
+    ) -> None:
+        """
+        :param launcher: starts the programs
+        :param on_output: called from the capture threads when any program
+            printed something or exited
+        """
+        self.launcher = launcher
+        self.sessions = {}
+        self._on_output = on_output if on_output is not None else lambda: None
+
+    def prepare(
+            self,
+            command: tp.Union[Command, None],
+            term_size: tp.Union[tuple[int, int], None] = (80, 24)
+    ) -> None:
+        """
+        get a program ready to be started (see `Launcher.prepare`), None to
+        drop the prepared one
+        """
+        if self._prepared is not None:
+            self._prepared.close()
+            self._prepared = None
+
+        if command is None:
+            return
+
+        try:
+            with PROFILER.stage("run.prepare"):
+                self._prepared = self.launcher.prepare(command, term_size)
+
+        except OSError as e:
+            # starting it will fail with the same error
+            print(f"can't prepare {command}: {e}")
+
+    def is_prepared(self, command: Command) -> bool:
+        return self._prepared is not None and self._prepared.matches(
+            command_argv(command), self._prepared.pty
+        )
+
+    def start(
+            self,
+            name: str,
+            command: Command,
+            term_size: tuple[int, int] = (80, 24),
+            pressed: tp.Union[float, None] = None
+    ) -> Session:
+        """
+        run a program and focus it, replaces the program's finished session
+
+        :param pressed: perf_counter time Start was pressed at
+        :raises RuntimeError: the program is already running
+        """
+        old = self.sessions.get(name)
+        if old is not None and old.running:
+            raise RuntimeError(f"\"{name}\" is already running")
+
+        prepared, self._prepared = self._prepared, None
+        try:
+            session = self.launcher.launch(
+                command, self._on_output, term_size, name=name,
+                prepared=prepared, pressed=pressed
+            )
+
+        finally:
+            if prepared is not None:
+                # only if it was for another program
+                prepared.close()
+
+        if old is not None:
+            old.stop()
+
+        self.sessions[name] = session
+        self.focused = name
+        return session
+
+    def focus(self, name: tp.Union[str, None]) -> tp.Union[Session, None]:
+        """
+        focus a session, None for none
+
+        :return: the focused session
+        """
+        if name is not None and name not in self.sessions:
+            raise KeyError(name)
+
+        self.focused = name
+        return self.current
+
+    @property
+    def current(self) -> tp.Union[Session, None]:
+        """
+        the focused session
+        """
+        return self.sessions.get(self.focused) if self.focused is not None else None
+
+    def remove(self, name: str) -> None:
+        """
+        close a session, kills its program if it still runs
+        """
+        session = self.sessions.pop(name)
+        session.kill()
+        session.stop()
+        if self.focused == name:
+            # the newest remaining one
+            self.focused = next(reversed(self.sessions), None)
+
+    def is_running(self, name: str) -> bool:
+        session = self.sessions.get(name)
+        return session is not None and session.running
+
+    @property
+    def n_running(self) -> int:
+        return sum([session.running for session in self.sessions.values()])
+
+    def pump(self) -> None:
+        """
+        buffer the output of all sessions in the background, stop what
+        exited programs left behind
+        """
+        with PROFILER.stage("sessions.pump"):
+            for name, session in self.sessions.items():
+                if name != self.focused:
+                    session.pump()
+
+                session.clean_up()
+
+    def end(self, timeout: float = 5) -> None:
+        """
+        kill all programs and wait (at most `timeout` seconds) until they
+        are gone, the ui exiting mustn't leave the motors running
+
+        Their last output is read and the run logs are closed before
+        returning, the capture threads are daemons and would be cut off.
+        """
+        stopping = [session.kill() for session in self.sessions.values()]
+        deadline = monotonic() + timeout
+        for thread in stopping:
+            if thread is not None:
+                thread.join(max(deadline - monotonic(), 0))
+
+        for session in self.sessions.values():
+            session.capture.join(max(deadline - monotonic(), 0))
+
+        for session in self.sessions.values():
+            session.stop()
+            # readers quit within their poll interval once stopped
+            session.capture.join(.5)
+
+        self.prepare(None)
@@ -0,0 +1,194 @@
+"""
+_scheduler.py
+
+event driven replacement for the busy main loop
+"""
+from ._profiler import PROFILER
+import tkinter as tk
+import typing as tp
+import select
+import time
+import os
+
+
+def _stage_name(kind: str, callback: tp.Callable) -> str:
+    """
+    profiler stage name of a callback, e.g. "frame.RunFrame.update"
+    """
+    return f"{kind}.{getattr(callback, '__qualname__', 'callback')}"
+
+
+class Scheduler:
+    """
+    wakes the tk main loop only when there is work to do
+
+    Frame callbacks are coalesced and run at most `max_fps` times per
+    second. A callback returning True has work left and gets another frame.
+    """
+    _root: tk.Misc = ...
+    _frame_callbacks: list[tuple[tp.Callable[[], tp.Union[bool, None]], str]] = ...
+    _fd_handlers: dict[int, tp.Callable[[], None]] = ...
+    _frame_job: tp.Union[str, None] = None
+    _poll_job: tp.Union[tp.Callable[[], None], None] = None
+    _last_frame: float = 0
+    _frame_due: float = 0
+    _frame_interval: float = ...
+
+    def __init__(self, root: tk.Misc, max_fps: float = 30) -> None:
+        self._root = root
+        self._frame_callbacks = []
+        self._fd_handlers = {}
+        self.max_fps = max_fps
+
+        # self pipe, lets other threads wake the tk thread
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self.watch_fd(self._wake_r, self._on_wake)
+
+    @property
+    def max_fps(self) -> float:
+        return 1 / self._frame_interval
+
+    @max_fps.setter
+    def max_fps(self, value: float) -> None:
+        self._frame_interval = 1 / max(value, 1)
+
+    def on_frame(self, callback: tp.Callable[[], tp.Union[bool, None]]) -> None:
+        """
+        run a callback on every frame
+        :param callback: returns True if it wants another frame
+        """
+        self._frame_callbacks.append((callback, _stage_name("frame", callback)))
+
+    def request_frame(self) -> None:
+        """
+        schedule a frame (tk thread only)
+        """
+        if self._frame_job is not None:
+            return
+
+        now = time.monotonic()
+        delay = max(self._last_frame + self._frame_interval - now, 0)
+        self._frame_due = now + delay
+        self._frame_job = self._root.after(int(delay * 1000), self._run_frame)
+
+    def wake(self) -> None:
+        """
+        schedule a frame, safe to call from any thread
+        """
+        try:
+            os.write(self._wake_w, b"\0")
+
+        except (BlockingIOError, OSError):
+            # already woken or closed
+            pass
+
+    def _on_wake(self) -> None:
+        try:
+            while os.read(self._wake_r, 4096):
+                pass
+
+        except (BlockingIOError, OSError):
+            pass
+
+        self.request_frame()
+
+    def _run_frame(self) -> None:
+        self._frame_job = None
+        self._last_frame = time.monotonic()
+        # how long tk was busy with other things
+        PROFILER.gauge("frame.late", self._last_frame - self._frame_due)
+
+        more = False
+        with PROFILER.stage("frame"):
+            for callback, name in self._frame_callbacks:
+                with PROFILER.stage(name):
+                    more = bool(callback()) or more
+
+        if more:
+            self.request_frame()
+
+    def every(
+            self, interval_ms: int, callback: tp.Callable[[], tp.Any]
+    ) -> tp.Callable[[], None]:
+        """
+        run a callback periodically
+
+        :param interval_ms: interval in milliseconds
+        :param callback: function to call
+        :return: function cancelling the timer
+        """
+        job: list[tp.Union[str, None]] = [None]
+        name = _stage_name("timer", callback)
+
+        def run() -> None:
+            job[0] = self._root.after(interval_ms, run)
+            with PROFILER.stage(name):
+                callback()
+
+        def cancel() -> None:
+            if job[0] is not None:
+                self._root.after_cancel(job[0])
+                job[0] = None
+
+        job[0] = self._root.after(interval_ms, run)
+        return cancel
+
+    def watch_fd(self, fd: int, callback: tp.Callable[[], None]) -> None:
+        """
+        call a function whenever a file descriptor becomes readable
+        """
+        self._fd_handlers[fd] = callback
+        name = _stage_name("fd", callback)
+
+        def run(*_trash) -> None:
+            with PROFILER.stage(name):
+                callback()
+
+        try:
+            self._root.tk.createfilehandler(fd, tk.READABLE, run)
+
+        except (AttributeError, tk.TclError):
+            # no file handlers on this platform, poll instead
+            if self._poll_job is None:
+                self._poll_job = self.every(20, self._poll_fds)
+
+    def unwatch_fd(self, fd: int) -> None:
+        """
+        stop watching a file descriptor
+        """
+        if self._fd_handlers.pop(fd, None) is None:
+            return
+
+        try:
+            self._root.tk.deletefilehandler(fd)
+
+        except (AttributeError, tk.TclError):
+            pass
+
+    def _poll_fds(self) -> None:
+        if not self._fd_handlers:
+            return
+
+        readable, _, _ = select.select(list(self._fd_handlers), [], [], 0)
+        for fd in readable:
+            if fd in self._fd_handlers:
+                self._fd_handlers[fd]()
+
+    def close(self) -> None:
+        """
+        stop everything
+        """
+        for fd in list(self._fd_handlers):
+            self.unwatch_fd(fd)
+
+        if self._poll_job is not None:
+            self._poll_job()
+
+        if self._frame_job is not None:
+            self._root.after_cancel(self._frame_job)
+            self._frame_job = None
+
+        os.close(self._wake_r)
+        os.close(self._wake_w)
@@ -0,0 +1,224 @@
+"""
+_scrollback.py
+
+bounded line buffer mirroring what a TermBox shows
+"""
+from ._tk_term_colors import Style
+from collections import deque
+import typing as tp
+
+
+# a line is its text plus (length, style) runs
+Line = tuple[str, tuple[tuple[int, Style], ...]]
+
+
+class Scrollback:
+    """
+    ring buffer of output lines
+
+    Lines beyond the limits are dropped in batches, the number of dropped
+    lines can be fetched with `take_trimmed` to remove them from the
+    texbox as well, the characters cut from the start of the unfinished
+    line with `take_partial_trimmed`.
+    """
+    max_lines: int = ...
+    max_bytes: int = ...
+    max_partial: int = ...
+    trim_batch: int = ...
+
+    _lines: tp.Deque[Line] = ...
+    _partial: list[tuple[str, Style]] = ...
+    _n_bytes: int = 0  # complete lines only
+    _partial_bytes: int = 0
+    _trimmed: int = 0
+    _partial_trimmed: int = 0
+    first_line: int = 0
+
+    def __init__(
+            self, max_lines: int = 10_000, max_bytes: int = 0,
+            trim_batch: int = 500, max_partial: int = 64 * 1024
+    ) -> None:
+        """
+        :param max_lines: max number of lines to keep, 0 for unlimited
+        :param max_bytes: max number of characters to keep, 0 for unlimited
+        :param trim_batch: how many lines over the limit before trimming
+        :param max_partial: max characters of the unfinished line (e.g. a
+            progress bar redrawn with "\r"), its start is dropped beyond
+        """
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.max_partial = max_partial
+        self.trim_batch = trim_batch
+        self._lines = deque()
+        self._partial = []
+
+    def __len__(self) -> int:
+        """
+        number of complete lines
+        """
+        return len(self._lines)
+
+    @property
+    def n_bytes(self) -> int:
+        return self._n_bytes + self._partial_bytes
+
+    @property
+    def lines(self) -> tp.Deque[Line]:
+        return self._lines
+
+    @property
+    def partial(self) -> list[tuple[str, Style]]:
+        """
+        runs of the line that isn't finished yet
+        """
+        return self._partial
+
+    def append(self, spans: tp.Iterable[tuple[str, Style]]) -> int:
+        """
+        add output
+
+        :param spans: (text, style) runs
+        :return: number of lines completed
+        """
+        n_before = len(self._lines)
+        partial = self._partial
+        partial_bytes = self._partial_bytes
+        for text, style in spans:
+            if "\n" not in text:
+                if text:
+                    partial.append((text, style))
+                    partial_bytes += len(text)
+
+                continue
+
+            parts = text.split("\n")
+
+            # the first part finishes the current line
+            if parts[0]:
+                partial.append((parts[0], style))
+
+            self._push(partial)
+            partial = []
+            partial_bytes = 0
+
+            # lines in between consist of a single run
+            middle = parts[1:-1]
+            if middle:
+                self._lines.extend([
+                    (part, ((len(part), style),)) for part in middle
+                ])
+                self._n_bytes += sum(map(len, middle)) + len(middle)
+
+            if parts[-1]:
+                partial.append((parts[-1], style))
+                partial_bytes += len(parts[-1])
+
+        self._partial = partial
+        self._partial_bytes = partial_bytes
+        self._cap_partial()
+        n_new = len(self._lines) - n_before
+        self._trim()
+        return n_new
+
+    def _push(self, runs: list[tuple[str, Style]]) -> None:
+        if len(runs) == 1:
+            text, style = runs[0]
+            self._lines.append((text, ((len(text), style),)))
+
+        else:
+            text = "".join([run[0] for run in runs])
+            self._lines.append(
+                (text, tuple([(len(run[0]), run[1]) for run in runs]))
+            )
+
+        self._n_bytes += len(text) + 1
+
+    def _cap_partial(self) -> None:
+        """
+        drop the start of an unfinished line that grew too long, lines stay
+        the same (a forced break would shift them against the textbox)
+        """
+        limit = self.max_partial
+        if self.max_bytes:
+            limit = min(limit, self.max_bytes)
+
+        if not limit or self._partial_bytes <= limit:
+            return
+
+        # a bit more than needed, to cut less often
+        excess = self._partial_bytes - (limit - limit // 10)
+        partial = self._partial
+        i = 0
+        while excess >= len(partial[i][0]):
+            excess -= len(partial[i][0])
+            i += 1
+
+        text, style = partial[i]
+        self._partial = [(text[excess:], style), *partial[i + 1:]]
+        n_before = self._partial_bytes
+        self._partial_bytes = sum([len(run[0]) for run in self._partial])
+        self._partial_trimmed += n_before - self._partial_bytes
+
+    def _trim(self) -> None:
+        n_drop = 0
+        if self.max_lines and len(self._lines) > self.max_lines + self.trim_batch:
+            n_drop = len(self._lines) - self.max_lines
+
+        if self.max_bytes and self.n_bytes > self.max_bytes:
+            # drop a bit more than needed to trim less often
+            target = self.max_bytes - self.max_bytes // 10 - self._partial_bytes
+            n_bytes = self._n_bytes
+            n_drop_bytes = 0
+            for text, _ in self._lines:
+                if n_bytes <= target:
+                    break
+
+                n_bytes -= len(text) + 1
+                n_drop_bytes += 1
+
+            n_drop = max(n_drop, n_drop_bytes)
+
+        popleft = self._lines.popleft
+        for _ in range(n_drop):
+            self._n_bytes -= len(popleft()[0]) + 1
+
+        self._trimmed += n_drop
+        self.first_line += n_drop
+
+    def take_trimmed(self) -> int:
+        """
+        lines dropped since the last call
+        """
+        n, self._trimmed = self._trimmed, 0
+        return n
+
+    def take_partial_trimmed(self) -> int:
+        """
+        characters cut from the start of the unfinished line since the last
+        call
+        """
+        n, self._partial_trimmed = self._partial_trimmed, 0
+        return n
+
+    def iter_spans(self) -> tp.Iterator[tuple[str, Style]]:
+        """
+        all buffered output as (text, style) runs
+        """
+        for text, runs in self._lines:
+            pos = 0
+            for length, style in runs:
+                yield text[pos:pos + length], style
+                pos += length
+
+            yield "\n", ()
+
+        yield from self._partial
+
+    def clear(self) -> None:
+        self._lines.clear()
+        self._partial = []
+        self._n_bytes = 0
+        self._partial_bytes = 0
+        self._trimmed = 0
+        self._partial_trimmed = 0
+        self.first_line = 0
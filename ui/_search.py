@@ -0,0 +1,137 @@
+"""
+_search.py
+
+searches the scrollback of a TermBox
+"""
+from ._scrollback import Scrollback
+from itertools import islice
+from bisect import bisect_left
+import typing as tp
+import re
+
+
+class Match(tp.NamedTuple):
+    line: int   # absolute line number (see Scrollback.first_line)
+    start: int
+    end: int
+
+
+class ScrollbackSearch:
+    """
+    finds a pattern in the lines of a scrollback
+
+    The scrollback lines are the index, every line is only matched once:
+    `scan` continues where the last call stopped, so streaming output is
+    searched as it comes in, at most `batch` lines per call. Matches of
+    lines dropped from the scrollback are forgotten.
+    The unfinished last line isn't searched until it's complete.
+    """
+    scrollback: Scrollback = ...
+    pattern: tp.Union[re.Pattern, None] = None
+    matches: list[Match] = ...
+    current: int = -1
+    batch: int = ...
+
+    _scanned: int = 0  # absolute number of the next line to scan
+
+    def __init__(self, scrollback: Scrollback, batch: int = 2000) -> None:
+        """
+        :param scrollback: the lines to search
+        :param batch: max lines to scan per `scan` call
+        """
+        self.scrollback = scrollback
+        self.batch = batch
+        self.matches = []
+
+    def set_query(
+            self, query: str, regex: bool = False, ignore_case: bool = True
+    ) -> None:
+        """
+        start a new search, "" to stop searching
+
+        :raises re.error: invalid regex
+        """
+        pattern = re.compile(
+            query if regex else re.escape(query),
+            re.IGNORECASE if ignore_case else 0
+        ) if query else None
+
+        self.pattern = pattern
+        self.reset()
+
+    @property
+    def pending(self) -> bool:
+        """
+        True if there are lines left to scan
+        """
+        return self.pattern is not None and \
+            self._scanned < self.scrollback.first_line + len(self.scrollback)
+
+    def reset(self) -> None:
+        """
+        the scrollback was cleared, keep the query
+        """
+        self.matches = []
+        self.current = -1
+        self._scanned = self.scrollback.first_line
+
+    def _forget_trimmed(self) -> None:
+        first = self.scrollback.first_line
+        self._scanned = max(self._scanned, first)
+        if self.matches and self.matches[0].line < first:
+            n_drop = bisect_left(self.matches, (first,))
+            del self.matches[:n_drop]
+            # the selected match may be gone
+            self.current = self.current - n_drop if self.current >= n_drop else -1
+
+    def scan(self) -> list[Match]:
+        """
+        search lines added since the last call
+
+        :return: new matches
+        """
+        self._forget_trimmed()
+        if not self.pending:
+            return []
+
+        first = self.scrollback.first_line
+        start = self._scanned - first
+        stop = min(start + self.batch, len(self.scrollback))
+
+        found: list[Match] = []
+        finditer = self.pattern.finditer
+        line = self._scanned
+        for text, _ in islice(self.scrollback.lines, start, stop):
+            for m in finditer(text):
+                if m.end() > m.start():
+                    found.append(Match(line, m.start(), m.end()))
+
+            line += 1
+
+        self._scanned = line
+        self.matches.extend(found)
+        return found
+
+    def step(self, direction: int, from_line: int = 0) -> tp.Union[Match, None]:
+        """
+        go to the next / previous match
+
+        :param direction: 1 for next, -1 for previous
+        :param from_line: start here if nothing is selected yet
+        :return: the selected match
+        """
+        self._forget_trimmed()
+        if not self.matches:
+            self.current = -1
+            return None
+
+        if self.current == -1:
+            self.current = bisect_left(self.matches, (from_line,))
+            if direction < 0:
+                self.current -= 1
+
+        else:
+            self.current += direction
+
+        self.current %= len(self.matches)
+        return self.matches[self.current]
@@ -0,0 +1,124 @@
+"""
+_series.py
+
+fixed-size buffers for sampled values and reducing them for display
+"""
+from array import array
+import typing as tp
+
+
+class Ring:
+    """
+    the last `capacity` samples (timestamp, value) of one series
+
+    Both arrays are allocated once, writing is slice assignment into them
+    (at most two per `extend`), so a steady stream of samples doesn't
+    allocate anything.
+
+    One thread may write while another reads, a reader racing a write may
+    see a few samples of the next round, good enough for display.
+    """
+    capacity: int = ...
+    timestamps: array = ...
+    values: array = ...
+    n_written: int = 0
+
+    def __init__(self, capacity: int) -> None:
+        """
+        :param capacity: max number of samples to keep
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+
+        self.capacity = capacity
+        self.timestamps = array("d", bytes(8 * capacity))
+        self.values = array("d", bytes(8 * capacity))
+
+    def __len__(self) -> int:
+        return min(self.n_written, self.capacity)
+
+    def append(self, timestamp: float, value: float) -> None:
+        pos = self.n_written % self.capacity
+        self.timestamps[pos] = timestamp
+        self.values[pos] = value
+        self.n_written += 1
+
+    def extend(self, timestamps: array, values: array) -> None:
+        """
+        add samples, oldest first
+
+        :param timestamps: array("d")
+        :param values: array("d") of the same length
+        """
+        n = len(values)
+        if n > self.capacity:
+            # only the newest fit
+            timestamps = timestamps[n - self.capacity:]
+            values = values[n - self.capacity:]
+            self.n_written += n - self.capacity
+            n = self.capacity
+
+        pos = self.n_written % self.capacity
+        first = min(n, self.capacity - pos)
+        self.timestamps[pos:pos + first] = timestamps[:first]
+        self.values[pos:pos + first] = values[:first]
+        if first < n:
+            # wrapped around
+            self.timestamps[:n - first] = timestamps[first:]
+            self.values[:n - first] = values[first:]
+
+        self.n_written += n
+
+    def latest(self, n: tp.Union[int, None] = None) -> tuple[array, array]:
+        """
+        copies of the newest `n` samples (all if None), oldest first
+
+        :return: timestamps, values
+        """
+        written = self.n_written
+        size = min(written, self.capacity)
+        n = size if n is None else min(n, size)
+        end = written % self.capacity
+        start = end - n
+        if start >= 0:
+            return self.timestamps[start:end], self.values[start:end]
+
+        return (
+            self.timestamps[start:] + self.timestamps[:end],
+            self.values[start:] + self.values[:end]
+        )
+
+    @property
+    def last(self) -> tp.Union[tuple[float, float], None]:
+        """
+        the newest sample
+        """
+        if not self.n_written:
+            return None
+
+        pos = (self.n_written - 1) % self.capacity
+        return self.timestamps[pos], self.values[pos]
+
+    def clear(self) -> None:
+        self.n_written = 0
+
+
+def min_max(values: tp.Sequence[float], buckets: int) -> list[tuple[float, float]]:
+    """
+    reduce values to (min, max) pairs, one per bucket (e.g. pixel column),
+    so peaks stay visible no matter how many samples share a bucket
+
+    Slicing an array and `min`/`max` run in C, python only loops over the
+    buckets.
+    """
+    n = len(values)
+    if n <= buckets:
+        return [(value, value) for value in values]
+
+    step = n / buckets
+    out: list[tuple[float, float]] = []
+    for i in range(buckets):
+        chunk = values[int(i * step):int((i + 1) * step)]
+        out.append((min(chunk), max(chunk)))
+
+    return out
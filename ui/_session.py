@@ -0,0 +1,399 @@
+"""
+_session.py
+
+one run of a program: the process, its capture and its output buffer
+"""
+from ._capture import Capture, CaptureSink
+from ._scrollback import Scrollback
+from ._run_log import RunLog
+from ._pty import PTY_SUPPORTED, close_fd
+from ._prewarm import Prepared
+from ._numbers import NumberParser
+from ._telemetry import Telemetry, ENV_VAR as TELEMETRY_ENV_VAR, open_channel
+from ._profiler import PROFILER
+from ._supervisor import SUPERVISOR, Supervisor, StopReport, send, alive
+from time import monotonic, perf_counter
+import typing as tp
+import subprocess
+import threading
+import os
+
+
+Command = tp.Union[
+    str, bytes, os.PathLike[str], os.PathLike[bytes], tp.Sequence[
+        tp.Union[str, bytes, os.PathLike[str], os.PathLike[bytes]]]
+]
+
+
+def command_path(command: Command) -> str:
+    """
+    the executable of a command
+    """
+    return os.fsdecode(
+        command if isinstance(command, (str, bytes, os.PathLike))
+        else command[0]
+    )
+
+
+def command_argv(command: Command) -> list[str]:
+    """
+    the program and its arguments as strings
+    """
+    if isinstance(command, (str, bytes, os.PathLike)):
+        return [os.fsdecode(command)]
+
+    return [os.fsdecode(arg) for arg in command]
+
+
+def program_name(command: Command) -> str:
+    """
+    ".../<project>/run/main" -> "<project>"
+    """
+    return os.path.basename(os.path.dirname(os.path.dirname(command_path(command))))
+
+
+class Session:
+    """
+    a running (or finished) program and everything it printed
+
+    The scrollback is the session's bounded buffer. While a TermBox shows
+    the session it fills the scrollback while inserting, otherwise `pump`
+    moves the captured output there without touching tk.
+
+    Signals go to the program's whole process group, if it has its own.
+    Sensor values the program sends over its telemetry pipe bypass all of
+    that, see `Telemetry`.
+    """
+    name: str = ...
+    proc: subprocess.Popen = ...
+    capture: Capture = ...
+    scrollback: Scrollback = ...
+    started: float = ...
+    pgid: tp.Union[int, None] = None
+    stop_report: tp.Union[StopReport, None] = None
+    ready: bool = False  # started from a prepared launch
+    press_to_exec: tp.Union[float, None] = None  # seconds
+    telemetry: tp.Union[Telemetry, None] = None
+    numbers: tp.Union[NumberParser, None] = None  # values from the output
+
+    _supervisor: Supervisor = ...
+    _on_stopped: tp.Callable[[], None] = ...
+    _stopping: bool = False
+    _cleaned_up: bool = False
+
+    def __init__(
+            self,
+            name: str,
+            proc: subprocess.Popen,
+            capture: Capture,
+            scrollback: Scrollback,
+            supervisor: Supervisor = SUPERVISOR,
+            on_stopped: tp.Union[tp.Callable[[], None], None] = None
+    ) -> None:
+        """
+        :param supervisor: stops the program
+        :param on_stopped: called from the stopping thread once a kill
+            finished, `stop_report` is set then
+        """
+        self.name = name
+        self.proc = proc
+        self.capture = capture
+        self.scrollback = scrollback
+        self.started = monotonic()
+        self._supervisor = supervisor
+        self._on_stopped = on_stopped if on_stopped is not None else lambda: None
+
+        try:
+            pgid = os.getpgid(proc.pid)
+
+        except ProcessLookupError:
+            pgid = None
+
+        # a program sharing our group can only be signalled on its own
+        if pgid != os.getpgrp():
+            self.pgid = pgid
+
+    @property
+    def running(self) -> bool:
+        return self.capture.running
+
+    @property
+    def finished(self) -> bool:
+        """
+        True once the program exited and all its output was read
+        """
+        return self.capture.finished
+
+    @property
+    def returncode(self) -> tp.Union[int, None]:
+        return self.capture.returncode
+
+    def pump(self) -> bool:
+        """
+        move captured output into the scrollback (for sessions not shown)
+
+        :return: True if there was output
+        """
+        spans = self.capture.drain()
+        if not spans:
+            return False
+
+        self.scrollback.append(spans)
+        # no texbox to remove them from
+        self.scrollback.take_trimmed()
+        self.scrollback.take_partial_trimmed()
+        return True
+
+    def write(self, data: bytes) -> None:
+        self.capture.write(data)
+
+    @property
+    def _target(self) -> tuple[int, bool]:
+        """
+        what signals go to: (process group id, True) or (pid, False)
+        """
+        if self.pgid is not None:
+            return self.pgid, True
+
+        return self.proc.pid, False
+
+    @property
+    def group_alive(self) -> bool:
+        """
+        True while the program or anything it started is running
+        """
+        if self.proc.returncode is None:
+            return True
+
+        return self.pgid is not None and alive(self.pgid)
+
+    def send_signal(self, sig: int) -> None:
+        if self.group_alive:
+            send(*self._target, sig)
+
+    def kill(self) -> tp.Union[threading.Thread, None]:
+        """
+        stop the program and everything it started, in the background,
+        escalating from SIGINT to SIGKILL
+
+        :return: the thread stopping it, None if there is nothing to stop
+        """
+        if self._stopping or not self.group_alive:
+            return None
+
+        self._stopping = True
+        return self._supervisor.stop(*self._target, on_stopped=self._stopped)
+
+    def _stopped(self, report: StopReport) -> None:
+        self.stop_report = report
+        self._stopping = False
+        print(f"{self.name}: {report}")
+        self._on_stopped()
+
+    def clean_up(self) -> None:
+        """
+        once the program exited, stop what it left behind in its group
+        (e.g. a helper still driving the motors)
+        """
+        if self._cleaned_up or self.running:
+            return
+
+        self._cleaned_up = True
+        if self.pgid is not None and alive(self.pgid):
+            print(f"{self.name}: stopping processes left behind")
+            self.kill()
+
+    def resize(self, cols: int, rows: int) -> None:
+        self.capture.resize(cols, rows)
+
+    def stop(self) -> None:
+        """
+        stop capturing (doesn't kill the program)
+        """
+        self.capture.stop()
+        if self.telemetry is not None:
+            self.telemetry.stop()
+
+
+class Launcher:
+    """
+    starts programs the way the config says
+    """
+    run_mode: tp.Literal["pty", "pipe"] = "pty"
+    log_directory: str = ""
+    log_max_bytes: int = ...
+    log_max_files: int = ...
+    scrollback_lines: int = ...
+    scrollback_bytes: int = ...
+    telemetry_samples: int = ...
+    plot_samples: int = ...
+
+    def __init__(
+            self,
+            run_mode: tp.Literal["pty", "pipe"] = "pty",
+            log_directory: str = "",
+            log_max_bytes: int = 64 * 1024 * 1024,
+            log_max_files: int = 20,
+            scrollback_lines: int = 10_000,
+            scrollback_bytes: int = 0,
+            telemetry_samples: int = 100_000,
+            plot_samples: int = 20_000
+    ) -> None:
+        """
+        :param run_mode: "pty" to run programs attached to a pseudo terminal
+            (line buffered output), "pipe" for plain pipes
+        :param log_directory: save the output of every run there,
+            "" to disable
+        :param log_max_bytes: max size of one log file
+        :param log_max_files: max number of log files to keep
+        :param scrollback_lines: max lines to keep per run, 0 for unlimited
+        :param scrollback_bytes: max characters to keep per run,
+            0 for unlimited
+        :param telemetry_samples: samples to keep per telemetry channel,
+            0 to not open a telemetry pipe
+        :param plot_samples: samples to keep per series of numbers found in
+            the output, 0 to not look for them
+        """
+        self.run_mode = run_mode
+        self.log_directory = log_directory
+        self.log_max_bytes = log_max_bytes
+        self.log_max_files = log_max_files
+        self.scrollback_lines = scrollback_lines
+        self.scrollback_bytes = scrollback_bytes
+        self.telemetry_samples = telemetry_samples
+        self.plot_samples = plot_samples
+
+    @property
+    def _use_pty(self) -> bool:
+        return self.run_mode == "pty" and PTY_SUPPORTED
+
+    def prepare(
+            self,
+            command: Command,
+            term_size: tuple[int, int] = (80, 24)
+    ) -> Prepared:
+        """
+        resolve a program, start reading it from disk and open its pipes
+        ahead of time, pass the result to `launch`
+
+        :raises OSError: the program doesn't exist or isn't executable
+        """
+        prepared = Prepared(command_argv(command), self._use_pty, term_size)
+        prepared.warm()
+        return prepared
+
+    def launch(
+            self,
+            command: Command,
+            on_output: tp.Union[tp.Callable[[], None], None] = None,
+            term_size: tuple[int, int] = (80, 24),
+            name: tp.Union[str, None] = None,
+            prepared: tp.Union[Prepared, None] = None,
+            pressed: tp.Union[float, None] = None
+    ) -> Session:
+        """
+        run a program
+
+        :param on_output: called from the capture threads on new output
+            and when the program exits
+        :param term_size: (columns, rows) of the pseudo terminal
+        :param name: shown name, defaults to the project name
+        :param prepared: from `prepare`, used if it is for this command
+        :param pressed: perf_counter time Start was pressed at, to measure
+            the time until the program runs
+        """
+        argv = command_argv(command)
+        ready = prepared is not None and prepared.matches(argv, self._use_pty)
+        if not ready:
+            prepared = Prepared(argv, self._use_pty, term_size)
+
+        child_fds, parent_fds = prepared.take()
+        telemetry_fd, env, pass_fds = None, None, ()
+        if self.telemetry_samples:
+            telemetry_fd, write_fd = open_channel()
+            env = {**os.environ, TELEMETRY_ENV_VAR: str(write_fd)}
+            pass_fds = (write_fd,)
+
+        try:
+            # returns once the program was executed
+            proc = subprocess.Popen(
+                argv, executable=prepared.argv[0], stdin=child_fds[0],
+                stdout=child_fds[1], stderr=child_fds[2],
+                start_new_session=True, env=env, pass_fds=pass_fds)
+
+        except OSError:
+            for fd in (*parent_fds.values(), telemetry_fd):
+                close_fd(fd)
+
+            raise
+
+        finally:
+            # only the child keeps its ends open
+            for fd in {*child_fds, *pass_fds}:
+                close_fd(fd)
+
+        executed = perf_counter()
+        name = program_name(command) if name is None else name
+        sinks = self._sinks(command, name)
+        numbers = NumberParser(self.plot_samples) if self.plot_samples else None
+        if numbers is not None:
+            sinks.append(numbers)
+
+        session = self.attach(proc, on_output, name=name, sinks=sinks, **parent_fds)
+        session.ready = ready
+        session.numbers = numbers
+        if telemetry_fd is not None:
+            session.telemetry = Telemetry(telemetry_fd, self.telemetry_samples)
+
+        if pressed is not None:
+            session.press_to_exec = executed - pressed
+            PROFILER.gauge("run.press_to_exec", session.press_to_exec)
+
+        return session
+
+    def attach(
+            self,
+            proc: subprocess.Popen,
+            on_output: tp.Union[tp.Callable[[], None], None] = None,
+            pty_fd: tp.Union[int, None] = None,
+            name: str = "",
+            sinks: tp.Sequence[CaptureSink] = (),
+            stdout_fd: tp.Union[int, None] = None,
+            stderr_fd: tp.Union[int, None] = None,
+            stdin_fd: tp.Union[int, None] = None
+    ) -> Session:
+        """
+        capture a program that is already running
+
+        :param pty_fd: pseudo terminal master if the program runs in one
+        :param sinks: receive the raw output (e.g. a RunLog)
+        :param stdout_fd: see `Capture`
+        :param stderr_fd: see `Capture`
+        :param stdin_fd: see `Capture`
+        """
+        return Session(
+            name,
+            proc,
+            Capture(proc, on_output, pty_fd=pty_fd, sinks=sinks,
+                    stdout_fd=stdout_fd, stderr_fd=stderr_fd, stdin_fd=stdin_fd),
+            Scrollback(self.scrollback_lines, self.scrollback_bytes),
+            on_stopped=on_output
+        )
+
+    def _sinks(self, command: Command, name: str) -> list[CaptureSink]:
+        if not self.log_directory:
+            return []
+
+        try:
+            return [RunLog(
+                self.log_directory,
+                command_path(command),
+                name=name,
+                max_bytes=self.log_max_bytes,
+                max_files=self.log_max_files
+            )]
+
+        except OSError as e:
+            # a missing log mustn't keep the program from running
+            print(f"can't create run log: {e}")
+            return []
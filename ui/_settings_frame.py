@@ -7,33 +7,23 @@ window settings
 Author:
 Nilusink
 """
+from ._config import ConfigStore, WindowConfig
 import customtkinter as ctk
 import typing as tp
-import json
-
-
-class WindowConfig(tp.TypedDict):
-    appearance_mode: tp.Literal["dark", "light"]
-    program_directories: list[str]
-    program_ignores: list[str]
-    keyboard: list[tuple[str, str]]
-    fullscreen: bool
-    theme: str
 
 
 class SettingsFrame(ctk.CTkFrame):
     window_config: WindowConfig = ...
-    config_path: str = ...
+    config_store: ConfigStore = ...
 
     def __init__(
             self,
-            window_config: WindowConfig,
-            config_path: str,
+            config_store: ConfigStore,
             *args,
             **kwargs
     ) -> None:
-        self.window_config = window_config
-        self.config_path = config_path
+        self.config_store = config_store
+        self.window_config = config_store.config
 
         super().__init__(*args, **kwargs)
 
@@ -79,7 +69,7 @@ class SettingsFrame(ctk.CTkFrame):
             text="Fullscreen",
             font=("Sans-Serif", 30)
         ).grid(row=2, column=0, sticky="nsew", padx=10, pady=10)
-        self.fullscreen_var = ctk.BooleanVar(value=window_config["fullscreen"])
+        self.fullscreen_var = ctk.BooleanVar(value=self.window_config["fullscreen"])
         ctk.CTkSwitch(
             self,
             text="",
@@ -118,9 +108,8 @@ class SettingsFrame(ctk.CTkFrame):
         update the appearance variable
         :param value: new appearance
         """
-        self.window_config["appearance_mode"] = value
+        self.config_store.set("appearance_mode", value)
         ctk.set_appearance_mode(value)
-        self.update_config()
 
     def update_theme(
             self,
@@ -130,21 +119,12 @@ class SettingsFrame(ctk.CTkFrame):
         update the appearance variable
         :param value: new appearance
         """
-        self.window_config["theme"] = value
+        self.config_store.set("theme", value)
         ctk.set_default_color_theme(value)
-        self.update_config()
 
     def update_fullscreen(self) -> None:
         """
         update the fullscreen variable
         """
-        self.window_config["fullscreen"] = self.fullscreen_var.get()
-        self.master.attributes("-fullscreen", self.window_config["fullscreen"])
-        self.update_config()
-
-    def update_config(self) -> None:
-        """
-        update the config file
-        """
-        with open(self.config_path, "w") as out:
-            json.dump(self.window_config, out, indent=4)
+        # the window applies it (config subscription)
+        self.config_store.set("fullscreen", self.fullscreen_var.get())
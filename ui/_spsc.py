@@ -0,0 +1,84 @@
+"""
+_spsc.py
+
+hands items from one thread to another without locks
+"""
+from collections import deque
+import typing as tp
+
+
+T = tp.TypeVar("T")
+
+
+class SpscQueue(tp.Generic[T]):
+    """
+    single producer, single consumer queue
+
+    `deque.append` and `deque.popleft` are atomic, and every counter has
+    exactly one writer (the producer counts what it put, the consumer what
+    it took), so no lock is needed. `drain` takes exactly the items that
+    were there when it was called, anything put meanwhile stays for the
+    next call, nothing is lost.
+
+    Besides the number of items the queue tracks a size per item (e.g.
+    characters) and the high-water marks of both.
+    """
+    high_water: int = 0
+    high_water_size: int = 0
+
+    _items: tp.Deque[tuple[T, int]] = ...
+    _n_put: int = 0
+    _n_taken: int = 0
+    _size_put: int = 0
+    _size_taken: int = 0
+
+    def __init__(self) -> None:
+        self._items = deque()
+
+    def __len__(self) -> int:
+        return self._n_put - self._n_taken
+
+    @property
+    def size(self) -> int:
+        """
+        sum of the sizes of all queued items
+        """
+        return self._size_put - self._size_taken
+
+    @property
+    def n_put(self) -> int:
+        """
+        total number of items ever put
+        """
+        return self._n_put
+
+    def put(self, item: T, size: int = 1) -> None:
+        """
+        add an item (producer only)
+        """
+        # count first, so the consumer never sees more items than counted
+        self._n_put += 1
+        self._size_put += size
+        self._items.append((item, size))
+
+        depth = self._n_put - self._n_taken
+        if depth > self.high_water:
+            self.high_water = depth
+
+        queued = self._size_put - self._size_taken
+        if queued > self.high_water_size:
+            self.high_water_size = queued
+
+    def drain(self) -> list[T]:
+        """
+        take all queued items (consumer only)
+        """
+        popleft = self._items.popleft
+        taken = [popleft() for _ in range(len(self._items))]
+        self._n_taken += len(taken)
+        self._size_taken += sum([size for _, size in taken])
+        return [item for item, _ in taken]
+
+    def reset_high_water(self) -> None:
+        self.high_water = len(self)
+        self.high_water_size = self.size
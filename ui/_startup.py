@@ -0,0 +1,88 @@
+"""
+_startup.py
+
+measures how long the ui takes to become usable
+"""
+from time import perf_counter
+import typing as tp
+import os
+
+
+def _since_process_start() -> tp.Union[float, None]:
+    """
+    seconds since this process was started (linux only), includes the
+    interpreter's own startup
+    """
+    try:
+        with open("/proc/self/stat") as inp:
+            # the command name may contain spaces, the fields after it don't
+            fields = inp.read().rsplit(")", 1)[1].split()
+
+        with open("/proc/uptime") as inp:
+            uptime = float(inp.read().split()[0])
+
+        return uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupTimer:
+    """
+    collects named points in time during startup
+    """
+    start: float = ...
+    marks: list[tuple[str, float]] = ...
+    before_start: tp.Union[float, None] = None
+
+    def __init__(self, start: tp.Union[float, None] = None) -> None:
+        """
+        :param start: perf_counter value the measurement starts at
+        """
+        self.start = perf_counter() if start is None else start
+        self.marks = []
+        process_age = _since_process_start()
+        if process_age is not None:
+            # interpreter startup, before `start` was taken
+            self.before_start = max(process_age - (perf_counter() - self.start), 0)
+
+    def mark(self, name: str) -> None:
+        self.marks.append((name, perf_counter() - self.start))
+
+    @property
+    def total(self) -> float:
+        """
+        seconds from the process start (if known) to the last mark
+        """
+        last = self.marks[-1][1] if self.marks else 0
+        return last + (self.before_start or 0)
+
+    def as_dict(self) -> dict[str, float]:
+        times = {name: took for name, took in self.marks}
+        if self.before_start is not None:
+            times["interpreter"] = self.before_start
+
+        times["total"] = self.total
+        return times
+
+    def report(self, target: float = 0) -> str:
+        """
+        :param target: max seconds until interactive, 0 to not check
+        """
+        lines = ["startup:"]
+        if self.before_start is not None:
+            lines.append(f"  {'interpreter':<16}{self.before_start * 1000:8.0f} ms")
+
+        last = 0.
+        for name, took in self.marks:
+            lines.append(
+                f"  {name:<16}{took * 1000:8.0f} ms  (+{(took - last) * 1000:.0f})"
+            )
+            last = took
+
+        lines.append(f"  {'total':<16}{self.total * 1000:8.0f} ms")
+        if target:
+            verdict = "ok" if self.total <= target else "TOO SLOW"
+            lines.append(f"  target {target * 1000:.0f} ms: {verdict}")
+
+        return "\n".join(lines)
@@ -0,0 +1,252 @@
+"""
+_supervisor.py
+
+stops programs together with everything they started
+"""
+from ._profiler import PROFILER
+from time import monotonic, sleep
+import typing as tp
+import threading
+import select
+import signal
+import os
+
+
+PROC_ROOT: str = "/proc"
+
+
+class StopReport(tp.NamedTuple):
+    target: int      # process group id (or pid, see `group`)
+    group: bool
+    signal: str      # the signal that finally stopped it, "" if already gone
+    latency: float   # seconds from the first signal until all were gone
+    stopped: bool    # False if something survived even SIGKILL
+
+    def __str__(self) -> str:
+        if not self.signal:
+            return "already stopped"
+
+        if not self.stopped:
+            return f"still running after {self.signal}"
+
+        return f"stopped in {self.latency * 1000:.0f} ms ({self.signal})"
+
+
+def send(target: int, sig: int, group: bool = True) -> bool:
+    """
+    signal a process group (or a single process)
+
+    :return: False if there is no such group (process) anymore
+    """
+    try:
+        if group:
+            os.killpg(target, sig)
+
+        else:
+            os.kill(target, sig)
+
+        return True
+
+    except ProcessLookupError:
+        return False
+
+    except PermissionError:
+        # e.g. a pid reused by another user's process, not ours to stop
+        return False
+
+
+def _state(pid: str) -> tuple[str, int]:
+    """
+    (state, process group id) from /proc/<pid>/stat
+    """
+    with open(f"{PROC_ROOT}/{pid}/stat", "rb") as inp:
+        stat = inp.read()
+
+    # the fields after the command name's last ")" are well-defined
+    fields = stat[stat.rindex(b")") + 2:].split(b" ", 3)
+    return fields[0].decode(), int(fields[2])
+
+
+def _living(target: int, group: bool) -> bool:
+    """
+    True if the group (process) has a member that isn't a zombie
+    """
+    if not group:
+        try:
+            return _state(str(target))[0] != "Z"
+
+        except (OSError, ValueError):
+            return False
+
+    for entry in os.listdir(PROC_ROOT):
+        if not entry.isdigit():
+            continue
+
+        try:
+            state, pgid = _state(entry)
+
+        except (OSError, ValueError):
+            # exited while scanning
+            continue
+
+        if pgid == target and state != "Z":
+            return True
+
+    return False
+
+
+def alive(target: int, group: bool = True) -> bool:
+    """
+    True while any process of the group (or the process) runs
+    """
+    if not send(target, 0, group):
+        return False
+
+    # zombies are still members, but they are dead already (and stay if
+    # nothing reaps orphans, e.g. in some containers)
+    if os.path.isdir(PROC_ROOT):
+        return _living(target, group)
+
+    return True
+
+
+def wait_pid(pid: int, timeout: float) -> None:
+    """
+    wait for a process to exit (it isn't reaped), without polling if the
+    system has pidfds
+    """
+    if not hasattr(os, "pidfd_open") or timeout <= 0:
+        return
+
+    try:
+        fd = os.pidfd_open(pid)
+
+    except OSError:
+        # already gone, or no pidfd support
+        return
+
+    try:
+        poller = select.poll()
+        poller.register(fd, select.POLLIN)
+        poller.poll(timeout * 1000)
+
+    finally:
+        os.close(fd)
+
+
+class Supervisor:
+    """
+    stops process groups: SIGINT, then SIGTERM, then SIGKILL, each after
+    the previous one's deadline passed
+
+    Programs are started in their own session (and with that their own
+    process group), so helpers they spawn (shell scripts, motor threads in
+    a subprocess, ...) are stopped with them.
+    """
+    int_timeout: float = ...
+    term_timeout: float = ...
+    kill_timeout: float = ...
+
+    def __init__(
+            self,
+            int_timeout: float = 1.,
+            term_timeout: float = 2.,
+            kill_timeout: float = 1.
+    ) -> None:
+        """
+        :param int_timeout: seconds to wait after SIGINT before SIGTERM
+        :param term_timeout: seconds to wait after SIGTERM before SIGKILL
+        :param kill_timeout: seconds to wait after SIGKILL before giving up
+        """
+        self.configure(int_timeout, term_timeout, kill_timeout)
+
+    def configure(
+            self,
+            int_timeout: tp.Union[float, None] = None,
+            term_timeout: tp.Union[float, None] = None,
+            kill_timeout: tp.Union[float, None] = None
+    ) -> None:
+        """
+        change the deadlines, None keeps one
+        """
+        if int_timeout is not None:
+            self.int_timeout = int_timeout
+
+        if term_timeout is not None:
+            self.term_timeout = term_timeout
+
+        if kill_timeout is not None:
+            self.kill_timeout = kill_timeout
+
+    def _wait(self, target: int, group: bool, timeout: float) -> bool:
+        """
+        wait until the group (process) is gone
+
+        :return: False if it is still there after `timeout` seconds
+        """
+        deadline = monotonic() + timeout
+
+        # the group leader exiting wakes us up at once, the rest of the
+        # group usually follows within milliseconds
+        wait_pid(target, timeout)
+
+        delay = .001
+        while alive(target, group):
+            left = deadline - monotonic()
+            if left <= 0:
+                return False
+
+            sleep(min(delay, left))
+            delay = min(delay * 2, .02)
+
+        return True
+
+    def stop_group(self, target: int, group: bool = True) -> StopReport:
+        """
+        stop a process group (or a single process), blocks until it is gone
+        or the last deadline passed
+
+        :param target: process group id (the pid of the process started
+            with `start_new_session`), or a pid if `group` is False
+        """
+        start = monotonic()
+        last = ""
+        for sig, timeout in (
+                (signal.SIGINT, self.int_timeout),
+                (signal.SIGTERM, self.term_timeout),
+                (signal.SIGKILL, self.kill_timeout),
+        ):
+            if not alive(target, group) or not send(target, sig, group):
+                # gone before (or while) escalating
+                return StopReport(target, group, last, monotonic() - start, True)
+
+            last = sig.name
+            if self._wait(target, group, timeout):
+                report = StopReport(target, group, last, monotonic() - start, True)
+                PROFILER.gauge("stop.latency", report.latency)
+                return report
+
+        return StopReport(target, group, last, monotonic() - start, False)
+
+    def stop(
+            self,
+            target: int,
+            group: bool = True,
+            on_stopped: tp.Union[tp.Callable[[StopReport], None], None] = None
+    ) -> threading.Thread:
+        """
+        `stop_group` in the background
+
+        :param on_stopped: called from the stopping thread with the report
+        """
+        def run() -> None:
+            report = self.stop_group(target, group)
+            if on_stopped is not None:
+                on_stopped(report)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+
+SUPERVISOR = Supervisor()
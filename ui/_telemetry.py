@@ -0,0 +1,256 @@
+"""
+_telemetry.py
+
+binary side channel for high-rate sensor values, next to stdout
+
+A program started from the ui finds the write end of a pipe in the file
+descriptor named by the BOTBALL_TELEMETRY_FD environment variable and
+writes fixed-size records to it, native byte order:
+
+    struct record {
+        uint32_t channel;    // 0 .. MAX_CHANNELS - 1
+        uint32_t reserved;   // 0
+        double timestamp;    // seconds, any clock
+        double value;
+    };
+
+The pipe is non-blocking, when the ui falls behind writes fail with EAGAIN
+and the program should drop the samples rather than wait. Writes of up to
+PIPE_BUF bytes (170 records) never interleave with other writers.
+"""
+from ._series import Ring
+from ._pty import close_fd
+from time import monotonic
+from array import array
+import typing as tp
+import threading
+import select
+import struct
+import os
+
+try:
+    import fcntl
+
+except ImportError:
+    fcntl = None
+
+
+ENV_VAR: str = "BOTBALL_TELEMETRY_FD"
+RECORD: struct.Struct = struct.Struct("=I4xdd")
+MAX_CHANNELS: int = 32
+PIPE_SIZE: int = 1024 * 1024
+
+
+def open_channel() -> tuple[int, int]:
+    """
+    a pipe for telemetry, as large as the system allows
+
+    :return: (read end, write end), the write end is non-blocking
+    """
+    read, write = os.pipe()
+    os.set_blocking(write, False)
+    if fcntl is not None and hasattr(fcntl, "F_SETPIPE_SZ"):
+        try:
+            fcntl.fcntl(write, fcntl.F_SETPIPE_SZ, PIPE_SIZE)
+
+        except OSError:
+            # above /proc/sys/fs/pipe-max-size, keep the default 64 KB
+            pass
+
+    return read, write
+
+
+class Telemetry:
+    """
+    receives the records of one program on its own thread, straight into
+    one ring buffer per channel
+
+    Reads go into a preallocated buffer and are split into channels,
+    timestamps and values by casting it, no text is decoded and nothing
+    goes through the TermBox.
+    """
+    capacity: int = ...
+    channels: dict[int, Ring] = ...
+    n_received: int = 0
+    n_dropped: int = 0  # records of invalid channels
+    finished: bool = False
+
+    _fd: int = ...
+    _buffer: bytearray = ...
+    _active: bool = True
+    _thread: threading.Thread = ...
+    _rate_mark: tuple[float, int] = (0., 0)
+    _rate: float = 0.
+
+    def __init__(self, fd: int, capacity: int = 100_000, batch: int = 4096) -> None:
+        """
+        :param fd: read end of the program's telemetry pipe, closed at EOF
+        :param capacity: samples to keep per channel
+        :param batch: max records per read
+        """
+        self.capacity = capacity
+        self.channels = {}
+        self._fd = fd
+        self._buffer = bytearray(RECORD.size * batch)
+        self._rate_mark = (monotonic(), 0)
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    def _read(self) -> None:
+        """
+        thread. reads the pipe until EOF (the program and everything it
+        started closed it)
+        """
+        view = memoryview(self._buffer)
+        poller = select.poll()
+        poller.register(self._fd, select.POLLIN)
+        pending = 0
+        try:
+            while self._active:
+                if not poller.poll(100):
+                    continue
+
+                try:
+                    n = os.readv(self._fd, [view[pending:]])
+
+                except BlockingIOError:
+                    continue
+
+                except OSError:
+                    n = 0
+
+                if not n:
+                    break
+
+                pending += n
+                complete = pending - pending % RECORD.size
+                if complete:
+                    self._store(view[:complete])
+                    # an incomplete record waits for the rest
+                    view[:pending - complete] = view[complete:pending]
+                    pending -= complete
+
+        finally:
+            view.release()
+            close_fd(self._fd)
+            self.finished = True
+
+    def _store(self, records: memoryview) -> None:
+        """
+        demultiplex complete records into the channels' rings
+        """
+        doubles = records.cast("d")
+        timestamps = array("d", doubles[1::3])
+        values = array("d", doubles[2::3])
+        channels = records.cast("I")[::6].tolist()
+        self.n_received += len(channels)
+
+        first = channels[0]
+        if channels.count(first) == len(channels):
+            # the usual case, one sensor per write
+            self._extend(first, timestamps, values)
+            return
+
+        split: dict[int, list[int]] = {}
+        for i, channel in enumerate(channels):
+            split.setdefault(channel, []).append(i)
+
+        for channel, indices in split.items():
+            self._extend(
+                channel,
+                array("d", [timestamps[i] for i in indices]),
+                array("d", [values[i] for i in indices])
+            )
+
+    def _extend(self, channel: int, timestamps: array, values: array) -> None:
+        ring = self.channels.get(channel)
+        if ring is None:
+            if not 0 <= channel < MAX_CHANNELS:
+                self.n_dropped += len(values)
+                return
+
+            ring = self.channels[channel] = Ring(self.capacity)
+
+        ring.extend(timestamps, values)
+
+    @property
+    def rate(self) -> float:
+        """
+        records per second since the last call (at most once a second)
+        """
+        now = monotonic()
+        since, received = self._rate_mark
+        if now - since >= 1:
+            self._rate = (self.n_received - received) / (now - since)
+            self._rate_mark = (now, self.n_received)
+
+        return self._rate
+
+    def stop(self) -> None:
+        """
+        stop receiving, the pipe is closed by the thread
+        """
+        self._active = False
+
+
+class TelemetryWriter:
+    """
+    the program's side, for python programs (and benchmarks)
+
+    Records are collected and written PIPE_BUF bytes at a time, samples
+    the ui can't take right now are dropped.
+    """
+    n_dropped: int = 0
+
+    _fd: tp.Union[int, None] = None
+    _pending: bytearray = ...
+    _limit: int = ...
+
+    def __init__(self, fd: tp.Union[int, None] = None) -> None:
+        """
+        :param fd: write end of the pipe, defaults to $BOTBALL_TELEMETRY_FD,
+            without either every sample is dropped
+        """
+        if fd is None and os.environ.get(ENV_VAR, "").isdigit():
+            fd = int(os.environ[ENV_VAR])
+
+        self._fd = fd
+        self._pending = bytearray()
+        self._limit = select.PIPE_BUF - select.PIPE_BUF % RECORD.size
+
+    def send(self, channel: int, value: float, timestamp: tp.Union[float, None] = None) -> None:
+        """
+        :param timestamp: defaults to `time.monotonic()`
+        """
+        self._pending += RECORD.pack(
+            channel, monotonic() if timestamp is None else timestamp, value
+        )
+        if len(self._pending) >= self._limit:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._fd is None:
+            self.n_dropped += len(self._pending) // RECORD.size
+            self._pending.clear()
+            return
+
+        pending = bytes(self._pending)
+        self._pending.clear()
+        for start in range(0, len(pending), self._limit):
+            part = pending[start:start + self._limit]
+            try:
+                os.write(self._fd, part)
+
+            except BlockingIOError:
+                self.n_dropped += len(part) // RECORD.size
+
+            except BrokenPipeError:
+                # the ui is gone
+                self._fd = None
+                self.n_dropped += (len(pending) - start) // RECORD.size
+                return
+
+    def close(self) -> None:
+        self.flush()
+        close_fd(self._fd)
+        self._fd = None
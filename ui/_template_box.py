@@ -13,7 +13,6 @@ Author: Lukas Krahbichler
 from customtkinter import CTkFrame, CTkButton, CTkFont, Variable
 from typing import Any, Optional, Union, Callable
 from tkinter import Event, Misc
-from json import loads
 
 
 ##################################################
@@ -26,6 +25,7 @@ class TemplateBox(CTkFrame):
     """
     __button_var: Variable
     __buttons: list[CTkButton]
+    __entries: list[tuple[str, str]]
     __callback: Callable[[str, Event], any]
     __font = Optional[Union[tuple, CTkFont]]
     KEYSYM: dict[str, str] = {
@@ -48,6 +48,7 @@ class TemplateBox(CTkFrame):
         self.configure(width=0, height=0)
 
         self.__buttons = []
+        self.__entries = []
         self.__button_var = button_var
         self.__callback = callback
         self.__font = font
@@ -56,27 +57,53 @@ class TemplateBox(CTkFrame):
         self.grid_columnconfigure(1, weight=1)
 
         self.__button_var.trace_add("write", self._update_buttons)
+        # the keyboard frame (whose changes write the variable) is built
+        # lazily, show the stored buttons right away
+        self._update_buttons()
 
     def _update_buttons(self, *_args) -> None:
-        buttons: list[tuple[str, str]] = self.__button_var.get()
-        print("NEW BUTS", buttons)
-
-        self.grid_rowconfigure("all", weight=0)
-
-        for but in self.__buttons:
-            but.grid_forget()
-            but.destroy()
-            del but
-
-        self.__buttons = []
-
-        for but in buttons:
-            self.__buttons.append(
-                CTkButton(self, text=but[0], font=self.__font, corner_radius=15,
-                          command=lambda k=but[1]: self.press(k), fg_color="#3a7ebf")
-            )
-
-        self.__grid_widgets()
+        """
+        reconcile the buttons with the new (label, key) list: buttons that
+        didn't change are kept, changed ones are reconfigured, only missing
+        ones are created and surplus ones destroyed
+        """
+        buttons = [(str(label), str(key)) for label, key in self.__button_var.get()]
+
+        # keep the buttons that are still wanted (in their new position)
+        unused: dict[tuple[str, str], list[CTkButton]] = {}
+        for button, entry in zip(self.__buttons, self.__entries):
+            unused.setdefault(entry, []).append(button)
+
+        new_buttons: list[Optional[CTkButton]] = []
+        for entry in buttons:
+            same = unused.get(entry)
+            new_buttons.append(same.pop(0) if same else None)
+
+        # reuse the rest for the entries that changed, create what's missing
+        leftover = [button for same in unused.values() for button in same]
+        for i, entry in enumerate(buttons):
+            if new_buttons[i] is not None:
+                continue
+
+            if leftover:
+                button = leftover.pop(0)
+                button.configure(text=entry[0], command=lambda k=entry[1]: self.press(k))
+
+            else:
+                button = CTkButton(self, text=entry[0], font=self.__font, corner_radius=15,
+                                   command=lambda k=entry[1]: self.press(k), fg_color="#3a7ebf")
+
+            new_buttons[i] = button
+
+        for button in leftover:
+            button.grid_forget()
+            button.destroy()
+
+        old_rows = {button: i for i, button in enumerate(self.__buttons)}
+        n_old = len(self.__buttons)
+        self.__buttons = new_buttons
+        self.__entries = buttons
+        self.__grid_widgets(old_rows, n_old)
 
     def press(self, but: str) -> None:
         ev = Event()
@@ -91,7 +118,16 @@ class TemplateBox(CTkFrame):
 
         self.__callback(but, ev)
 
-    def __grid_widgets(self) -> None:
+    def __grid_widgets(self, old_rows: dict[CTkButton, int], n_old: int) -> None:
+        """
+        only (re)grid buttons whose row changed
+        """
         for i, button in enumerate(self.__buttons):
-            button.grid(row=i, column=0, sticky="NSEW", pady=5, columnspan=2)
-            self.grid_rowconfigure(i, weight=1)
+            if old_rows.get(button) != i:
+                button.grid(row=i, column=0, sticky="NSEW", pady=5, columnspan=2)
+
+            if i >= n_old:
+                self.grid_rowconfigure(i, weight=1)
+
+        for i in range(len(self.__buttons), n_old):
+            self.grid_rowconfigure(i, weight=0)
@@ -7,17 +7,26 @@ A tkinter texbox, but also a terminal
 Author:
 Nilusink
 """
-from ._tk_term_colors import SIMPLE_COLORS, read_color_code
-from concurrent.futures import ThreadPoolExecutor
-from traceback import format_exc
+from ._tk_term_colors import Style, tag_options
+from ._scrollback import Scrollback
+from ._render import FrameRenderer, coalesce
+from ._throttle import OutputThrottle
+from ._profiler import PROFILER
+from ._capture import CaptureSink
+from ._session import Session, Launcher, Command
+from ._search import ScrollbackSearch, Match
+from tkinter.font import Font
 import customtkinter as ctk
 from tkinter import Event
-from time import sleep
+from time import perf_counter
 import typing as tp
 import subprocess
 import signal
 import string
-import os
+
+
+SEARCH_TAG: str = "search"
+SEARCH_CURRENT_TAG: str = "search_current"
 
 
 class ControlKeys(tp.TypedDict):
@@ -28,78 +37,139 @@ class ControlKeys(tp.TypedDict):
 class TermBox(ctk.CTkTextbox):
     """
     Just like a tkinter texbox, but wired to a running program
+
+    The program's output lives in a `Session`, the box shows one session at
+    a time (see `attach`).
     """
-    _running_program: tp.Union[subprocess.Popen, None] = None
-    _program_running: bool = False
-    _to_insert: list[tuple[str, str]] = ...
-    _err_to_insert: list[tuple[str, str]] = ...
+    session: tp.Union[Session, None] = None
+    launcher: Launcher = ...
+    _configured_tags: set[str] = ...
     _control_keys: ControlKeys = ...
+    _on_output: tp.Callable[[], None] = ...
+    scrollback: Scrollback = ...
+    _search: ScrollbackSearch = ...
+    _renderer: FrameRenderer = ...
+    _throttle: OutputThrottle = ...
+    _term_size: tuple[int, int] = (80, 24)
     running = True
 
     def __init__(
             self, *args, proc: tp.Union[subprocess.Popen, None] = None,
+            on_output: tp.Union[tp.Callable[[], None], None] = None,
+            scrollback_lines: int = 10_000,
+            scrollback_bytes: int = 0,
+            run_mode: tp.Literal["pty", "pipe"] = "pty",
+            log_directory: str = "",
+            log_max_bytes: int = 64 * 1024 * 1024,
+            log_max_files: int = 20,
+            max_display_rate: float = 2000,
+            throttle_lines: int = 1000,
+            telemetry_samples: int = 100_000,
+            plot_samples: int = 20_000,
             **kwargs
     ):
-        self._running_program = proc
-        self._to_insert: list[tuple[str, str]] = []
-        self._err_to_insert: list[tuple[str, str]] = []
+        """
+        :param on_output: called from the capture threads when there is
+            new output or the program stopped
+        :param scrollback_lines: max lines to keep, 0 for unlimited
+        :param scrollback_bytes: max characters to keep, 0 for unlimited
+        :param run_mode: "pty" to run programs attached to a pseudo terminal
+            (line buffered output), "pipe" for plain pipes
+        :param log_directory: save the output of every run there,
+            "" to disable
+        :param log_max_bytes: max size of one log file
+        :param log_max_files: max number of log files to keep
+        :param max_display_rate: max lines per second to show, 0 for unlimited
+        :param throttle_lines: max lines waiting to be shown, older ones are
+            skipped, 0 for unlimited
+        :param telemetry_samples: samples to keep per telemetry channel,
+            0 to disable telemetry
+        :param plot_samples: samples to keep per series of numbers found
+            in the output, 0 to not look for them
+        """
+        self.launcher = Launcher(
+            run_mode=run_mode,
+            log_directory=log_directory,
+            log_max_bytes=log_max_bytes,
+            log_max_files=log_max_files,
+            scrollback_lines=scrollback_lines,
+            scrollback_bytes=scrollback_bytes,
+            telemetry_samples=telemetry_samples,
+            plot_samples=plot_samples
+        )
+        self._on_output = on_output if on_output is not None else lambda: None
+        self._configured_tags = set()
+        self.scrollback = Scrollback(scrollback_lines, scrollback_bytes)
+        self._search = ScrollbackSearch(self.scrollback)
+        self._renderer = FrameRenderer()
+        self._throttle = OutputThrottle(max_display_rate, throttle_lines)
         self._control_keys = {
             "ctrl": False, "shift": False
         }
 
         super().__init__(*args, **kwargs)
 
-        for color in SIMPLE_COLORS.values():
-            if color[0] == "Reset":
-                continue
-
-            self._textbox.tag_configure(color[0], foreground=color[0])
+        self._textbox.tag_configure(
+            SEARCH_TAG, background="#8a6d00", foreground="#ffffff"
+        )
+        self._textbox.tag_configure(
+            SEARCH_CURRENT_TAG, background="#ff9900", foreground="#000000"
+        )
 
-        # threads
-        self._pool = ThreadPoolExecutor(max_workers=1)
-        self._pool.submit(self._update_proc)
+        if proc is not None:
+            self.update_process(proc)
 
         # modify binds
         self.bind("<KeyPress>", self._update_stdin)
         self.bind("<KeyRelease>", self._on_key_up)
+        self._textbox.bind("<Configure>", self._on_resize, add="+")
 
     def send_key(self, key: str, event: Event) -> None:
-        self.insert("end", key+"\n")
-        self.see("end")
+        self._insert_grouped([(key + "\n", ())])
         self._update_stdin(event)
 
+    def clear(self) -> None:
+        """
+        clear the texbox and its scrollback
+        """
+        self.delete(0.0, ctk.END)
+        self.scrollback.clear()
+        self._renderer.clear()
+        self._throttle.clear()
+        self._search.reset()
+
     def _update_stdin(self, event) -> None:
         """
         update the process on key input
         """
-        if not self._program_running:
+        if not self.program_running:
             return
 
         # ctrl is held
         if self._control_keys["ctrl"]:
             if event.keysym == "c":
-                self._running_program.send_signal(signal.SIGINT)
+                self.session.send_signal(signal.SIGINT)
 
             elif event.keysym == "l":
-                self.delete(0.0, ctk.END)
+                self.clear()
 
             return
 
         if event.keysym in string.ascii_letters:
             print(event.keysym, end="")
-            self._running_program.stdin.write(event.keysym.encode("utf-8"))
+            self.session.write(event.keysym.encode("utf-8"))
 
         elif event.keysym.lower() == "return":
             print(b"\x0d\x0a".decode(), end="")
-            self._running_program.stdin.write(b"\x0a\x20")  # cr + lf
+            self.session.write(b"\x0a\x20")  # cr + lf
 
         elif event.keysym.lower() == "backspace":
             print(b"\x08".decode(), end="")
-            self._running_program.stdin.write(b"\x08")
+            self.session.write(b"\x08")
 
         elif event.keysym.lower() == "space":
             print(b"\x20".decode(), end="")
-            self._running_program.stdin.write(b"\x20")
+            self.session.write(b"\x20")
 
         elif event.keysym.startswith("Control"):
             self._control_keys["ctrl"] = True
@@ -112,9 +182,7 @@ class TermBox(ctk.CTkTextbox):
         else:
             print(event.keysym)
             print(event.char, end="")
-            self._running_program.stdin.write(event.char.encode())
-
-        self._running_program.stdin.flush()
+            self.session.write(event.char.encode())
 
     def _on_key_up(self, event) -> None:
         """
@@ -128,132 +196,252 @@ class TermBox(ctk.CTkTextbox):
             self._control_keys["shift"] = False
             return
 
-    def _update_proc(self) -> None:
-        """
-        thread. Updates the programs stdout / stderr / stdin
-        """
-        curr_tag = ""
-        try:
-            while self.running:
-                if self._running_program is not None:
-                    self._program_running = self._running_program.poll() is \
-                                            None
-
-                    byte_char = self._running_program.stdout.read(1)
-                    if byte_char:
-                        if byte_char[0] == 27:  # font control character
-                            curr_tag = read_color_code(
-                                self._running_program.stdout
-                            )
-                            continue
-
-                        self._to_insert.append(
-                            (byte_char.decode("utf-8"), curr_tag)
-                        )
-                        continue
-
-                    # only read error messages when
-                    # there is no stdout to read anymore
-                    err_char = self._running_program.stderr.read(1)
-                    if err_char:
-                        self._err_to_insert.append(
-                            (err_char.decode("utf-8"), SIMPLE_COLORS["red"][0])
-                        )
-
-                        # read until nothing more to read
-                        while err_char := self._running_program.stderr.read(1):
-                            self._err_to_insert.append(
-                                (err_char.decode("utf-8"),
-                                 SIMPLE_COLORS["red"][0])
-                            )
-
-                        self._err_to_insert.append(("", ""))  # end code
-
-                # I know python is slow, but believe me,
-                # this does actually make a difference
-                sleep(.005)
-
-        except Exception:
-            print("program exited: ", format_exc())
-            raise
-
     def kill_program(self) -> None:
         """
         kill the currently running program
         """
-        if self._running_program is not None:
-            self._running_program.send_signal(signal.SIGTERM)
+        if self.session is not None:
+            self.session.kill()
+
+    def run_program(self, command: Command) -> subprocess.Popen:
+        """
+        run a program and show it, stops showing the previous one
+        """
+        self.show(self.launcher.launch(command, self._on_output, self._term_size))
+        return self.session.proc
 
-    def run_program(
-            self, command: tp.Union[
-                str, bytes, os.PathLike[str], os.PathLike[bytes], tp.Sequence[
-                    tp.Union[
-                        str, bytes, os.PathLike[str], os.PathLike[bytes]]]]
-    ) -> subprocess.Popen:
+    @property
+    def term_size(self) -> tuple[int, int]:
+        """
+        (columns, rows) that fit into the texbox
+        """
+        return self._term_size
+
+    def _on_resize(self, *_trash) -> None:
+        """
+        keep the pseudo terminal size in sync with the texbox
+        """
+        font = Font(font=self._textbox.cget("font"))
+        char_width = max(font.measure("0"), 1)
+        line_height = max(font.metrics("linespace"), 1)
+        size = (
+            max(self._textbox.winfo_width() // char_width, 1),
+            max(self._textbox.winfo_height() // line_height, 1)
+        )
+        if size != self._term_size:
+            self._term_size = size
+            if self.session is not None:
+                self.session.resize(*size)
+
+    def _configure_tags(self, style: Style) -> None:
+        """
+        configure the tags of a style the first time it is used
         """
-        run a program
+        for tag in style:
+            if tag not in self._configured_tags:
+                self._textbox.tag_configure(tag, **tag_options(tag))
+                # newer tags win, the search highlight must stay on top
+                self._textbox.tag_lower(tag)
+                self._configured_tags.add(tag)
+
+    def _insert_text(self, grouped: list[tuple[str, Style]]) -> None:
         """
-        self.delete(0.0, ctk.END)  # clear output texbox
-        self._running_program = subprocess.Popen(
-            command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-            stdin=subprocess.PIPE, )
-        return self._running_program
+        insert styled runs into the texbox with a single call
+        """
+        args: list[tp.Union[str, Style]] = []
+        for text, style in grouped:
+            self._configure_tags(style)
+            args.append(text)
+            args.append(style)
+
+        if args:
+            self._textbox.insert(ctk.END, *args)
 
-    def _insert_grouped(self, to_insert: list[tuple[str, str]]) -> None:
+    def _insert_grouped(self, to_insert: list[tuple[str, Style]]) -> None:
         """
-        groups by tag and inserts into texbox
-        :param to_insert: ungrouped chars / tags
+        groups by tag and inserts into texbox with a single call
+        :param to_insert: ungrouped text runs / styles
         """
-        grouped: list[list[str, str]] = []
-        curr_flag = None
-        for line in to_insert:
-            char, flag = line
-            if flag == curr_flag:
-                grouped[-1][0] += char
-                continue
+        grouped = coalesce(to_insert)
+        if not grouped:
+            return
+
+        # only follow the output if the user didn't scroll up
+        at_bottom = self._textbox.yview()[1] >= .999
 
-            curr_flag = flag
-            grouped.append([char, flag])
+        self._insert_text(grouped)
 
-        for s in grouped:
-            self.insert(ctk.END, *s)
+        self.scrollback.append(grouped)
+        cut = self.scrollback.take_partial_trimmed()
+        if cut:
+            # the unfinished last line was cut at its start
+            self._textbox.delete("end-1l linestart", f"end-1l linestart + {cut}c")
 
-        if grouped:
+        trimmed = self.scrollback.take_trimmed()
+        if trimmed:
+            # remove the lines dropped from the scrollback, tk shifts
+            # the tag ranges of the remaining text along
+            self._textbox.delete("1.0", f"{trimmed + 1}.0")
+
+        if at_bottom:
             # scroll to end
             self.see("end")
 
-    def update(self) -> None:
+    def update(self) -> bool:
         """
         update the textbox text insertion
+
+        :return: True if there is output left for the next frame
+        """
+        with PROFILER.stage("term.drain"):
+            if self.session is not None:
+                capture = self.session.capture
+                PROFILER.gauge("capture.queued", capture.queued)
+                PROFILER.gauge("capture.high_water", capture.high_water)
+                self._throttle.push(capture.drain())
+
+            # only hand on more once the renderer caught up, anything beyond
+            # waits (and is eventually skipped) in the throttle
+            if self._renderer.pending < self._renderer.chars_per_frame:
+                self._renderer.push(self._throttle.take())
+
+        # insert output into textbox, at most one frame budget worth
+        if self._renderer.pending:
+            PROFILER.gauge("render.pending", self._renderer.pending)
+            start = perf_counter()
+            with PROFILER.stage("term.insert"):
+                self._insert_grouped(self._renderer.take())
+
+            self._renderer.report(perf_counter() - start)
+            PROFILER.gauge("render.chars_per_frame", self._renderer.chars_per_frame)
+
+        with PROFILER.stage("term.search"):
+            self._scan_search()
+        return bool(self._renderer.pending) or self._throttle.pending \
+            or self._search.pending
+
+    def search(
+            self, query: str, regex: bool = False, ignore_case: bool = True
+    ) -> None:
         """
-        # insert stdout into textbox
-        self._insert_grouped(self._to_insert.copy())
-        self._to_insert.clear()
+        highlight all matches of a query, "" to stop searching
 
-        # only insert if a whole error message is present
-        if not (
-                self._program_running or self._to_insert) and \
-                self._err_to_insert and \
-                self._err_to_insert[-1][0] == "":
-            # add newline for better readability
-            tmp = [("\n", "")] + self._err_to_insert.copy()[:-1]
-            self._insert_grouped(tmp)
-            self._err_to_insert.clear()
+        :raises re.error: invalid regex
+        """
+        self._search.set_query(query, regex, ignore_case)
+        self._textbox.tag_remove(SEARCH_TAG, "1.0", ctk.END)
+        self._textbox.tag_remove(SEARCH_CURRENT_TAG, "1.0", ctk.END)
+        self._scan_search()
+
+    def _scan_search(self) -> None:
+        """
+        highlight the matches in new lines, a batch per frame
+        """
+        found = self._search.scan()
+        if not found:
+            return
+
+        # text widget lines start at 1
+        offset = 1 - self.scrollback.first_line
+        indices: list[str] = []
+        for line, start, end in found:
+            indices.append(f"{line + offset}.{start}")
+            indices.append(f"{line + offset}.{end}")
+
+        self._textbox.tag_add(SEARCH_TAG, *indices)
+
+    def search_step(self, direction: int) -> tp.Union[Match, None]:
+        """
+        select and show the next / previous match
+
+        :param direction: 1 for next, -1 for previous
+        """
+        # start at the first visible line
+        top = int(self._textbox.index("@0,0").split(".")[0])
+        offset = 1 - self.scrollback.first_line
+        match = self._search.step(direction, from_line=top - offset)
+
+        self._textbox.tag_remove(SEARCH_CURRENT_TAG, "1.0", ctk.END)
+        if match is not None:
+            start = f"{match.line + offset}.{match.start}"
+            self._textbox.tag_add(
+                SEARCH_CURRENT_TAG, start, f"{match.line + offset}.{match.end}"
+            )
+            self._textbox.see(start)
+
+        return match
+
+    @property
+    def search_results(self) -> tuple[int, int]:
+        """
+        (number of the selected match, number of matches), 0 if none selected
+        """
+        return self._search.current + 1, len(self._search.matches)
 
-    def update_process(self, proc: subprocess.Popen):
+    def update_process(
+            self,
+            proc: subprocess.Popen,
+            pty_fd: tp.Union[int, None] = None,
+            sinks: tp.Sequence[CaptureSink] = ()
+    ):
         """
-        update the currently running process
+        show an already running process
         :param proc: subprocess popen process
+        :param pty_fd: pseudo terminal master if the program runs in one
+        :param sinks: receive the raw output (e.g. a RunLog)
+        """
+        self.show(self.launcher.attach(proc, self._on_output, pty_fd=pty_fd, sinks=sinks))
+
+    def show(self, session: Session) -> None:
+        """
+        show a session the box owns, the previous one stops capturing
         """
-        self.delete(0.0, ctk.END)  # clear output texbox
-        self._running_program = proc
+        old = self.session
+        self.attach(session)
+        if old is not None and old is not session:
+            old.stop()
+
+    def attach(self, session: tp.Union[Session, None]) -> None:
+        """
+        show another session (or none), the previous one keeps running and
+        buffering in the background
+        """
+        if session is self.session:
+            return
+
+        if self.session is not None:
+            # what wasn't shown yet still belongs to the old session
+            self.scrollback.append(self._renderer.take_all())
+            self.scrollback.append(self._throttle.take_all())
+            self.scrollback.take_trimmed()
+            self.scrollback.take_partial_trimmed()
+
+        self.session = session
+        self.scrollback = session.scrollback if session is not None \
+            else Scrollback(0)
+        self._search.scrollback = self.scrollback
+        self._renderer.clear()
+        self._throttle.clear()
+        self.delete(0.0, ctk.END)
+
+        if session is not None:
+            # everything it printed so far, in one insert
+            session.pump()
+            self.scrollback.take_trimmed()
+            self.scrollback.take_partial_trimmed()
+            self._insert_text(coalesce(self.scrollback.iter_spans()))
+            self.see("end")
+            session.resize(*self._term_size)
+
+        # the query stays, matches are searched in the new scrollback
+        self._search.reset()
 
     @property
     def program_running(self) -> bool:
         """
         program status
         """
-        return self._program_running
+        return self.session is not None and self.session.running
 
     def end(self):
         """
@@ -262,6 +450,8 @@ class TermBox(ctk.CTkTextbox):
         """
         self.kill_program()
         self.running = False
+        if self.session is not None:
+            self.session.stop()
 
     def destroy(self):
         self.end()
@@ -0,0 +1,229 @@
+"""
+_throttle.py
+
+limits how fast output is shown, skips what can't be shown in time
+"""
+from ._tk_term_colors import COMPLEX_COLORS, Style
+from ._profiler import PROFILER
+from collections import deque
+from time import monotonic
+import typing as tp
+
+
+SKIPPED_STYLE: Style = (COMPLEX_COLORS["bright black"][0],)
+
+
+def _group(n: int) -> str:
+    """
+    12345 -> "12 345"
+    """
+    return f"{n:,}".replace(",", " ")
+
+
+class OutputThrottle:
+    """
+    flow control between capture and display
+
+    Output is shown at most `max_rate` lines per second. Once more than
+    `max_lines` lines (or `max_chars` characters) are waiting, the oldest
+    ones are dropped and replaced by a "… N lines skipped" note, so the
+    backlog stays bounded and the newest output (the tail) is always shown
+    soon. This only affects the display, the capture sinks get everything
+    and the program is never blocked.
+    """
+    max_rate: float = ...
+    max_lines: int = ...
+    max_chars: int = ...
+    burst: float = .5  # seconds of unused rate that may be caught up on
+
+    _backlog: tp.Deque[tuple[str, Style, int]] = ...  # text, style, newlines
+    _n_lines: int = 0
+    _n_chars: int = 0
+    _skipped_lines: int = 0
+    _skipped_chars: int = 0
+    _tokens: float = 0
+    _last_take: tp.Union[float, None] = None
+    _line_start: bool = True
+
+    def __init__(
+            self,
+            max_rate: float = 2000,
+            max_lines: int = 1000,
+            max_chars: int = 1024 * 1024
+    ) -> None:
+        """
+        :param max_rate: max lines per second to show, 0 for unlimited
+        :param max_lines: max lines waiting before skipping, 0 for unlimited
+        :param max_chars: max characters waiting before skipping,
+            0 for unlimited
+        """
+        self.max_rate = max_rate
+        self.max_lines = max_lines
+        self.max_chars = max_chars
+        self._backlog = deque()
+
+    @property
+    def pending(self) -> bool:
+        """
+        True if there is output (or a skip note) left to show
+        """
+        return bool(self._backlog) or bool(self._skipped_chars)
+
+    @property
+    def skipped_lines(self) -> int:
+        """
+        lines skipped since the last note
+        """
+        return self._skipped_lines
+
+    def push(self, spans: tp.Iterable[tuple[str, Style]]) -> None:
+        for text, style in spans:
+            n_lines = text.count("\n")
+            self._backlog.append((text, style, n_lines))
+            self._n_lines += n_lines
+            self._n_chars += len(text)
+
+        if self.max_lines and self._n_lines > self.max_lines:
+            self._skip_lines(self._n_lines - self.max_lines)
+
+        if self.max_chars and self._n_chars > self.max_chars:
+            self._skip_chars(self._n_chars - self.max_chars)
+
+    def _drop(self, text: str, n_lines: int) -> None:
+        self._n_lines -= n_lines
+        self._n_chars -= len(text)
+        self._skipped_lines += n_lines
+        self._skipped_chars += len(text)
+        PROFILER.count("throttle.skipped_lines", n_lines)
+
+    def _skip_lines(self, excess: int) -> None:
+        """
+        drop the oldest lines
+        """
+        backlog = self._backlog
+        while excess and backlog:
+            text, style, n_lines = backlog.popleft()
+            if n_lines < excess:
+                self._drop(text, n_lines)
+                excess -= n_lines
+                continue
+
+            # cut after the excess-th newline, the rest starts a kept line
+            pos = -1
+            for _ in range(excess):
+                pos = text.index("\n", pos + 1)
+
+            self._drop(text[:pos + 1], excess)
+            if pos + 1 < len(text):
+                backlog.appendleft((text[pos + 1:], style, n_lines - excess))
+
+            excess = 0
+
+    def _skip_chars(self, excess: int) -> None:
+        """
+        drop the oldest characters (e.g. a huge line without newline)
+        """
+        backlog = self._backlog
+        while excess and backlog:
+            text, style, n_lines = backlog.popleft()
+            if len(text) <= excess:
+                self._drop(text, n_lines)
+                excess -= len(text)
+                continue
+
+            dropped = text[:excess]
+            self._drop(dropped, dropped.count("\n"))
+            backlog.appendleft((text[excess:], style, n_lines - dropped.count("\n")))
+            excess = 0
+
+    def _note(self) -> tuple[str, Style]:
+        """
+        the "… N lines skipped" note
+        """
+        if self._skipped_lines:
+            text = f"… {_group(self._skipped_lines)} lines skipped\n"
+
+        else:
+            text = f"… {_group(self._skipped_chars)} characters skipped\n"
+
+        if not self._line_start:
+            text = "\n" + text
+
+        self._skipped_lines = 0
+        self._skipped_chars = 0
+        return text, SKIPPED_STYLE
+
+    def take(self, now: tp.Union[float, None] = None) -> list[tuple[str, Style]]:
+        """
+        the output that may be shown now
+
+        :param now: monotonic time, for testing
+        """
+        now = monotonic() if now is None else now
+        out: list[tuple[str, Style]] = []
+        if self._skipped_chars:
+            out.append(self._note())
+
+        backlog = self._backlog
+        if not self.max_rate:
+            out.extend((text, style) for text, style, _ in backlog)
+            backlog.clear()
+            self._n_lines = 0
+            self._n_chars = 0
+
+        else:
+            elapsed = now - self._last_take if self._last_take is not None \
+                else self.burst
+            self._tokens = min(
+                self._tokens + elapsed * self.max_rate,
+                max(self.max_rate * self.burst, 1)
+            )
+
+            while backlog:
+                text, style, n_lines = backlog[0]
+                if n_lines > self._tokens:
+                    allowed = int(self._tokens)
+                    if not allowed:
+                        break
+
+                    # show the first lines of the span
+                    pos = -1
+                    for _ in range(allowed):
+                        pos = text.index("\n", pos + 1)
+
+                    backlog[0] = (text[pos + 1:], style, n_lines - allowed)
+                    text, n_lines = text[:pos + 1], allowed
+
+                else:
+                    backlog.popleft()
+
+                out.append((text, style))
+                self._tokens -= n_lines
+                self._n_lines -= n_lines
+                self._n_chars -= len(text)
+
+        self._last_take = now
+        if out and out[-1][0]:
+            self._line_start = out[-1][0].endswith("\n")
+
+        return out
+
+    def take_all(self) -> list[tuple[str, Style]]:
+        """
+        everything that is waiting, regardless of the rate
+        """
+        out: list[tuple[str, Style]] = []
+        if self._skipped_chars:
+            out.append(self._note())
+
+        out.extend((text, style) for text, style, _ in self._backlog)
+        self.clear()
+        return out
+
+    def clear(self) -> None:
+        self._backlog.clear()
+        self._n_lines = 0
+        self._n_chars = 0
+        self._skipped_lines = 0
+        self._skipped_chars = 0
+        self._line_start = True
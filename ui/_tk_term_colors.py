@@ -7,6 +7,13 @@ conversion from terminal to tkinter texbox colors
 Author:
 Nilusink
 """
+from functools import lru_cache
+import typing as tp
+import re
+
+
+# a style is the tuple of texbox tags a text run is inserted with
+Style = tp.Tuple[str, ...]
 
 SIMPLE_COLORS = {
     "black": ("Black", 30, 0),
@@ -20,16 +27,27 @@ SIMPLE_COLORS = {
     "reset": ("Reset", 0, 0),
 }
 
-COMPLEX_COLORS = [
-    ("Bright Black", 30, 1),
-    ("Bright Red", 31, 1),
-    ("Bright Green", 32, 1),
-    ("Bright Yellow", 33, 1),
-    ("Bright Blue", 34, 1),
-    ("Bright Magenta", 35, 1),
-    ("Bright Cyan", 36, 1),
-    ("Bright White", 37, 1),
-]
+COMPLEX_COLORS = {
+    "bright black": ("#7f7f7f", 30, 1),
+    "bright red": ("#ff5f57", 31, 1),
+    "bright green": ("#46c93a", 32, 1),
+    "bright yellow": ("#f5e050", 33, 1),
+    "bright blue": ("#5c9cf5", 34, 1),
+    "bright magenta": ("#ff77ff", 35, 1),
+    "bright cyan": ("#4fe3dc", 36, 1),
+    "bright white": ("#ffffff", 37, 1),
+}
+
+# CSI sequences, OSC strings (terminated by BEL or ST) and two byte escapes
+_ESCAPE_RE = re.compile(
+    "\x1b(?:\\[([0-9;:?<=>]*)[ -/]*([@-~])"
+    "|\\][^\x07\x1b]*(?:\x07|\x1b\\\\)"
+    "|[ -/]*[0-Z\\\\^-~])"
+)
+# longest unterminated sequence kept back waiting for more output
+_MAX_PENDING: int = 256
+# (state, sgr parameters) transitions remembered
+_MAX_TRANSITIONS: int = 4096
 
 
 def cmd_to_tk(color: int, control_code: int = 0) -> str:
@@ -47,37 +65,272 @@ def cmd_to_tk(color: int, control_code: int = 0) -> str:
         return "undefined"
 
     elif control_code == 1:
-        return "unsupported"
+        for col in COMPLEX_COLORS.values():
+            if col[1] == color:
+                return col[0]
+
+        return "undefined"
 
     return "undefined"
 
 
-def read_color_code(stdout) -> str:
+def _build_palette() -> list[str]:
+    """
+    the xterm 256 color palette
     """
-    read the current color (only call after 27)
+    palette = [cmd_to_tk(30 + i) for i in range(8)]
+    palette += [cmd_to_tk(30 + i, 1) for i in range(8)]
+
+    steps = (0, 95, 135, 175, 215, 255)
+    for r in steps:
+        for g in steps:
+            for b in steps:
+                palette.append(f"#{r:02x}{g:02x}{b:02x}")
+
+    for i in range(24):
+        gray = 8 + i * 10
+        palette.append(f"#{gray:02x}{gray:02x}{gray:02x}")
 
-    :param stdout: stdout pipe
-    :return:
+    return palette
+
+
+PALETTE_256: list[str] = _build_palette()
+_CUBE_STEPS: tuple[int, ...] = (0, 95, 135, 175, 215, 255)
+
+
+def nearest_256(r: int, g: int, b: int) -> int:
+    """
+    the palette index of the xterm color closest to an rgb color, so
+    truecolor output can't create an unbounded number of texbox tags
     """
-    curr = b""
-    n_char = stdout.read(1)
-    while n_char[0] != 109:
-        curr += n_char
-        n_char = stdout.read(1)
+    def cube(v: int) -> int:
+        return 0 if v < 48 else 1 if v < 115 else (v - 35) // 40
+
+    cr, cg, cb = cube(r), cube(g), cube(b)
+    cube_rgb = (_CUBE_STEPS[cr], _CUBE_STEPS[cg], _CUBE_STEPS[cb])
+
+    gray_index = min(max((r + g + b) // 3 - 3, 0) // 10, 23)
+    gray = 8 + gray_index * 10
+
+    def distance(other: tuple[int, int, int]) -> int:
+        return (r - other[0]) ** 2 + (g - other[1]) ** 2 + (b - other[2]) ** 2
+
+    if distance((gray, gray, gray)) < distance(cube_rgb):
+        return 232 + gray_index
+
+    return 16 + 36 * cr + 6 * cg + cb
+
 
-        if len(curr) > 10:
-            raise ValueError
+def tag_options(tag: str) -> dict[str, tp.Any]:
+    """
+    texbox tag_configure options for a tag produced by the parser
+    """
+    if tag.startswith("bg:"):
+        return {"background": tag[3:]}
+
+    if tag == "underline":
+        return {"underline": True}
+
+    return {"foreground": tag}
+
+
+class _SgrState(tp.NamedTuple):
+    fg: tp.Union[int, None] = None  # palette index
+    bg: tp.Union[int, None] = None
+    bold: bool = False
+    underline: bool = False
+
+
+def _extended_color(
+        params: list[str], i: int
+) -> tuple[tp.Union[int, None], int]:
+    """
+    parse a 38 / 48 color starting at params[i] ("5;n" or "2;r;g;b"),
+    truecolor is rounded to the 256 color palette
+
+    :return: color and index of the last consumed parameter
+    """
+    try:
+        mode = int(params[i + 1])
+        if mode == 5:
+            return int(params[i + 2]) % 256, i + 2
+
+        if mode == 2:
+            r, g, b = (min(int(v or 0), 255) for v in params[i + 2:i + 5])
+            return nearest_256(r, g, b), i + 4
+
+    except (IndexError, ValueError):
+        pass
+
+    return None, len(params)
+
+
+# parameters setting a single field of the state to a fixed value
+_SGR_FIELDS: dict[int, tuple[str, tp.Union[int, bool, None]]] = {
+    1: ("bold", True),
+    22: ("bold", False),
+    4: ("underline", True),
+    24: ("underline", False),
+    39: ("fg", None),
+    49: ("bg", None),
+    **{30 + i: ("fg", i) for i in range(8)},
+    **{40 + i: ("bg", i) for i in range(8)},
+    **{90 + i: ("fg", i + 8) for i in range(8)},
+    **{100 + i: ("bg", i + 8) for i in range(8)},
+}
+
+
+def _sgr_int(param: str) -> int:
+    """
+    an sgr parameter as int, "" means 0, -1 if invalid
+    """
+    try:
+        return int(param) if param else 0
 
-    control_code = 0
-    s_curr = curr.decode().lstrip("[").rstrip("m")
-    if ";" in s_curr:
-        control_code, color = s_curr.split(";")
+    except ValueError:
+        return -1
+
+
+def _apply_sgr(state: _SgrState, code: str) -> _SgrState:
+    """
+    apply the parameters of a "m" sequence
+    """
+    params = code.replace(":", ";").split(";")
+    fields = state._asdict()
+
+    i = 0
+    while i < len(params):
+        p = _sgr_int(params[i])
+        if p == 0:
+            fields = _SgrState()._asdict()
+
+        elif p in _SGR_FIELDS:
+            name, value = _SGR_FIELDS[p]
+            fields[name] = value
+
+        elif p in (38, 48):
+            fields["fg" if p == 38 else "bg"], i = _extended_color(params, i)
+
+        i += 1
+
+    return _SgrState(**fields)
+
+
+def _color(color: int) -> str:
+    return PALETTE_256[color]
+
+
+def _to_style(state: _SgrState) -> Style:
+    """
+    convert the sgr state to texbox tags
+    """
+    tags: list[str] = []
+    fg = state.fg
+    if fg is not None and fg < 8 and state.bold:
+        # bold standard colors are shown bright
+        fg += 8
+
+    if fg is not None:
+        tags.append(_color(fg))
+
+    if state.bg is not None:
+        tags.append("bg:" + _color(state.bg))
+
+    if state.underline:
+        tags.append("underline")
+
+    return tuple(tags)
+
+
+@lru_cache(maxsize=_MAX_TRANSITIONS)
+def _transition(state: _SgrState, code: str) -> tuple[_SgrState, Style]:
+    """
+    the state and style after a "m" sequence, shared between parsers and
+    bounded (programs may emit endless distinct sequences)
+    """
+    state = _apply_sgr(state, code)
+    return state, _to_style(state)
+
+
+def _append(spans: list[tuple[str, Style]], text: str, style: Style) -> None:
+    """
+    add a text run, joined with the last one if the style didn't change
+    """
+    if spans and spans[-1][1] == style:
+        spans[-1] = (spans[-1][0] + text, style)
 
     else:
-        color = s_curr
+        spans.append((text, style))
+
+
+class AnsiParser:
+    """
+    stateful parser turning terminal output into (text, style) runs
+
+    Only "m" (SGR) sequences change the style, every other escape
+    sequence (cursor movement, erase, window title, ...) is dropped.
+    Sequences split between two chunks are completed with the next one.
+    """
+    _state: _SgrState = ...
+    _style: Style = ...
+    _pending: str = ""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        back to the default style
+        """
+        self._state = _SgrState()
+        self._style = ()
+        self._pending = ""
+
+    @property
+    def style(self) -> Style:
+        """
+        style the next text run will have
+        """
+        return self._style
+
+    def feed(self, text: str, final: bool = False) -> list[tuple[str, Style]]:
+        """
+        parse a chunk of output
+
+        :param text: decoded output
+        :param final: True if no more output follows
+        :return: text runs with their style
+        """
+        if self._pending:
+            text = self._pending + text
+            self._pending = ""
+
+        spans: list[tuple[str, Style]] = []
+        if "\x1b" not in text:
+            if text:
+                spans.append((text, self._style))
+
+            return spans
+
+        pos = 0
+        style = self._style
+        for match in _ESCAPE_RE.finditer(text):
+            start = match.start()
+            if start > pos:
+                _append(spans, text[pos:start], style)
+
+            pos = match.end()
+            if match.group(2) == "m":
+                self._state, style = _transition(self._state, match.group(1))
+
+        rest = text[pos:]
+        esc = rest.find("\x1b")
+        if esc != -1 and not final and len(rest) - esc <= _MAX_PENDING:
+            # the sequence probably continues in the next chunk
+            rest, self._pending = rest[:esc], rest[esc:]
 
-    tk_col = cmd_to_tk(int(color), int(control_code))
-    if tk_col.lower() in ("reset", "undefined", "unsupported"):
-        return ""
+        if rest:
+            _append(spans, rest, style)
 
-    return tk_col
+        self._style = style
+        return spans
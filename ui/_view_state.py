@@ -0,0 +1,83 @@
+"""
+_view_state.py
+
+remembers what a frame last showed, so widgets are only touched on changes
+"""
+import typing as tp
+
+
+_MISSING = object()
+
+
+class ViewState:
+    """
+    the values a frame's widgets show, plus the functions showing them
+
+    Frames `set` the current values as often as they like, `flush` calls
+    every render function whose values really changed since it last ran,
+    once. A render function should configure each of its widgets with a
+    single `configure` call.
+
+    >>> view = ViewState()
+    >>> view.bind(("running",), lambda v: button.configure(
+    ...     text="Kill" if v["running"] else "Start",
+    ...     fg_color="#aa3333" if v["running"] else "#3a7ebf"
+    ... ))
+    >>> view.set(running=True)
+    >>> view.flush()
+    """
+    _values: dict[str, tp.Any] = ...
+    _dirty: set[str] = ...
+    _views: list[tuple[frozenset[str], tp.Callable[["ViewState"], None]]] = ...
+
+    def __init__(self) -> None:
+        self._values = {}
+        self._dirty = set()
+        self._views = []
+
+    def __getitem__(self, key: str) -> tp.Any:
+        return self._values[key]
+
+    def get(self, key: str, default: tp.Any = None) -> tp.Any:
+        return self._values.get(key, default)
+
+    def bind(
+            self,
+            keys: tp.Iterable[str],
+            render: tp.Callable[["ViewState"], None]
+    ) -> None:
+        """
+        call `render` on `flush` whenever one of `keys` changed
+        """
+        self._views.append((frozenset(keys), render))
+
+    def set(self, **values: tp.Any) -> bool:
+        """
+        update values, unchanged ones are ignored
+
+        :return: True if something changed
+        """
+        changed = False
+        for key, value in values.items():
+            if self._values.get(key, _MISSING) != value:
+                self._values[key] = value
+                self._dirty.add(key)
+                changed = True
+
+        return changed
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._dirty)
+
+    def flush(self) -> None:
+        """
+        re-render everything that changed
+        """
+        if not self._dirty:
+            return
+
+        dirty, self._dirty = self._dirty, set()
+        for keys, render in self._views:
+            if keys & dirty:
+                render(self)
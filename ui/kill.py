@@ -1,11 +1,15 @@
+from ._process_table import ProcessTable
+from ._supervisor import SUPERVISOR, Supervisor
 import subprocess
+import threading
 import platform
-import signal
 import os
 
 
 SEARCH_FOR: str = "run/main"
 
+PROCESS_TABLE = ProcessTable()
+
 
 def strip_pid(ps_line: str) -> int:
     """
@@ -17,9 +21,10 @@ def strip_pid(ps_line: str) -> int:
             return int(part)
 
 
-def get_running_pids(identifier: str = SEARCH_FOR) -> list[int]:
+def get_running_pids_ps(identifier: str = SEARCH_FOR) -> list[int]:
     """
-    get the pids of all running processes
+    get the pids of all running processes using `ps`
+    (fallback for systems without /proc)
     """
     if platform.system() == "Linux":
         process_output = subprocess.check_output(["ps", "-ax"]).decode()
@@ -28,18 +33,87 @@ def get_running_pids(identifier: str = SEARCH_FOR) -> list[int]:
     return []
 
 
-def get_n_running() -> int:
+def get_running_pids(
+        identifier: str = SEARCH_FOR, children_only: bool = False
+) -> list[int]:
+    """
+    get the pids of all running processes
+
+    :param identifier: part of the command line to look for
+    :param children_only: only processes started by this program
+    """
+    if PROCESS_TABLE.available:
+        return PROCESS_TABLE.pids(
+            identifier, parent=os.getpid() if children_only else None
+        )
+
+    return get_running_pids_ps(identifier)
+
+
+def get_n_running(children_only: bool = False) -> int:
     """
     get the number of running processes
     """
-    return len(get_running_pids())
+    return len(get_running_pids(children_only=children_only))
 
 
-def kill_running(sig: signal.signal = signal.SIGINT) -> None:
+def get_running_groups(
+        identifier: str = SEARCH_FOR, children_only: bool = False
+) -> list[tuple[int, int]]:
+    """
+    (pid, process group id) of all running processes
     """
-    kill all running programs
+    if PROCESS_TABLE.available:
+        return PROCESS_TABLE.groups(
+            identifier, parent=os.getpid() if children_only else None
+        )
 
-    :param sig: signal to send
+    groups: list[tuple[int, int]] = []
+    for pid in get_running_pids_ps(identifier):
+        try:
+            groups.append((pid, os.getpgid(pid)))
+
+        except ProcessLookupError:
+            pass
+
+    return groups
+
+
+def kill_running(
+        children_only: bool = False,
+        supervisor: Supervisor = SUPERVISOR,
+        wait: bool = False
+) -> list[threading.Thread]:
     """
-    for pid in get_running_pids():
-        os.kill(pid, sig)
+    kill all running programs together with everything they started,
+    escalating from SIGINT to SIGKILL (see `Supervisor`)
+
+    :param children_only: only kill processes started by this program
+    :param supervisor: stops the programs
+    :param wait: block until all are stopped
+    :return: the threads stopping them
+    """
+    PROCESS_TABLE.invalidate()
+    own_group = os.getpgrp()
+    targets: set[tuple[int, bool]] = set()
+    for pid, pgid in get_running_groups(children_only=children_only):
+        # programs started by the ui lead their own group, all of it goes.
+        # one sharing our group can only be stopped on its own
+        if pgid > 1 and pgid != own_group:
+            targets.add((pgid, True))
+
+        else:
+            targets.add((pid, False))
+
+    threads = [
+        supervisor.stop(
+            target, group, on_stopped=lambda report: print(f"kill: {report}")
+        )
+        for target, group in targets
+    ]
+    if wait:
+        for thread in threads:
+            thread.join()
+
+    PROCESS_TABLE.invalidate()
+    return threads